@@ -0,0 +1,40 @@
+Feature: Batch evaluatie
+  Als beleidsmaker
+  Wil ik een wet in één keer voor een hele populatie kunnen uitvoeren
+  Zodat simulaties snel zijn, met precies dezelfde uitkomsten als per persoon
+
+  Background:
+    Given een gesimuleerde populatie van 80 personen op "2025-03-01" met seed 7
+
+  Scenario Outline: De <wet> in batch geeft dezelfde uitkomsten als per persoon
+    When <service> de <wet> voor de hele populatie uitvoert
+    Then zijn de uitkomsten van de batch gelijk aan die per persoon
+
+    Examples:
+      | wet                      | service            |
+      | zorgtoeslagwet           | TOESLAGEN          |
+      | wet_op_de_huurtoeslag    | TOESLAGEN          |
+      | wet_kinderopvang         | TOESLAGEN          |
+      | algemene_ouderdomswet    | SVB                |
+      | participatiewet/bijstand | GEMEENTE_AMSTERDAM |
+      | kieswet                  | KIESRAAD           |
+      | wet_inkomstenbelasting   | BELASTINGDIENST    |
+
+  Scenario: Batch met gewijzigde invoer van een andere dienst
+    Given de invoer wordt gewijzigd:
+      | service | veld            | waarde |
+      | VWS     | standaardpremie | 250000 |
+    When TOESLAGEN de zorgtoeslagwet voor de hele populatie uitvoert
+    Then zijn de uitkomsten van de batch gelijk aan die per persoon
+
+  Scenario Outline: Batch met gewijzigde definities van de <wet>
+    Given de definities worden gewijzigd:
+      | service   | wet   | definitie   | waarde   |
+      | <service> | <wet> | <definitie> | <waarde> |
+    When <service> de <wet> voor de hele populatie uitvoert
+    Then zijn de uitkomsten van de batch gelijk aan die per persoon
+
+    Examples:
+      | wet                   | service   | definitie                              | waarde  |
+      | zorgtoeslagwet        | TOESLAGEN | PERCENTAGE_DREMPELINKOMEN_ALLEENSTAAND | 0.03    |
+      | wet_op_de_huurtoeslag | TOESLAGEN | INKOMENSGRENS_ALLEENSTAANDE            | 3000000 |
@@ -0,0 +1,73 @@
+Feature: Claims in één keer indienen
+  Als uitvoeringsorganisatie
+  Wil ik veel claims in één keer kunnen indienen
+  Zodat dat snel gaat, met dezelfde uitkomst als wanneer ze één voor één worden ingediend
+
+  Background:
+    Given een opslag voor zaken en claims op "2025-03-01" met een snapshot na elke 0 gebeurtenissen
+    And de volgende aanvragen worden ingediend:
+      | bsn       | service   | wet            | uitkomst                |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | {"hoogte_toeslag": 100} |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | {"hoogte_toeslag": 100} |
+
+  Scenario: Een claim met dezelfde sleutel als een bestaande claim dient die opnieuw in
+    Given de volgende claims worden ingediend:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | beoordeling |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 2             | goedgekeurd |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2000000       | afgewezen   |
+    When de volgende claims in één keer worden ingediend:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | zaak     | automatisch |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 3             | bestaand | nee         |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2500000       | bestaand | nee         |
+    Then zijn de bestaande claims opnieuw ingediend
+    And zijn de claims:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | status  | zaak     |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 3             | PENDING | bestaand |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2500000       | PENDING | bestaand |
+
+  Scenario: Een sleutel die vaker voorkomt wordt ingediend zoals na elkaar
+    When de volgende claims in één keer worden ingediend:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | zaak     | automatisch |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 2             | bestaand | ja          |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2000000       | bestaand | nee         |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 3             | bestaand | nee         |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2500000       | bestaand | ja          |
+    Then krijgen claims met dezelfde sleutel dezelfde id
+    And zijn de claims:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | status   | zaak     |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 3             | PENDING  | bestaand |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2500000       | APPROVED | bestaand |
+
+  Scenario: Automatisch goedgekeurde claims worden aan hun zaak gekoppeld
+    When de volgende claims in één keer worden ingediend:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | zaak     | automatisch |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 2             | bestaand | ja          |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 1             | bestaand | ja          |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2000000       | geen     | ja          |
+    Then zijn de claims:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | status   | zaak     |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 2             | APPROVED | bestaand |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 1             | APPROVED | bestaand |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2000000       | APPROVED | geen     |
+
+  Scenario: De claims worden in één keer opgeslagen en de zaken in één keer
+    When de volgende claims in één keer worden ingediend:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | zaak     | automatisch |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 2             | bestaand | ja          |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | INKOMEN    | 2000000       | bestaand | nee         |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 1             | bestaand | nee         |
+    Then zijn de claims in 1 keer en de zaken in 1 keer opgeslagen
+    When de dienst opnieuw start
+    Then zijn de zaken en claims gelijk aan die voor de herstart
+
+  Scenario: Een claim bij een zaak die niet bestaat wordt toch opgeslagen
+    When de volgende claims in één keer worden ingediend:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | zaak     | automatisch |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 2             | onbekend | ja          |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 1             | onbekend | nee         |
+    Then zijn de claims in 1 keer en de zaken in 0 keer opgeslagen
+    When de dienst opnieuw start
+    Then zijn de claims:
+      | bsn       | service   | wet            | key        | nieuwe_waarde | status   | zaak     |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 2             | APPROVED | onbekend |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet | HUISHOUDEN | 1             | PENDING  | onbekend |
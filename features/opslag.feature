@@ -0,0 +1,29 @@
+Feature: Opslag van zaken en claims
+  Als uitvoeringsorganisatie
+  Wil ik dat zaken en claims bewaard blijven als de dienst opnieuw start
+  Zodat aanvragen en claims na een herstart precies zo terug te vinden zijn als ervoor
+
+  Scenario Outline: Na een herstart zijn de zaken en claims gelijk aan ervoor (snapshot na elke <interval> gebeurtenissen)
+    Given een opslag voor zaken en claims op "2025-03-01" met een snapshot na elke <interval> gebeurtenissen
+    And de volgende aanvragen worden ingediend:
+      | bsn       | service   | wet                   | uitkomst                |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet        | berekend                |
+      | 999993653 | SVB       | algemene_ouderdomswet | {"pensioenbedrag": 100} |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet        | {"hoogte_toeslag": 100} |
+      | 999992335 | KIESRAAD  | kieswet               | berekend                |
+    And de volgende claims worden ingediend:
+      | bsn       | service   | wet                   | key           | nieuwe_waarde | beoordeling |
+      | 999993653 | TOESLAGEN | zorgtoeslagwet        | HUISHOUDEN    | 2             | goedgekeurd |
+      | 999993653 | SVB       | algemene_ouderdomswet | WOONJAREN     | 40            | afgewezen   |
+      | 999992335 | TOESLAGEN | zorgtoeslagwet        | INKOMEN       | 2000000       | open        |
+      | 999992335 | KIESRAAD  | kieswet               | NATIONALITEIT | "NL"          | goedgekeurd |
+    And de beoordelaar alle aanvragen in behandeling afwijst
+    And de burger tegen alle afgewezen aanvragen bezwaar maakt
+    When de dienst opnieuw start
+    Then zijn de zaken en claims gelijk aan die voor de herstart
+
+    Examples:
+      | interval |
+      | 0        |
+      | 1        |
+      | 3        |
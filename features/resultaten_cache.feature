@@ -0,0 +1,62 @@
+Feature: Hergebruik van uitkomsten
+  Als uitvoeringsorganisatie
+  Wil ik dat eerder berekende uitkomsten worden hergebruikt
+  Zodat berekeningen snel zijn, zonder dat een wijziging in claims, gegevens of zaken wordt gemist
+
+  Background:
+    Given de datum is "2024-02-01"
+    And de volgende RvIG personen gegevens:
+      | bsn       | geboortedatum | verblijfsadres |
+      | 999993653 | 1948-02-15    | Amsterdam      |
+      | 999992335 | 1960-02-15    | Amsterdam      |
+    And de volgende RvIG relaties gegevens:
+      | bsn       | partnerschap_type | partner_bsn |
+      | 999993653 | GEEN              | null        |
+      | 999992335 | GEEN              | null        |
+    And de volgende SVB verzekerde_tijdvakken gegevens:
+      | bsn       | woonperiodes |
+      | 999993653 | 50           |
+      | 999992335 | 50           |
+    And de algemene_ouderdomswet is uitgevoerd door SVB voor BSN "999993653"
+    And de algemene_ouderdomswet is uitgevoerd door SVB voor BSN "999992335"
+    And de wet_brp is uitgevoerd door RvIG voor BSN "999993653"
+
+  Scenario: Een goedgekeurde claim wordt in de volgende berekening gebruikt
+    Given een persoon met BSN "999992335"
+    When de algemene_ouderdomswet wordt uitgevoerd door SVB
+    Then is niet voldaan aan de voorwaarden
+    When de burger een wijziging indient:
+      | service | law     | key           | nieuwe_waarde | reden                                    |
+      | RvIG    | wet_brp | GEBOORTEDATUM | 1948-02-15    | Geboortedatum onjuist in BRP registratie |
+    And de wijzigingen worden goedgekeurd
+    And de algemene_ouderdomswet wordt uitgevoerd door SVB
+    Then is voldaan aan de voorwaarden
+    And is de uitkomst van de algemene_ouderdomswet door SVB voor BSN "999993653" hergebruikt
+
+  Scenario: Vervangen gegevens worden in de volgende berekening gebruikt
+    Given een persoon met BSN "999993653"
+    When de algemene_ouderdomswet wordt uitgevoerd door SVB
+    Then is het pensioen "1380.00" euro
+    Given de volgende SVB verzekerde_tijdvakken gegevens:
+      | bsn       | woonperiodes |
+      | 999993653 | 25           |
+      | 999992335 | 50           |
+    When de algemene_ouderdomswet wordt uitgevoerd door SVB
+    Then is het pensioen "690.00" euro
+    And is de uitkomst van de wet_brp door RvIG voor BSN "999993653" hergebruikt
+
+  Scenario: Een besluit en bezwaar op een zaak worden in de volgende berekening gebruikt
+    Given alle aanvragen worden beoordeeld
+    And een persoon met BSN "999993653"
+    When de algemene_ouderdomswet wordt uitgevoerd door SVB
+    And de persoon dit aanvraagt
+    And de bezwaarmogelijkheid van de aanvraag wordt bepaald
+    And de beoordelaar de aanvraag afwijst met reden "Onvoldoende verzekerde jaren"
+    And de bezwaarmogelijkheid van de aanvraag wordt bepaald
+    Then is de uitkomst opnieuw berekend
+    And is het bezwaar_mogelijk "true"
+    When de burger bezwaar maakt met reden "Verzekerde jaren onjuist"
+    And de bezwaarmogelijkheid van de aanvraag wordt bepaald
+    Then is de uitkomst opnieuw berekend
+    And is het bezwaar_mogelijk "false"
+    And is de uitkomst van de algemene_ouderdomswet door SVB voor BSN "999992335" hergebruikt
@@ -1,11 +1,17 @@
+import copy
 import json
+import os
+import tempfile
+import uuid
 from typing import Any
 from unittest import TestCase
 
 import pandas as pd
 from behave import given, when, then
+from eventsourcing.utils import clear_topic_cache
 
-from machine.service import Services
+from machine.events.case.aggregate import CaseStatus
+from machine.service import RuleResult, Services
 
 assertions = TestCase()
 
@@ -581,3 +587,325 @@ def step_impl(context, assessment_type, text):
     assertions.assertIn(text, str(value), f"Expected {field_name} to contain '{text}', but it was '{value}'")
 
 
+
+
+@given('een gesimuleerde populatie van {count:d} personen op "{date}" met seed {seed:d}')
+def step_impl(context, count, date, seed):
+    """Load a population generated by the simulator, with its source tables and claims, into its services"""
+    from simulate import LawSimulator
+
+    simulator = LawSimulator(date, seed=seed)
+    people, children = simulator.generate_population(count)
+    simulator.setup_population(people, children)
+    context.root_reference_date = date
+    context.services = simulator.services
+    context.bsns = people["bsn"].tolist()
+    context.definition_overrides = {}
+
+
+@given("de invoer wordt gewijzigd")
+def step_impl(context):
+    for row in context.table:
+        context.test_data.setdefault(row["service"], {})[row["veld"]] = parse_value(row["waarde"])
+
+
+@given("de definities worden gewijzigd")
+def step_impl(context):
+    for row in context.table:
+        definitions = context.definition_overrides.setdefault(row["service"], {}).setdefault(row["wet"], {})
+        definitions[row["definitie"]] = parse_value(row["waarde"])
+
+
+@when("{service} de {law} voor de hele populatie uitvoert")
+def step_impl(context, service, law):
+    context.service = service
+    context.law = law
+    context.batch_result = context.services.evaluate_batch(
+        service,
+        law,
+        context.bsns,
+        context.root_reference_date,
+        overwrite_input=context.test_data,
+        definition_overrides=context.definition_overrides,
+    )
+
+
+@then("zijn de uitkomsten van de batch gelijk aan die per persoon")
+def step_impl(context):
+    """Evaluate the law per person, the outcome of every person must be identical"""
+    batch_results = RuleResult.from_batch_frame(context.batch_result)
+    assertions.assertEqual(len(batch_results), len(context.bsns))
+    for bsn, batch_result in zip(context.bsns, batch_results):
+        result = context.services.evaluate(
+            context.service,
+            context.law,
+            {"BSN": bsn},
+            context.root_reference_date,
+            overwrite_input=context.test_data,
+            definition_overrides=context.definition_overrides,
+        )
+        assertions.assertEqual(batch_result.requirements_met, result.requirements_met, f"requirements_met of {bsn}")
+        assertions.assertEqual(batch_result.missing_required, result.missing_required, f"missing_required of {bsn}")
+        assertions.assertEqual(batch_result.output, result.output, f"output of {bsn}")
+
+
+# Attributes set to the time an event is applied, which differ every time an aggregate is loaded
+LOAD_TIME_ATTRIBUTES = {"_pending_events", "created_at", "verified_at", "rejected_at"}
+
+
+def aggregate_state(aggregate) -> dict:
+    return {k: v for k, v in vars(aggregate).items() if k not in LOAD_TIME_ATTRIBUTES}
+
+
+def snapshot_cases_and_claims(services) -> dict:
+    """The indexes of the case and claim managers, with the state of every case and claim"""
+    case_manager = services.case_manager
+    claim_manager = services.claim_manager
+    return {
+        "case_index": dict(case_manager._case_index),
+        "case_bsn_index": copy.deepcopy(case_manager._bsn_index),
+        "case_law_index": copy.deepcopy(case_manager._law_index),
+        "case_status_index": {key: list(ids) for key, ids in case_manager._status_index.items()},
+        "case_summaries": copy.deepcopy(case_manager.get_case_summaries()),
+        "cases": {
+            case_id: aggregate_state(case_manager.get_case_by_id(case_id))
+            for case_id in case_manager._summaries
+        },
+        "claim_bsn_index": copy.deepcopy(claim_manager._bsn_index),
+        "claim_case_index": copy.deepcopy(claim_manager._case_index),
+        "claim_service_index": copy.deepcopy(claim_manager._service_index),
+        "claim_status_index": {key: list(ids) for key, ids in claim_manager._status_index.items()},
+        "claim_statuses": dict(claim_manager._claim_statuses),
+        "claim_bsn_service_law_index": copy.deepcopy(claim_manager._bsn_service_law_index),
+        "claims": {
+            claim_id: aggregate_state(claim_manager.get_claim(claim_id))
+            for claim_id in claim_manager._claim_statuses
+        },
+    }
+
+
+@given('een opslag voor zaken en claims op "{date}" met een snapshot na elke {interval:d} gebeurtenissen')
+def step_impl(context, date, interval):
+    store = tempfile.TemporaryDirectory()
+    context.add_cleanup(store.cleanup)
+    previous = os.environ.get("SNAPSHOTTING_INTERVAL")
+    os.environ["SNAPSHOTTING_INTERVAL"] = str(interval)
+    if previous is None:
+        context.add_cleanup(os.environ.pop, "SNAPSHOTTING_INTERVAL", None)
+    else:
+        context.add_cleanup(os.environ.__setitem__, "SNAPSHOTTING_INTERVAL", previous)
+
+    context.root_reference_date = date
+    context.event_store_dir = store.name
+    context.services = Services(date, event_store_dir=store.name)
+    context.add_cleanup(lambda: context.services.__exit__())
+
+
+@given("de volgende aanvragen worden ingediend")
+def step_impl(context):
+    for row in context.table:
+        parameters = {"BSN": row["bsn"]}
+        if row["uitkomst"] == "berekend":
+            claimed_result = context.services.evaluate(row["service"], row["wet"], parameters).output
+        else:
+            claimed_result = parse_value(row["uitkomst"])
+        context.services.case_manager.submit_case(
+            bsn=row["bsn"],
+            service_type=row["service"],
+            law=row["wet"],
+            parameters=parameters,
+            claimed_result=claimed_result,
+            approved_claims_only=True,
+        )
+
+
+@given("de volgende claims worden ingediend")
+def step_impl(context):
+    claim_manager = context.services.claim_manager
+    for row in context.table:
+        case = context.services.case_manager.get_case(row["bsn"], row["service"], row["wet"])
+        claim_id = claim_manager.submit_claim(
+            service=row["service"],
+            key=row["key"],
+            new_value=parse_value(row["nieuwe_waarde"]),
+            reason="Gewijzigde situatie",
+            claimant="BURGER",
+            case_id=str(case.id) if case else None,
+            law=row["wet"],
+            bsn=row["bsn"],
+        )
+        if row["beoordeling"] == "goedgekeurd":
+            claim_manager.approve_claim(claim_id, "BEOORDELAAR", parse_value(row["nieuwe_waarde"]))
+        elif row["beoordeling"] == "afgewezen":
+            claim_manager.reject_claim(claim_id, "BEOORDELAAR", "Niet aangetoond")
+
+
+@given("de beoordelaar alle aanvragen in behandeling afwijst")
+def step_impl(context):
+    case_manager = context.services.case_manager
+    for summary in case_manager.get_case_summaries(status=CaseStatus.IN_REVIEW):
+        case_manager.complete_manual_review(summary.id, "BEOORDELAAR", approved=False, reason="Uitkomst wijkt af")
+
+
+@given("de burger tegen alle afgewezen aanvragen bezwaar maakt")
+def step_impl(context):
+    case_manager = context.services.case_manager
+    for summary in case_manager.get_case_summaries(status=CaseStatus.DECIDED):
+        if summary.approved is False:
+            case_manager.objection_case(summary.id, reason="Niet eens met de afwijzing")
+
+
+@when("de dienst opnieuw start")
+def step_impl(context):
+    context.before_restart = snapshot_cases_and_claims(context.services)
+    context.services.__exit__()
+    clear_topic_cache()
+    context.services = Services(context.root_reference_date, event_store_dir=context.event_store_dir)
+
+
+@then("zijn de zaken en claims gelijk aan die voor de herstart")
+def step_impl(context):
+    after_restart = snapshot_cases_and_claims(context.services)
+    assertions.assertTrue(context.before_restart["cases"], "Expected cases to be stored")
+    assertions.assertTrue(context.before_restart["claims"], "Expected claims to be stored")
+    for name, before in context.before_restart.items():
+        assertions.assertEqual(before, after_restart[name], f"{name} differs after the restart")
+
+
+def find_case_id(context, row) -> str | None:
+    """The case a claim refers to: the case of the person for the law, a case that doesn't exist, or none"""
+    if row["zaak"] == "bestaand":
+        return str(context.services.case_manager.get_case(row["bsn"], row["service"], row["wet"]).id)
+    if row["zaak"] == "onbekend":
+        if not hasattr(context, "unknown_case_id"):
+            context.unknown_case_id = str(uuid.uuid4())
+        return context.unknown_case_id
+    return None
+
+
+def count_saves(manager) -> list[int]:
+    """Record the number of aggregates of every save of a manager"""
+    saves = []
+    save = manager.save
+
+    def counting_save(*objs, **kwargs):
+        saves.append(len(objs))
+        return save(*objs, **kwargs)
+
+    manager.save = counting_save
+    return saves
+
+
+@when("de volgende claims in één keer worden ingediend")
+def step_impl(context):
+    claim_manager = context.services.claim_manager
+    context.claims_before = set(claim_manager._claim_statuses)
+    context.claim_saves = count_saves(claim_manager)
+    context.case_saves = count_saves(context.services.case_manager)
+    context.bulk_rows = list(context.table)
+    context.bulk_claim_ids = claim_manager.submit_claims_bulk(
+        [
+            {
+                "service": row["service"],
+                "key": row["key"],
+                "new_value": parse_value(row["nieuwe_waarde"]),
+                "reason": "Gewijzigde situatie",
+                "claimant": "BURGER",
+                "law": row["wet"],
+                "bsn": row["bsn"],
+                "case_id": find_case_id(context, row),
+                "auto_approve": row["automatisch"] == "ja",
+            }
+            for row in context.bulk_rows
+        ]
+    )
+    del claim_manager.save, context.services.case_manager.save
+
+
+@then("zijn de claims")
+def step_impl(context):
+    claim_manager = context.services.claim_manager
+    assertions.assertEqual(len(claim_manager._claim_statuses), len(context.table.rows), "Unexpected number of claims")
+    for row in context.table:
+        claims = claim_manager.get_claim_by_bsn_service_law(row["bsn"], row["service"], row["wet"], include_rejected=True)
+        claim = claims[row["key"]]
+        assertions.assertEqual(claim.new_value, parse_value(row["nieuwe_waarde"]), f"new_value of {row['key']}")
+        assertions.assertEqual(claim.status, row["status"], f"status of {row['key']}")
+        assertions.assertEqual(claim.case_id, find_case_id(context, row), f"case_id of {row['key']}")
+        if row["zaak"] == "bestaand":
+            case = context.services.case_manager.get_case_by_id(claim.case_id)
+            assertions.assertIn(str(claim.id), {str(claim_id) for claim_id in case.claim_ids})
+
+
+@then("zijn de bestaande claims opnieuw ingediend")
+def step_impl(context):
+    assertions.assertTrue(set(context.bulk_claim_ids) <= context.claims_before, "Expected the existing claims")
+
+
+@then("krijgen claims met dezelfde sleutel dezelfde id")
+def step_impl(context):
+    claim_ids = {}
+    for row, claim_id in zip(context.bulk_rows, context.bulk_claim_ids):
+        key = (row["bsn"], row["service"], row["wet"], row["key"])
+        assertions.assertEqual(claim_ids.setdefault(key, claim_id), claim_id, f"claim id of {key}")
+
+
+@then("zijn de claims in {claims:d} keer en de zaken in {cases:d} keer opgeslagen")
+def step_impl(context, claims, cases):
+    assertions.assertEqual(len(context.claim_saves), claims, "Number of claim saves")
+    assertions.assertEqual(len(context.case_saves), cases, "Number of case saves")
+
+
+@given('de {law} is uitgevoerd door {service} voor BSN "{bsn}"')
+def step_impl(context, law, service, bsn):
+    """Evaluate a law like evaluate_law, for another person, to check later whether its result is reused"""
+    if not hasattr(context, "earlier_results"):
+        context.earlier_results = {}
+    context.earlier_results[(law, service, bsn)] = context.services.evaluate(
+        service,
+        law=law,
+        parameters={"BSN": bsn},
+        reference_date=context.root_reference_date,
+        overwrite_input=context.test_data,
+        approved=True,
+    )
+
+
+@when("de wijzigingen worden goedgekeurd")
+def step_impl(context):
+    claim_manager = context.services.claim_manager
+    for claim_id in context.claims:
+        claim_manager.approve_claim(claim_id, "BEOORDELAAR", claim_manager.get_claim(claim_id).new_value)
+
+
+@when("de bezwaarmogelijkheid van de aanvraag wordt bepaald")
+def step_impl(context):
+    case = context.services.case_manager.get_case_by_id(context.case_id)
+    misses = context.services.result_cache.stats()["misses"]
+    context.result = context.services.evaluate(
+        "JenV",
+        "awb/bezwaar",
+        {"ZAAK": {"id": case.id, "rulespec_uuid": case.rulespec_uuid}},
+        context.root_reference_date,
+    )
+    context.recomputed = context.services.result_cache.stats()["misses"] > misses
+
+
+@then("is de uitkomst opnieuw berekend")
+def step_impl(context):
+    assertions.assertTrue(context.recomputed, "Expected the result to be evaluated instead of taken from the cache")
+
+
+@then('is de uitkomst van de {law} door {service} voor BSN "{bsn}" hergebruikt')
+def step_impl(context, law, service, bsn):
+    hits = context.services.result_cache.stats()["hits"]
+    result = context.services.evaluate(
+        service,
+        law=law,
+        parameters={"BSN": bsn},
+        reference_date=context.root_reference_date,
+        overwrite_input=context.test_data,
+        approved=True,
+    )
+    assertions.assertEqual(context.services.result_cache.stats()["hits"], hits + 1, "Expected a cache hit")
+    assertions.assertIs(result, context.earlier_results[(law, service, bsn)], "Expected the earlier result")
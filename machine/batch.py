@@ -0,0 +1,788 @@
+import functools
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .context import RuleContext, TraceLevel, logger
+from .sources import SourceIndex
+
+# Batch values are object-dtype arrays aligned with the rows they were evaluated for, so every element keeps
+# exactly the Python type the scalar engine would produce
+BatchFunction = Callable[["BatchContext", np.ndarray], np.ndarray]
+
+DATE_PATHS = {"calculation_date", "january_first", "prev_january_first", "year"}
+
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+def _objects(values: Iterable[Any], count: int) -> np.ndarray:
+    """Build a 1-d object array without NumPy unpacking nested lists"""
+    return np.fromiter(values, dtype=object, count=count)
+
+
+def _constant(value: Any, count: int) -> np.ndarray:
+    result = np.empty(count, dtype=object)
+    result.fill(value)
+    return result
+
+
+def _truthy(values: np.ndarray) -> np.ndarray:
+    return np.fromiter((bool(v) for v in values), dtype=bool, count=len(values))
+
+
+def _is_none(values: np.ndarray) -> np.ndarray:
+    return np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+
+
+def _contains_instance(values: np.ndarray, types: type | tuple[type, ...]) -> bool:
+    return any(isinstance(v, types) for v in values)
+
+
+def _compare_one(compare: Callable[[Any, Any], bool], left: Any, right: Any) -> bool | None:
+    """Row-wise equivalent of RulesEngine._evaluate_comparison"""
+    if isinstance(left, date) and isinstance(right, str):
+        right = datetime.strptime(right, "%Y-%m-%d").date()
+    elif isinstance(right, date) and isinstance(left, str):
+        left = datetime.strptime(left, "%Y-%m-%d").date()
+
+    try:
+        return compare(left, right)
+    except TypeError:
+        return None
+
+
+def _walk_attributes(value: Any, parts: list[str]) -> Any:
+    """Row-wise equivalent of resolving a dotted $path"""
+    for p in parts:
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            value = value.get(p)
+        elif hasattr(value, p):
+            value = getattr(value, p)
+        else:
+            return None
+    return value
+
+
+def _hashable(value: Any) -> Any:
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return value
+
+
+@dataclass
+class BatchContext:
+    """Context for evaluating one rule spec over a batch of parameter rows"""
+
+    definitions: dict[str, Any]
+    service_provider: Any | None
+    parameters: dict[str, np.ndarray]
+    property_specs: dict[str, dict[str, Any]]
+    output_specs: dict[str, Any]
+    sources: dict[str, pd.DataFrame] | None
+    size: int
+    claims: list[dict[str, Any] | None]
+    calculation_date: str | None = None
+    overwrite_input: dict[str, Any] = field(default_factory=dict)
+    definition_overrides: dict[str, Any] | None = None
+    service_name: str | None = None
+    approved: bool = False
+    outputs: dict[str, np.ndarray] = field(default_factory=dict)
+    missing: np.ndarray | None = None
+    values_cache: dict[str, tuple[Any, bool]] = field(default_factory=dict)
+    source_index: SourceIndex = field(default_factory=SourceIndex)
+    row_contexts: dict[int, RuleContext] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.missing is None:
+            self.missing = np.zeros(self.size, dtype=bool)
+        self.claim_keys = {key for claims in self.claims if claims for key in claims}
+        # Derived tables (laws, events) are rebuilt for every lookup and indexed for that lookup only
+        self.derived_index = SourceIndex()
+        # Scalar context used for row-independent lookups (dates) and as template for per-row fallbacks
+        self.template = self._make_row_context({}, None)
+
+    def _make_row_context(self, parameters: dict[str, Any], claims: dict[str, Any] | None) -> RuleContext:
+        return RuleContext(
+            definitions=self.definitions,
+            service_provider=self.service_provider,
+            parameters=parameters,
+            property_specs=self.property_specs,
+            output_specs=self.output_specs,
+            sources=self.sources,
+            path=[],
+            overwrite_input=self.overwrite_input,
+            definition_overrides=self.definition_overrides,
+            calculation_date=self.calculation_date,
+            service_name=self.service_name,
+            claims=claims,
+            approved=self.approved,
+            trace=TraceLevel.NONE,
+            source_index=self.source_index,
+        )
+
+    def row_context(self, row: int) -> RuleContext:
+        """Get the scalar context for a single row, with the outputs computed so far"""
+        context = self.row_contexts.get(row)
+        if context is None:
+            context = self._make_row_context(
+                {name: values[row] for name, values in self.parameters.items()}, self.claims[row]
+            )
+            self.row_contexts[row] = context
+        context.outputs = {name: values[row] for name, values in self.outputs.items()}
+        return context
+
+
+class BatchEvaluator:
+    """
+    Columnar evaluator for a RulesEngine: evaluates one rule spec for many parameter rows in a single pass.
+
+    Every node is evaluated for a set of rows at once. Source lookups are hash joins on the selection columns
+    and service references are resolved with one batched evaluation per referenced law for all distinct
+    parameter combinations. Short-circuiting (requirements, AND/OR, IF) is applied per row, so rows only
+    evaluate what the scalar engine would evaluate for them. FOREACH operations fall back to the scalar
+    engine per row.
+    """
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self._requirements = self._compile_requirements(engine.requirements)
+        self._actions = {action["output"]: self._compile_action(action) for action in engine.actions}
+        self._select_ons = {
+            name: [self._compile_select_on(select_on) for select_on in spec["source_reference"].get("select_on", [])]
+            for name, spec in engine.property_specs.items()
+            if spec.get("source_reference")
+        }
+        self._service_parameters = {
+            name: (
+                [
+                    (p["name"], self._compile_resolve(p["reference"]))
+                    for p in spec["service_reference"].get("parameters", [])
+                ],
+                self._compile_resolve(spec["temporal"]["reference"])
+                if "temporal" in spec and "reference" in spec["temporal"]
+                else None,
+            )
+            for name, spec in engine.property_specs.items()
+            if spec.get("service_reference")
+        }
+        self._plans: dict[str | None, list[BatchFunction]] = {}
+
+    def get_execution_plan(self, requested_output: str | None = None) -> list[BatchFunction]:
+        """Get the batch actions for requested output in dependency order, memoized per evaluator"""
+        plan = self._plans.get(requested_output)
+        if plan is None:
+            engine = self.engine
+            if requested_output:
+                actions = engine._order_required_actions(
+                    requested_output, engine._dependencies, engine._action_by_output
+                )
+            else:
+                actions = engine.actions
+            plan = [self._actions[action["output"]] for action in actions]
+            self._plans[requested_output] = plan
+        return plan
+
+    def evaluate(
+        self,
+        parameters: dict[str, Any],
+        overwrite_input: dict[str, Any] | None = None,
+        sources: dict[str, pd.DataFrame] | None = None,
+        calculation_date=None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        source_index: SourceIndex | None = None,
+        definition_overrides: dict[str, Any] | None = None,
+    ) -> pd.DataFrame:
+        """Evaluate rules for every row of parameters, returning one row per input row"""
+        engine = self.engine
+        columns = {name: _objects(values, len(values)) for name, values in parameters.items()}
+        sizes = {len(values) for values in columns.values()}
+        if len(sizes) > 1:
+            raise ValueError(f"Batch parameters have different lengths: {sorted(sizes)}")
+        size = sizes.pop() if sizes else 0
+
+        for p in engine.parameter_specs:
+            if p["required"] and p["name"] not in columns:
+                logger.warning("Required parameter %s not found in %s", p, list(columns))
+
+        logger.debug(
+            "Evaluating rules for %s %s (%s %s) for %s rows",
+            engine.service_name,
+            engine.law,
+            calculation_date,
+            requested_output,
+            size,
+        )
+
+        claims = [None] * size
+        if "BSN" in columns:
+            claims_by_bsn = {}
+            for row, bsn in enumerate(columns["BSN"]):
+                if bsn not in claims_by_bsn:
+                    claims_by_bsn[bsn] = engine.service_provider.claim_manager.get_claim_by_bsn_service_law(
+                        bsn, engine.service_name, engine.law, approved=approved
+                    )
+                claims[row] = claims_by_bsn[bsn]
+
+        context = BatchContext(
+            definitions=engine.get_definitions(definition_overrides),
+            service_provider=engine.service_provider,
+            parameters=columns,
+            property_specs=engine.property_specs,
+            output_specs=engine.output_specs,
+            sources=sources,
+            size=size,
+            claims=claims,
+            calculation_date=calculation_date,
+            overwrite_input=overwrite_input or {},
+            definition_overrides=definition_overrides,
+            service_name=engine.service_name,
+            approved=approved,
+            source_index=source_index or SourceIndex(),
+        )
+
+        rows = np.arange(size)
+        requirements_met = self._requirements(context, rows)
+
+        plan = self.get_execution_plan(requested_output)
+        active = rows[requirements_met & ~context.missing]
+        for evaluate_action in plan:
+            if not active.size:
+                break
+            evaluate_action(context, active)
+            # Rows with missing required values stop computing outputs, like the scalar engine does
+            active = active[~context.missing[active]]
+
+        requirements_met = requirements_met & ~context.missing
+        if context.missing.any():
+            logger.warning("Missing required values for %s rows, setting outputs to empty.", int(context.missing.sum()))
+
+        frame = {name: values for name, values in columns.items()}
+        frame["requirements_met"] = requirements_met.astype(object)
+        frame["missing_required"] = context.missing.astype(object)
+        for name, values in context.outputs.items():
+            values[~requirements_met] = None
+            frame[name] = values
+        result = pd.DataFrame(frame)
+        result.attrs["outputs"] = list(context.outputs)
+        return result
+
+    # Compilation
+
+    def _compile_action(self, action: dict[str, Any]) -> BatchFunction:
+        output_name = action["output"]
+        service_name = self.engine.service_name
+        type_spec = self.engine.output_specs.get(output_name)
+
+        if "operation" in action:
+            evaluate_raw = self._compile_operation(action)
+        elif "value" in action:
+            evaluate_raw = self._compile_value(action["value"])
+        else:
+            evaluate_raw = None
+
+        def evaluate_action(b: BatchContext, rows: np.ndarray) -> None:
+            if service_name in b.overwrite_input and output_name in b.overwrite_input[service_name]:
+                raw_result = _constant(b.overwrite_input[service_name][output_name], len(rows))
+            elif evaluate_raw is not None:
+                raw_result = evaluate_raw(b, rows)
+            else:
+                raw_result = _constant(None, len(rows))
+
+            if type_spec is not None:
+                raw_result = _objects((type_spec.enforce(v) for v in raw_result), len(rows))
+
+            if output_name not in b.outputs:
+                b.outputs[output_name] = _constant(None, b.size)
+            b.outputs[output_name][rows] = raw_result
+
+        return evaluate_action
+
+    def _compile_requirements(self, requirements: list) -> Callable[[BatchContext, np.ndarray], np.ndarray]:
+        compiled = [self._compile_requirement(req) for req in requirements or []]
+
+        def evaluate_requirements(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+            met = np.ones(len(rows), dtype=bool)
+            remaining = np.arange(len(rows))
+            for evaluate_requirement in compiled:
+                if not remaining.size:
+                    break
+                ok = evaluate_requirement(b, rows[remaining])
+                met[remaining[~ok]] = False
+                remaining = remaining[ok]
+            return met
+
+        return evaluate_requirements
+
+    def _compile_requirement(self, req: dict[str, Any]) -> Callable[[BatchContext, np.ndarray], np.ndarray]:
+        if "all" in req:
+            return self._compile_requirements(req["all"])
+
+        if "or" in req:
+            sub_requirements = [self._compile_requirements([r]) for r in req["or"]]
+
+            def evaluate_or(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                met = np.zeros(len(rows), dtype=bool)
+                remaining = np.arange(len(rows))
+                for evaluate_sub in sub_requirements:
+                    if not remaining.size:
+                        break
+                    ok = evaluate_sub(b, rows[remaining])
+                    met[remaining[ok]] = True
+                    remaining = remaining[~ok]
+                return met
+
+            return evaluate_or
+
+        evaluate_condition = self._compile_operation(req)
+        return lambda b, rows: _truthy(evaluate_condition(b, rows))
+
+    def _compile_value(self, value: Any) -> BatchFunction:
+        if isinstance(value, int | float | bool | date | datetime) or value is None:
+            return lambda b, rows: _constant(value, len(rows))
+        if isinstance(value, dict) and "operation" in value:
+            return self._compile_operation(value)
+        return self._compile_resolve(value)
+
+    def _compile_resolve(self, value: Any) -> BatchFunction:
+        """Batch equivalent of RuleContext.resolve_value"""
+        if not isinstance(value, str) or not value.startswith("$"):
+            return lambda b, rows: _constant(value, len(rows))
+
+        path = value[1:]
+
+        if path in DATE_PATHS:
+
+            def resolve_date(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                result = b.template._resolve_date(path)
+                if result is not None:
+                    return _constant(result, len(rows))
+                return self._lookup(b, path, rows)
+
+            return resolve_date
+
+        if "." in path:
+            root, rest = path.split(".", 1)
+            resolve_root = self._compile_resolve(f"${root}")
+            parts = rest.split(".")
+
+            def resolve_attribute(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                return _objects((_walk_attributes(v, parts) for v in resolve_root(b, rows)), len(rows))
+
+            return resolve_attribute
+
+        return lambda b, rows: self._lookup(b, path, rows)
+
+    def _compile_select_on(self, select_on: dict[str, Any]) -> tuple[str, bool, BatchFunction]:
+        value = select_on["value"]
+        if isinstance(value, dict) and value.get("operation") == "IN":
+            return select_on["name"], True, self._compile_resolve(value["values"])
+        return select_on["name"], False, self._compile_resolve(value)
+
+    def _compile_operation(self, operation: Any) -> BatchFunction:
+        if not isinstance(operation, dict):
+            return self._compile_value(operation)
+
+        # Direct value assignment - no operation needed
+        if "value" in operation and not operation.get("operation"):
+            return self._compile_value(operation["value"])
+
+        op_type = operation.get("operation")
+
+        if op_type is None:
+
+            def evaluate_missing(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                logger.warning("Operation type is None (or missing).")
+                return _constant(None, len(rows))
+
+            return evaluate_missing
+
+        if op_type == "IF":
+            return self._compile_if_operation(operation)
+
+        if op_type == "FOREACH":
+            return self._compile_per_row(operation)
+
+        if op_type in ["IN", "NOT_IN"]:
+            evaluate_subject = self._compile_value(operation.get("subject"))
+            evaluate_allowed = self._compile_value(operation.get("values", []))
+            negate = op_type == "NOT_IN"
+
+            def contains(subject: Any, allowed_values: Any) -> bool:
+                result = subject in (
+                    allowed_values if isinstance(allowed_values, list | dict | set) else [allowed_values]
+                )
+                return not result if negate else result
+
+            def evaluate_in(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                subjects = evaluate_subject(b, rows)
+                allowed = evaluate_allowed(b, rows)
+                return _objects(map(contains, subjects, allowed), len(rows))
+
+            return evaluate_in
+
+        if op_type in ["NOT_NULL", "IS_NULL"]:
+            evaluate_subject = self._compile_value(operation.get("subject"))
+            expect_null = op_type == "IS_NULL"
+
+            def evaluate_null_check(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                is_none = _is_none(evaluate_subject(b, rows))
+                return (is_none if expect_null else ~is_none).astype(object)
+
+            return evaluate_null_check
+
+        if op_type in ["AND", "OR"]:
+            evaluate_values = [self._compile_value(v) for v in operation.get("values", [])]
+            stop_on = op_type == "OR"
+
+            def evaluate_logical(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                result = np.full(len(rows), not stop_on, dtype=bool)
+                remaining = np.arange(len(rows))
+                for evaluate_value in evaluate_values:
+                    if not remaining.size:
+                        break
+                    truth = _truthy(evaluate_value(b, rows[remaining]))
+                    stopped = truth if stop_on else ~truth
+                    result[remaining[stopped]] = stop_on
+                    remaining = remaining[~stopped]
+                return result.astype(object)
+
+            return evaluate_logical
+
+        if "_DATE" in op_type:
+            evaluate_values = [self._compile_value(v) for v in operation.get("values", [])]
+            unit = operation.get("unit", "days")
+            evaluate_date_operation = self.engine._evaluate_date_operation
+
+            def evaluate_date(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                columns = [evaluate_value(b, rows) for evaluate_value in evaluate_values]
+                return _objects(
+                    (evaluate_date_operation(op_type, list(values), unit, b.template) for values in zip(*columns)),
+                    len(rows),
+                )
+
+            return evaluate_date
+
+        if op_type in self.engine.COMPARISON_OPS:
+            return self._compile_comparison(op_type, operation)
+
+        if op_type in self.engine.AGGREGATE_OPS and "values" in operation:
+            return self._compile_aggregate(op_type, operation)
+
+        if op_type == "GET":
+            evaluate_subject = self._compile_value(operation.get("subject"))
+            evaluate_mapping = self._compile_value(operation.get("values", []))
+
+            def evaluate_get(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                subjects = evaluate_subject(b, rows)
+                mappings = evaluate_mapping(b, rows)
+                return _objects((values.get(subject) for subject, values in zip(subjects, mappings)), len(rows))
+
+            return evaluate_get
+
+        def evaluate_invalid(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+            logger.warning("Not matched to any operation %s", op_type)
+            return _constant(None, len(rows))
+
+        return evaluate_invalid
+
+    def _compile_if_operation(self, operation: dict[str, Any]) -> BatchFunction:
+        conditions = []
+        for condition in operation.get("conditions", []):
+            if "test" in condition:
+                conditions.append(
+                    ("test", self._compile_operation(condition["test"]), self._compile_value(condition.get("then")))
+                )
+            elif "else" in condition:
+                conditions.append(("else", None, self._compile_value(condition["else"])))
+
+        def evaluate_if(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+            result = _constant(0, len(rows))
+            remaining = np.arange(len(rows))
+            for kind, evaluate_test, evaluate_result in conditions:
+                if not remaining.size:
+                    break
+                if kind == "test":
+                    truth = _truthy(evaluate_test(b, rows[remaining]))
+                    matched = remaining[truth]
+                    if matched.size:
+                        result[matched] = evaluate_result(b, rows[matched])
+                    remaining = remaining[~truth]
+                else:
+                    result[remaining] = evaluate_result(b, rows[remaining])
+                    remaining = _NO_ROWS
+            return result
+
+        return evaluate_if
+
+    def _compile_per_row(self, operation: dict[str, Any]) -> BatchFunction:
+        """Evaluate an operation with the scalar engine, one row at a time"""
+        evaluate_scalar = self.engine._compile_operation(operation)
+
+        def evaluate_per_row(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+            result = np.empty(len(rows), dtype=object)
+            for j, row in enumerate(rows):
+                context = b.row_context(row)
+                result[j] = evaluate_scalar(context)
+                if context.missing_required:
+                    b.missing[row] = True
+            return result
+
+        return evaluate_per_row
+
+    def _compile_comparison(self, op_type: str, operation: dict[str, Any]) -> BatchFunction:
+        compare = self.engine.COMPARISON_OPS[op_type]
+
+        if "subject" in operation:
+            evaluate_subject = self._compile_value(operation["subject"])
+            evaluate_other = self._compile_value(operation.get("value"))
+        elif "values" in operation:
+            evaluate_subject, evaluate_other = (self._compile_value(v) for v in operation["values"][:2])
+        else:
+
+            def evaluate_subject(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                logger.warning("Comparison operation expects two values or subject/value.")
+                return _constant(None, len(rows))
+
+            def evaluate_other(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+                return _constant(None, len(rows))
+
+        evaluate_rest = (
+            [self._compile_value(v) for v in operation.get("values", [])[2:]] if "subject" not in operation else []
+        )
+
+        def evaluate_comparison(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+            left = evaluate_subject(b, rows)
+            right = evaluate_other(b, rows)
+            for evaluate_value in evaluate_rest:
+                # Evaluated for their side effects only, like the scalar engine does
+                evaluate_value(b, rows)
+
+            # Element-wise on the object arrays unless a row needs date coercion or cannot be compared
+            if not (_contains_instance(left, date) or _contains_instance(right, date)):
+                try:
+                    return np.asarray(compare(left, right)).astype(object)
+                except TypeError:
+                    pass
+            return _objects(map(functools.partial(_compare_one, compare), left, right), len(rows))
+
+        return evaluate_comparison
+
+    def _compile_aggregate(self, op_type: str, operation: dict[str, Any]) -> BatchFunction:
+        aggregate = self.engine.AGGREGATE_OPS[op_type]
+        evaluate_values = [self._compile_value(v) for v in operation["values"]]
+
+        def aggregate_row(values: tuple) -> Any:
+            filtered_values = [v for v in values if v is not None]
+            if not filtered_values:
+                return 0
+            return aggregate(filtered_values)
+
+        def evaluate_aggregate(b: BatchContext, rows: np.ndarray) -> np.ndarray:
+            columns = [evaluate_value(b, rows) for evaluate_value in evaluate_values]
+            if not columns:
+                return _constant(0, len(rows))
+
+            if op_type in ["ADD", "SUBTRACT"] and not any(_is_none(column).any() for column in columns):
+                # Element-wise Python arithmetic on the object arrays, in the same order as sum()/reduce()
+                try:
+                    if op_type == "ADD":
+                        return functools.reduce(np.add, columns, 0)
+                    return functools.reduce(np.subtract, columns[1:], columns[0])
+                except TypeError:
+                    pass
+
+            return _objects(map(aggregate_row, zip(*columns)), len(rows))
+
+        return evaluate_aggregate
+
+    # Resolving
+
+    def _lookup(self, b: BatchContext, path: str, rows: np.ndarray) -> np.ndarray:
+        """Batch equivalent of RuleContext._lookup_value for a plain $path; claims take precedence per row"""
+        if path in b.claim_keys:
+            claimed = np.fromiter(
+                (b.claims[row] is not None and path in b.claims[row] for row in rows), dtype=bool, count=len(rows)
+            )
+            if claimed.any():
+                result = np.empty(len(rows), dtype=object)
+                claimed_rows = rows[claimed]
+                result[claimed] = _objects((b.claims[row][path].new_value for row in claimed_rows), len(claimed_rows))
+                if not claimed.all():
+                    result[~claimed] = self._lookup_unclaimed(b, path, rows[~claimed])
+                return result
+
+        return self._lookup_unclaimed(b, path, rows)
+
+    def _lookup_unclaimed(self, b: BatchContext, path: str, rows: np.ndarray) -> np.ndarray:
+        # Local scope only exists inside FOREACH, which is evaluated per row by the scalar engine
+
+        # Check definitions
+        if path in b.definitions:
+            definition_value = b.definitions[path]
+            if isinstance(definition_value, dict) and "value" in definition_value and "legal_basis" in definition_value:
+                definition_value = definition_value["value"]
+            return _constant(definition_value, len(rows))
+
+        # Check parameters
+        if path in b.parameters:
+            return b.parameters[path][rows]
+
+        # Check outputs
+        if path in b.outputs:
+            return b.outputs[path][rows]
+
+        spec = b.property_specs.get(path)
+        if spec is not None:
+            # Check overwrite data
+            service_ref = spec.get("service_reference", {})
+            if (
+                service_ref
+                and service_ref["service"] in b.overwrite_input
+                and service_ref["field"] in b.overwrite_input[service_ref["service"]]
+            ):
+                return _constant(b.overwrite_input[service_ref["service"]][service_ref["field"]], len(rows))
+
+            # Check sources
+            source_ref = spec.get("source_reference", {})
+            if source_ref:
+                df = None
+                table = None
+                if source_ref.get("source_type") == "laws":
+                    table = "laws"
+                    df = b.service_provider.resolver.rules_dataframe()
+                if source_ref.get("source_type") == "events":
+                    table = "events"
+                    df = pd.DataFrame(b.service_provider.case_manager.get_events())
+                elif b.sources and "table" in source_ref:
+                    table = source_ref.get("table")
+                    if table in b.sources:
+                        df = b.sources[table]
+
+                if df is not None:
+                    return self._resolve_from_source(b, rows, path, source_ref, table, df)
+
+            # Check services
+            if service_ref and b.service_provider:
+                return self._resolve_from_service(b, rows, path, service_ref)
+
+        logger.warning("Could not resolve value for %s (%s rows)", path, len(rows))
+        if spec is not None and spec.get("required", False):
+            b.missing[rows] = True
+            logger.warning("This is a missing required value: %s", path)
+
+        return _constant(None, len(rows))
+
+    def _resolve_from_source(
+        self,
+        b: BatchContext,
+        rows: np.ndarray,
+        path: str,
+        source_ref: dict[str, Any],
+        table: str,
+        df: pd.DataFrame,
+    ) -> np.ndarray:
+        """Batch equivalent of RuleContext._resolve_from_source, as a hash join on the select_on columns"""
+        select_ons = self._select_ons.get(path, [])
+        selections = [(name, is_in, select(b, rows)) for name, is_in, select in select_ons]
+
+        source_index = b.source_index if b.sources and b.sources.get(table) is df else b.derived_index
+
+        fields = source_ref.get("fields", [])
+        field_name = source_ref.get("field")
+        if fields:
+            missing_fields = [f for f in fields if f not in df.columns]
+            if missing_fields:
+                logger.warning("Fields %s not found in source for table %s", missing_fields, table)
+            fields_key = tuple(f for f in fields if f in df.columns)
+        elif field_name:
+            if field_name not in df.columns:
+                logger.warning("Field %s not found in source for table %s", field_name, table)
+                return _constant(None, len(rows))
+            fields_key = field_name
+        else:
+            fields_key = None
+
+        def lookup(key: tuple) -> Any:
+            positions = source_index.select(
+                table, df, [(name, value, is_in) for (name, is_in, _), value in zip(selections, key)]
+            )
+            values = source_index.take(table, df, positions, fields_key)
+            if len(values) == 0:
+                return None
+            if len(values) == 1:
+                return values[0]
+            return values
+
+        # Rows selecting on the same values share one lookup
+        result = np.empty(len(rows), dtype=object)
+        by_key = {}
+        for j in range(len(rows)):
+            key = tuple(selected[j] for _, _, selected in selections)
+            memo_key = _hashable(key)
+            if memo_key is None:
+                result[j] = lookup(key)
+                continue
+            if memo_key not in by_key:
+                by_key[memo_key] = lookup(key)
+            result[j] = by_key[memo_key]
+        return result
+
+    def _resolve_from_service(
+        self, b: BatchContext, rows: np.ndarray, path: str, service_ref: dict[str, Any]
+    ) -> np.ndarray:
+        """Batch equivalent of RuleContext._resolve_from_service, one batched evaluation per reference date"""
+        reference_parameters, reference_temporal = self._service_parameters[path]
+
+        parameters = {name: values[rows] for name, values in b.parameters.items()}
+        for name, resolve in reference_parameters:
+            parameters[name] = resolve(b, rows)
+
+        if reference_temporal is not None:
+            reference_dates = reference_temporal(b, rows)
+        else:
+            reference_dates = _constant(b.calculation_date, len(rows))
+
+        names = sorted(parameters)
+        keys = [
+            f"{path}({','.join([f'{k}:{parameters[k][j]}' for k in names])},{reference_dates[j]})"
+            for j in range(len(rows))
+        ]
+
+        pending_by_date = defaultdict(dict)
+        for j, key in enumerate(keys):
+            if key not in b.values_cache:
+                pending_by_date[reference_dates[j]].setdefault(key, j)
+
+        for reference_date, pending in pending_by_date.items():
+            positions = list(pending.values())
+            logger.debug(
+                "Resolving from %s field %s for %s rows", service_ref["service"], service_ref["field"], len(positions)
+            )
+            result = b.service_provider.services[service_ref["service"]].evaluate_batch(
+                service_ref["law"],
+                reference_date or b.service_provider.root_reference_date,
+                {name: values[positions] for name, values in parameters.items()},
+                overwrite_input=b.overwrite_input,
+                requested_output=service_ref["field"],
+                approved=b.approved,
+                definition_overrides=b.definition_overrides,
+            )
+            values = result[service_ref["field"]] if service_ref["field"] in result else [None] * len(positions)
+            for key, value, missing in zip(pending, values, result["missing_required"]):
+                b.values_cache[key] = (value, bool(missing))
+
+        cached = [b.values_cache[key] for key in keys]
+        missing = np.fromiter((m for _, m in cached), dtype=bool, count=len(rows))
+        if missing.any():
+            b.missing[rows[missing]] = True
+        return _objects((v for v, _ in cached), len(rows))
@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+
+def freeze(value: Any) -> Hashable:
+    """Turn (nested) evaluation arguments into a hashable cache key, raises TypeError if that is not possible"""
+    if isinstance(value, dict):
+        return (dict, tuple(sorted(((k, freeze(v)) for k, v in value.items()), key=lambda item: repr(item[0]))))
+    if isinstance(value, list | tuple):
+        return (type(value), tuple(freeze(v) for v in value))
+    if isinstance(value, set | frozenset):
+        return (frozenset, frozenset(freeze(v) for v in value))
+    hash(value)
+    # Keep 1, 1.0 and True apart, rules may treat them differently
+    return (type(value), value)
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of evaluation results, shared between evaluations.
+
+    Every entry records the state its result was computed from, e.g. ("claim", bsn, service, law) or
+    ("source", service), including everything nested evaluations used. Invalidating such a dependency
+    drops exactly the entries that depend on it. Cached results are shared, so treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, frozenset]] = OrderedDict()
+        self._dependents: dict[Hashable, set[Hashable]] = {}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _recordings(self) -> list[set]:
+        recordings = getattr(self._local, "recordings", None)
+        if recordings is None:
+            recordings = self._local.recordings = []
+        return recordings
+
+    def depend_on(self, dependencies: set | frozenset) -> None:
+        """Add dependencies to the evaluation being recorded in this thread, if any"""
+        recordings = self._recordings()
+        if recordings:
+            recordings[-1].update(dependencies)
+
+    @contextmanager
+    def recording(self) -> Iterator[set]:
+        """Collect the dependencies of an evaluation; they are passed on to the enclosing evaluation"""
+        dependencies = set()
+        recordings = self._recordings()
+        recordings.append(dependencies)
+        try:
+            yield dependencies
+        finally:
+            recordings.pop()
+            self.depend_on(dependencies)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Get a cached result (None if not cached), counting hits and misses"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        self.depend_on(entry[1])
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, dependencies: set | frozenset) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._discard(key)
+            dependencies = frozenset(dependencies)
+            self._entries[key] = (value, dependencies)
+            for dependency in dependencies:
+                self._dependents.setdefault(dependency, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, dependency: Hashable) -> None:
+        """Drop all entries that depend on the given dependency"""
+        with self._lock:
+            for key in list(self._dependents.get(dependency, ())):
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dependents.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for dependency in entry[1]:
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dependency]
@@ -1,13 +1,16 @@
 import logging
+from concurrent.futures import Future
 from copy import copy
 from dataclasses import dataclass, field
 from datetime import datetime
+from enum import Enum
 from typing import Any
 
 import pandas as pd
 
 from machine.events.claim.aggregate import Claim
 from machine.logging_config import IndentLogger
+from machine.sources import SourceIndex
 
 logger = IndentLogger(logging.getLogger("service"))
 
@@ -57,6 +60,14 @@ class TypeSpec:
         return value
 
 
+class TraceLevel(str, Enum):
+    """How much of the evaluation path is recorded"""
+
+    NONE = "none"  # Only outputs, no PathNode tree and no resolved inputs
+    INPUTS_ONLY = "inputs-only"  # Only the resolve and service nodes used by Services.extract_value_tree
+    FULL = "full"  # Complete explanation tree
+
+
 @dataclass
 class PathNode:
     """Node for tracking evaluation path"""
@@ -85,6 +96,8 @@ class RuleContext:
     values_cache: dict[str, Any] = field(default_factory=dict)
     path: list[PathNode] = field(default_factory=list)
     overwrite_input: dict[str, Any] = field(default_factory=dict)
+    # Definition overrides of every service and law, passed on to service references
+    definition_overrides: dict[str, Any] | None = None
     outputs: dict[str, Any] = field(default_factory=dict)
     calculation_date: str | None = None
     resolved_paths: dict[str, Any] = field(default_factory=dict)
@@ -92,6 +105,9 @@ class RuleContext:
     claims: dict[str:Claim] = None
     approved: bool | None = True
     missing_required: bool | None = False
+    trace: TraceLevel = TraceLevel.FULL
+    source_index: SourceIndex | None = None
+    prefetched: dict[str, Future] = field(default_factory=dict)
 
     def track_access(self, path: str) -> None:
         """Track accessed data paths"""
@@ -110,12 +126,16 @@ class RuleContext:
 
     def resolve_value(self, path: str) -> Any:
         value = self._resolve_value(path)
-        if isinstance(path, str):
+        if isinstance(path, str) and self.trace is not TraceLevel.NONE:
             self.resolved_paths[path] = value
         return value
 
     def _resolve_value(self, path: str) -> Any:
         """Resolve a value from definitions, services, or sources"""
+        if self.trace is TraceLevel.NONE:
+            with logger.indent_block("Resolving %s", path):
+                return self._lookup_value(path, None)
+
         node = PathNode(
             type="resolve",
             name=f"Resolving value: {path}",
@@ -125,198 +145,164 @@ class RuleContext:
         self.add_to_path(node)
 
         try:
-            with logger.indent_block(f"Resolving {path}"):
-                if not isinstance(path, str) or not path.startswith("$"):
-                    node.result = path
-                    return path
-
-                path = path[1:]  # Remove $ prefix
-                self.track_access(path)
-
-                # Resolve dates
-                value = self._resolve_date(path)
-                if value is not None:
-                    logger.debug(f"Resolved date ${path}: {value}")
-                    node.result = value
-                    return value
-
-                if "." in path:
-                    root, rest = path.split(".", 1)
-                    value = self.resolve_value(f"${root}")
-                    for p in rest.split("."):
-                        if value is None:
-                            logger.warning(f"Value is None, could not resolve value ${path}: None")
-                            node.result = None
-                            return None
-                        if isinstance(value, dict):
-                            value = value.get(p)
-                        elif hasattr(value, p):
-                            value = getattr(value, p)
-                        else:
-                            logger.warning(f"Value is not dict or not object, could not resolve value ${path}: None")
-                            node.result = None
-                            return None
-
-                    logger.debug(f"Resolved value ${path}: {value}")
-                    node.result = value
-                    return value
-
-                # Claims first
-                if isinstance(self.claims, dict) and path in self.claims:
-                    claim = self.claims.get(path)
-                    value = claim.new_value
-                    logger.debug(f"Resolving from CLAIM: {value}")
-                    node.result = value
-                    node.resolve_type = "CLAIM"
-
-                    # Add type information for claims as well
-                    if path in self.property_specs:
-                        spec = self.property_specs[path]
-                        if "type" in spec:
-                            node.details["type"] = spec["type"]
-                        if "type_spec" in spec:
-                            node.details["type_spec"] = spec["type_spec"]
-                        node.required = bool(spec.get("required", False))
-
-                    return value
-
-                # Check local scope
-                if path in self.local:
-                    logger.debug(f"Resolving from LOCAL: {self.local[path]}")
-                    node.result = self.local[path]
-                    node.resolve_type = "LOCAL"
-                    return self.local[path]
-
-                # Check definitions
-                if path in self.definitions:
-                    definition_value = self.definitions[path]
-                    # If definition contains both 'value' and 'legal_basis', extract only the value
-                    if (
-                        isinstance(definition_value, dict)
-                        and "value" in definition_value
-                        and "legal_basis" in definition_value
-                    ):
-                        actual_value = definition_value["value"]
-                        logger.debug(f"Resolving from DEFINITION (extracted value): {actual_value}")
-                        node.result = actual_value
-                        node.resolve_type = "DEFINITION"
-                        return actual_value
-                    else:
-                        logger.debug(f"Resolving from DEFINITION: {definition_value}")
-                        node.result = definition_value
-                        node.resolve_type = "DEFINITION"
-                        return definition_value
-
-                # Check parameters
-                if path in self.parameters:
-                    logger.debug(f"Resolving from PARAMETERS: {self.parameters[path]}")
-                    node.result = self.parameters[path]
-                    node.resolve_type = "PARAMETER"
-                    return self.parameters[path]
-
-                # Check outputs
-                if path in self.outputs:
-                    logger.debug(f"Resolving from previous OUTPUT: {self.outputs[path]}")
-                    node.result = self.outputs[path]
-                    node.resolve_type = "OUTPUT"
-                    return self.outputs[path]
-
-                # Check overwrite data
-                if path in self.property_specs:
-                    spec = self.property_specs[path]
-                    service_ref = spec.get("service_reference", {})
-                    if (
-                        service_ref
-                        and service_ref["service"] in self.overwrite_input
-                        and service_ref["field"] in self.overwrite_input[service_ref["service"]]
-                    ):
-                        value = self.overwrite_input[service_ref["service"]][service_ref["field"]]
-                        logger.debug(f"Resolving from OVERWRITE: {value}")
-                        node.result = value
-                        node.resolve_type = "OVERWRITE"
-                        return value
-
-                # Check sources
-                if path in self.property_specs:
-                    spec = self.property_specs[path]
-                    source_ref = spec.get("source_reference", {})
-                    if source_ref:
-                        df = None
-                        table = None
-                        if source_ref.get("source_type") == "laws":
-                            table = "laws"
-                            df = self.service_provider.resolver.rules_dataframe()
-                        if source_ref.get("source_type") == "events":
-                            table = "events"
-                            events = self.service_provider.case_manager.get_events()
-                            df = pd.DataFrame(events)
-                        elif self.sources and "table" in source_ref:
-                            table = source_ref.get("table")
-                            if table in self.sources:
-                                df = self.sources[table]
-
-                        if df is not None:
-                            result = self._resolve_from_source(source_ref, table, df)
-                            logger.debug(f"Resolving from SOURCE {table}: {result}")
-                            node.result = result
-                            node.resolve_type = "SOURCE"
-                            node.required = bool(spec.get("required", False))
-
-                            # Add type information to the node
-                            if "type" in spec:
-                                node.details["type"] = spec["type"]
-                            if "type_spec" in spec:
-                                # Gebruik helper-methode om enum-referenties op te lossen
-                                resolved_type_spec = self._resolve_type_spec_enums(spec, spec["type_spec"])
-                                node.details["type_spec"] = resolved_type_spec
-
-                            return result
-
-                # Check services
-                if path in self.property_specs:
-                    spec = self.property_specs[path]
-                    service_ref = spec.get("service_reference", {})
-                    if service_ref and self.service_provider:
-                        value = self._resolve_from_service(path, service_ref, spec)
-                        logger.debug(
-                            f"Result for ${path} from {service_ref['service']} field {service_ref['field']}: {value}"
-                        )
-                        node.result = value
-                        node.resolve_type = "SERVICE"
-                        node.required = bool(spec.get("required", False))
-
-                        # Add type information to the node
-                        if "type" in spec:
-                            node.details["type"] = spec["type"]
-                        if "type_spec" in spec:
-                            # Gebruik helper-methode om enum-referenties op te lossen
-                            resolved_type_spec = self._resolve_type_spec_enums(spec, spec["type_spec"])
-                            node.details["type_spec"] = resolved_type_spec
-
-                        return value
-
-                logger.warning(f"Could not resolve value for {path}")
-                node.result = None
-                node.resolve_type = "NONE"
-
-                if path in self.property_specs:
-                    spec = self.property_specs[path]
-                    node.required = bool(spec.get("required", False))
-                    if node.required:
-                        self.missing_required = True
-                        logger.warning(f"This is a missing required value: {path}")
-
-                    if "type" in spec:
-                        node.details["type"] = spec["type"]
-                    if "type_spec" in spec:
-                        # Gebruik helper-methode om enum-referenties op te lossen
-                        resolved_type_spec = self._resolve_type_spec_enums(spec, spec["type_spec"])
-                        node.details["type_spec"] = resolved_type_spec
-
-                return None
+            with logger.indent_block("Resolving %s", path):
+                return self._lookup_value(path, node)
         finally:
             self.pop_path()
 
+    def _traced(
+        self,
+        node: PathNode | None,
+        value: Any,
+        resolve_type: str | None = None,
+        spec: dict[str, Any] | None = None,
+        resolve_enums: bool = True,
+    ) -> Any:
+        """Record a resolved value (and its type information) on the resolve node, if tracing"""
+        if node is None:
+            return value
+
+        node.result = value
+        node.resolve_type = resolve_type
+        if spec is not None:
+            node.required = bool(spec.get("required", False))
+            if "type" in spec:
+                node.details["type"] = spec["type"]
+            if "type_spec" in spec:
+                # Gebruik helper-methode om enum-referenties op te lossen
+                node.details["type_spec"] = (
+                    self._resolve_type_spec_enums(spec, spec["type_spec"]) if resolve_enums else spec["type_spec"]
+                )
+        return value
+
+    def _lookup_value(self, path: str, node: PathNode | None) -> Any:
+        if not isinstance(path, str) or not path.startswith("$"):
+            return self._traced(node, path)
+
+        path = path[1:]  # Remove $ prefix
+        self.track_access(path)
+
+        # Resolve dates
+        value = self._resolve_date(path)
+        if value is not None:
+            logger.debug("Resolved date $%s: %s", path, value)
+            return self._traced(node, value)
+
+        if "." in path:
+            root, rest = path.split(".", 1)
+            value = self.resolve_value(f"${root}")
+            for p in rest.split("."):
+                if value is None:
+                    logger.warning("Value is None, could not resolve value $%s: None", path)
+                    return self._traced(node, None)
+                if isinstance(value, dict):
+                    value = value.get(p)
+                elif hasattr(value, p):
+                    value = getattr(value, p)
+                else:
+                    logger.warning("Value is not dict or not object, could not resolve value $%s: None", path)
+                    return self._traced(node, None)
+
+            logger.debug("Resolved value $%s: %s", path, value)
+            return self._traced(node, value)
+
+        # Claims first
+        if isinstance(self.claims, dict) and path in self.claims:
+            claim = self.claims.get(path)
+            value = claim.new_value
+            logger.debug("Resolving from CLAIM: %s", value)
+
+            # Add type information for claims as well
+            return self._traced(node, value, "CLAIM", self.property_specs.get(path), resolve_enums=False)
+
+        # Check local scope
+        if path in self.local:
+            logger.debug("Resolving from LOCAL: %s", self.local[path])
+            return self._traced(node, self.local[path], "LOCAL")
+
+        # Check definitions
+        if path in self.definitions:
+            definition_value = self.definitions[path]
+            # If definition contains both 'value' and 'legal_basis', extract only the value
+            if isinstance(definition_value, dict) and "value" in definition_value and "legal_basis" in definition_value:
+                actual_value = definition_value["value"]
+                logger.debug("Resolving from DEFINITION (extracted value): %s", actual_value)
+                return self._traced(node, actual_value, "DEFINITION")
+            else:
+                logger.debug("Resolving from DEFINITION: %s", definition_value)
+                return self._traced(node, definition_value, "DEFINITION")
+
+        # Check parameters
+        if path in self.parameters:
+            logger.debug("Resolving from PARAMETERS: %s", self.parameters[path])
+            return self._traced(node, self.parameters[path], "PARAMETER")
+
+        # Check outputs
+        if path in self.outputs:
+            logger.debug("Resolving from previous OUTPUT: %s", self.outputs[path])
+            return self._traced(node, self.outputs[path], "OUTPUT")
+
+        # Check overwrite data
+        if path in self.property_specs:
+            spec = self.property_specs[path]
+            service_ref = spec.get("service_reference", {})
+            if (
+                service_ref
+                and service_ref["service"] in self.overwrite_input
+                and service_ref["field"] in self.overwrite_input[service_ref["service"]]
+            ):
+                value = self.overwrite_input[service_ref["service"]][service_ref["field"]]
+                logger.debug("Resolving from OVERWRITE: %s", value)
+                return self._traced(node, value, "OVERWRITE")
+
+        # Check sources
+        if path in self.property_specs:
+            spec = self.property_specs[path]
+            source_ref = spec.get("source_reference", {})
+            if source_ref:
+                df = None
+                table = None
+                if source_ref.get("source_type") == "laws":
+                    table = "laws"
+                    df = self.service_provider.resolver.rules_dataframe()
+                if source_ref.get("source_type") == "events":
+                    table = "events"
+                    events = self.service_provider.case_manager.get_events()
+                    df = pd.DataFrame(events)
+                elif self.sources and "table" in source_ref:
+                    table = source_ref.get("table")
+                    if table in self.sources:
+                        df = self.sources[table]
+
+                if df is not None:
+                    result = self._resolve_from_source(source_ref, table, df)
+                    logger.debug("Resolving from SOURCE %s: %s", table, result)
+
+                    # Add type information to the node
+                    return self._traced(node, result, "SOURCE", spec)
+
+        # Check services
+        if path in self.property_specs:
+            spec = self.property_specs[path]
+            service_ref = spec.get("service_reference", {})
+            if service_ref and self.service_provider:
+                value = self._resolve_from_service(path, service_ref, spec)
+                logger.debug(
+                    "Result for $%s from %s field %s: %s", path, service_ref["service"], service_ref["field"], value
+                )
+
+                # Add type information to the node
+                return self._traced(node, value, "SERVICE", spec)
+
+        logger.warning("Could not resolve value for %s", path)
+
+        spec = self.property_specs.get(path)
+        if spec is not None and spec.get("required", False):
+            self.missing_required = True
+            logger.warning("This is a missing required value: %s", path)
+
+        return self._traced(node, None, "NONE", spec)
+
     def _resolve_date(self, path):
         if path == "calculation_date":
             return self.calculation_date
@@ -330,6 +316,87 @@ class RuleContext:
             return self.calculation_date[:4]
         return None
 
+    @staticmethod
+    def _service_cache_key(path, parameters, reference_date):
+        return f"{path}({','.join([f'{k}:{v}' for k, v in sorted(parameters.items())])},{reference_date})"
+
+    def _static_value(self, reference):
+        """Resolve a reference without side effects if it needs no sources or services, else raise KeyError"""
+        if not isinstance(reference, str) or not reference.startswith("$"):
+            return reference
+        path = reference[1:]
+        value = self._resolve_date(path)
+        if value is not None:
+            return value
+        if "." in path or path in self.local:
+            raise KeyError(path)
+        if isinstance(self.claims, dict) and path in self.claims:
+            return self.claims[path].new_value
+        if path in self.definitions:
+            definition_value = self.definitions[path]
+            if isinstance(definition_value, dict) and "value" in definition_value and "legal_basis" in definition_value:
+                return definition_value["value"]
+            return definition_value
+        if path in self.parameters:
+            return self.parameters[path]
+        raise KeyError(path)
+
+    def prefetch_services(self, paths: list[str]) -> None:
+        """
+        Start evaluating service references in the background, before evaluation reaches them.
+
+        Only references resolved from a service whose parameters and reference date are known upfront
+        (parameters, definitions, claims and dates) are prefetched. The background evaluations fill the
+        service provider's result cache; _resolve_from_service waits for them and then resolves as usual.
+        """
+        for path in paths:
+            if (
+                path in self.outputs
+                or path in self.local
+                or path in self.definitions
+                or path in self.parameters
+                or (isinstance(self.claims, dict) and path in self.claims)
+            ):
+                continue
+
+            spec = self.property_specs[path]
+            service_ref = spec["service_reference"]
+            if (
+                service_ref["service"] in self.overwrite_input
+                and service_ref["field"] in self.overwrite_input[service_ref["service"]]
+            ):
+                continue
+
+            try:
+                parameters = copy(self.parameters)
+                parameters.update(
+                    {p["name"]: self._static_value(p["reference"]) for p in service_ref.get("parameters", [])}
+                )
+                reference_date = self.calculation_date
+                if "temporal" in spec and "reference" in spec["temporal"]:
+                    reference_date = self._static_value(spec["temporal"]["reference"])
+            except KeyError:
+                continue
+
+            cache_key = self._service_cache_key(path, parameters, reference_date)
+            if cache_key in self.values_cache or cache_key in self.prefetched:
+                continue
+
+            future = self.service_provider.prefetch(
+                service_ref["service"],
+                service_ref["law"],
+                parameters,
+                reference_date,
+                self.overwrite_input,
+                requested_output=service_ref["field"],
+                approved=self.approved,
+                trace=self.trace,
+                definition_overrides=self.definition_overrides,
+            )
+            if future is None:
+                return
+            self.prefetched[cache_key] = future
+
     def _resolve_from_service(self, path, service_ref, spec):
         parameters = copy(self.parameters)
         if "parameters" in service_ref:
@@ -340,36 +407,43 @@ class RuleContext:
             reference_date = self.resolve_value(spec["temporal"]["reference"])
 
         # Check cache
-        cache_key = f"{path}({','.join([f'{k}:{v}' for k, v in sorted(parameters.items())])},{reference_date})"
+        cache_key = self._service_cache_key(path, parameters, reference_date)
         if cache_key in self.values_cache:
-            logger.debug(f"Resolving from CACHE with key '{cache_key}': {self.values_cache[cache_key]}")
+            logger.debug("Resolving from CACHE with key '%s': %s", cache_key, self.values_cache[cache_key])
             return self.values_cache[cache_key]
 
-        logger.debug(f"Resolving from {service_ref['service']} field {service_ref['field']} ({parameters})")
+        prefetch = self.prefetched.pop(cache_key, None)
+        if prefetch is not None:
+            # Wait for the background evaluation; errors are raised again by the evaluation below
+            prefetch.exception()
+
+        logger.debug("Resolving from %s field %s (%s)", service_ref["service"], service_ref["field"], parameters)
 
         # Create service evaluation node
-        details = {
-            "service": service_ref["service"],
-            "law": service_ref["law"],
-            "field": service_ref["field"],
-            "reference_date": reference_date,
-            "parameters": parameters,
-            "path": path,
-        }
-
-        # Copy type information from spec to details
-        if "type" in spec:
-            details["type"] = spec["type"]
-        if "type_spec" in spec:
-            details["type_spec"] = spec["type_spec"]
-
-        service_node = PathNode(
-            type="service_evaluation",
-            name=f"Service call: {service_ref['service']}.{service_ref['law']}",
-            result=None,
-            details=details,
-        )
-        self.add_to_path(service_node)
+        service_node = None
+        if self.trace is not TraceLevel.NONE:
+            details = {
+                "service": service_ref["service"],
+                "law": service_ref["law"],
+                "field": service_ref["field"],
+                "reference_date": reference_date,
+                "parameters": parameters,
+                "path": path,
+            }
+
+            # Copy type information from spec to details
+            if "type" in spec:
+                details["type"] = spec["type"]
+            if "type_spec" in spec:
+                details["type_spec"] = spec["type_spec"]
+
+            service_node = PathNode(
+                type="service_evaluation",
+                name=f"Service call: {service_ref['service']}.{service_ref['law']}",
+                result=None,
+                details=details,
+            )
+            self.add_to_path(service_node)
 
         try:
             result = self.service_provider.evaluate(
@@ -380,20 +454,24 @@ class RuleContext:
                 self.overwrite_input,
                 requested_output=service_ref["field"],
                 approved=self.approved,
+                trace=self.trace,
+                definition_overrides=self.definition_overrides,
             )
 
             value = result.output.get(service_ref["field"])
             self.values_cache[cache_key] = value
 
             # Update the service node with the result and add child path
-            service_node.result = value
-            service_node.children.append(result.path)
+            if service_node is not None:
+                service_node.result = value
+                service_node.children.append(result.path)
 
             self.missing_required = self.missing_required or result.missing_required
 
             return value
         finally:
-            self.pop_path()
+            if service_node is not None:
+                self.pop_path()
 
     def _resolve_type_spec_enums(self, spec: dict[str, Any], type_spec: dict[str, Any]) -> dict[str, Any]:
         """
@@ -417,20 +495,28 @@ class RuleContext:
                     enum_value = self.resolve_value(field["enum"])
                     if enum_value is not None:
                         field["enum_values"] = enum_value
-                        logger.debug(f"Resolved enum reference {field['enum']} to {field['enum_values']}")
+                        logger.debug("Resolved enum reference %s to %s", field["enum"], field["enum_values"])
 
         return type_spec_copy
 
     def _resolve_from_source(self, source_ref, table, df):
+        selections = []
         if "select_on" in source_ref:
             for select_on in source_ref["select_on"]:
                 value = self.resolve_value(select_on["value"])
 
                 if isinstance(value, dict) and "operation" in value and value["operation"] == "IN":
                     allowed_values = self.resolve_value(value["values"])
-                    df = df[df[select_on["name"]].isin(allowed_values)]
+                    selections.append((select_on["name"], allowed_values, True))
                 else:
-                    df = df[df[select_on["name"]] == value]
+                    selections.append((select_on["name"], value, False))
+
+        # Registered source tables keep their indexes between evaluations, derived tables (laws, events)
+        # are indexed for this lookup only
+        source_index = self.source_index
+        if source_index is None or not self.sources or self.sources.get(table) is not df:
+            source_index = SourceIndex()
+        positions = source_index.select(table, df, selections)
 
         # Get specified fields
         fields = source_ref.get("fields", [])
@@ -439,16 +525,16 @@ class RuleContext:
         if fields:
             missing_fields = [f for f in fields if f not in df.columns]
             if missing_fields:
-                logger.warning(f"Fields {missing_fields} not found in source for table {table}")
-            existing_fields = [f for f in fields if f in df.columns]
-            result = df[existing_fields].to_dict("records")
+                logger.warning("Fields %s not found in source for table %s", missing_fields, table)
+            existing_fields = tuple(f for f in fields if f in df.columns)
+            result = source_index.take(table, df, positions, existing_fields)
         elif field:
             if field not in df.columns:
-                logger.warning(f"Field {field} not found in source for table {table}")
+                logger.warning("Field %s not found in source for table %s", field, table)
                 return None
-            result = df[field].tolist()
+            result = source_index.take(table, df, positions, field)
         else:
-            result = df.to_dict("records")
+            result = source_index.take(table, df, positions, None)
 
         if result is None:
             return None
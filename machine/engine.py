@@ -1,13 +1,16 @@
 import functools
 import operator
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Callable
 from copy import copy
 from datetime import date, datetime
 from typing import Any
 
 import pandas as pd
 
-from .context import PathNode, RuleContext, TypeSpec, logger
+from .batch import BatchEvaluator
+from .context import PathNode, RuleContext, TraceLevel, TypeSpec, logger
+from .sources import SourceIndex
 
 
 class RulesEngine:
@@ -22,8 +25,25 @@ class RulesEngine:
         self.parameter_specs = spec.get("properties", {}).get("parameters", {})
         self.property_specs = self._build_property_specs(spec.get("properties", {}))
         self.output_specs = self._build_output_specs(spec.get("properties", {}))
+        self.output_definitions = self._build_output_definitions(spec.get("properties", {}))
         self.definitions = spec.get("properties", {}).get("definitions", {})
         self.service_provider = service_provider
+        # Case events change with every case update, results reading them can't be reused
+        self.reads_events = any(
+            spec.get("source_reference", {}).get("source_type") == "events" for spec in self.property_specs.values()
+        )
+
+        # Compile requirements and actions once into callables, so evaluation doesn't
+        # have to re-interpret the spec dicts for every call
+        self._compiled_requirements = self._compile_requirements(self.requirements)
+        self._compiled_actions = {action["output"]: self._compile_action(action) for action in self.actions}
+
+        # Dependency graph between actions, built once; execution plans per requested output are memoized
+        self._action_by_output = {action["output"]: action for action in self.actions}
+        self._dependencies = {action["output"]: self.analyze_dependencies(action) for action in self.actions}
+        self._execution_plans: dict[str | None, list[Callable]] = {}
+        self._prefetch_paths: dict[str | None, list[str]] = {}
+        self._batch_evaluator: BatchEvaluator | None = None
 
     @staticmethod
     def _build_property_specs(properties: dict[str, Any]) -> dict[str, dict[str, Any]]:
@@ -58,13 +78,22 @@ class RulesEngine:
                 )
         return specs
 
+    @staticmethod
+    def _build_output_definitions(properties: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        """Build mapping of output names to their (first) output definition"""
+        definitions = {}
+        for output in properties.get("output", []):
+            if "name" in output:
+                definitions.setdefault(output["name"], output)
+        return definitions
+
     def _enforce_output_type(self, name: str, value: Any) -> Any:
         """Enforce type specifications on output value"""
         if name in self.output_specs:
             result = self.output_specs[name].enforce(value)
 
             if not operator.eq(value, result):
-                logger.debug(f"Enforcing type spec changed value from: {value} to {result}")
+                logger.debug("Enforcing type spec changed value from: %s to %s", value, result)
 
             return result
 
@@ -83,7 +112,8 @@ class RulesEngine:
 
         # Initialize complete dependency map
         complete_dependencies = {node: set() for node in all_nodes}
-        complete_dependencies.update(dependencies)
+        # (copy the sets, the caller's dependency graph may be reused)
+        complete_dependencies.update({node: set(deps) for node, deps in dependencies.items()})
 
         # Build adjacency list
         graph = defaultdict(set)
@@ -92,11 +122,11 @@ class RulesEngine:
                 graph[dep].add(output)
 
         # Find nodes with no dependencies
-        ready = [node for node, deps in complete_dependencies.items() if not deps]
+        ready = deque(node for node, deps in complete_dependencies.items() if not deps)
         sorted_outputs = []
 
         while ready:
-            node = ready.pop(0)
+            node = ready.popleft()
             sorted_outputs.append(node)
 
             # Remove this node as dependency
@@ -148,6 +178,13 @@ class RulesEngine:
             action_by_output[output] = action
             dependencies[output] = RulesEngine.analyze_dependencies(action)
 
+        return RulesEngine._order_required_actions(requested_output, dependencies, action_by_output)
+
+    @staticmethod
+    def _order_required_actions(
+        requested_output: str, dependencies: dict[str, set], action_by_output: dict[str, dict[str, Any]]
+    ) -> list:
+        """Order the actions needed for requested output using a prebuilt dependency graph"""
         # Find all required outputs
         required = set()
         to_process = {requested_output}
@@ -167,6 +204,54 @@ class RulesEngine:
         # Return actions in dependency order
         return [action_by_output[output] for output in ordered_outputs if output in action_by_output]
 
+    def get_execution_plan(self, requested_output: str | None = None) -> list[Callable]:
+        """Get the compiled actions for requested output in dependency order, memoized per engine"""
+        plan = self._execution_plans.get(requested_output)
+        if plan is None:
+            if requested_output:
+                actions = self._order_required_actions(requested_output, self._dependencies, self._action_by_output)
+            else:
+                actions = self.actions
+            plan = [self._compiled_actions[action["output"]] for action in actions]
+            self._execution_plans[requested_output] = plan
+        return plan
+
+    def get_prefetch_paths(self, requested_output: str | None = None) -> list[str]:
+        """Get the service referenced inputs the requirements and actions for requested output use, memoized"""
+        paths = self._prefetch_paths.get(requested_output)
+        if paths is None:
+            if requested_output:
+                actions = self._order_required_actions(requested_output, self._dependencies, self._action_by_output)
+            else:
+                actions = self.actions
+            paths = [
+                name
+                for name in self.find_references([self.requirements, actions])
+                if self.property_specs.get(name, {}).get("service_reference")
+                and not self.property_specs[name].get("source_reference")
+            ]
+            self._prefetch_paths[requested_output] = paths
+        return paths
+
+    @staticmethod
+    def find_references(obj) -> list[str]:
+        """Find the names of all $references in obj, in order of appearance"""
+        references = {}
+
+        def traverse(obj) -> None:
+            if isinstance(obj, str):
+                if obj.startswith("$"):
+                    references[obj[1:].split(".", 1)[0]] = None
+            elif isinstance(obj, dict):
+                for v in obj.values():
+                    traverse(v)
+            elif isinstance(obj, list):
+                for item in obj:
+                    traverse(item)
+
+        traverse(obj)
+        return list(references)
+
     def evaluate(
         self,
         parameters: dict[str, Any] | None = None,
@@ -175,15 +260,28 @@ class RulesEngine:
         calculation_date=None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: TraceLevel | str = TraceLevel.FULL,
+        source_index: SourceIndex | None = None,
+        definition_overrides: dict[str, Any] | None = None,
     ) -> dict[str, Any]:
-        """Evaluate rules using service context and sources"""
+        """Evaluate rules using service context and sources
+
+        The trace level controls how much of the evaluation path is recorded: ``full`` builds the
+        complete explanation tree, ``inputs-only`` keeps only the resolve and service nodes and
+        ``none`` skips the tree and resolved inputs altogether (``path`` is then None). A source index
+        shared between evaluations keeps the select_on indexes of the source tables. Definition overrides
+        ({service: {law: {name: value}}}) replace definitions of this law and of the laws it references.
+        """
         parameters = parameters or {}
+        trace = TraceLevel(trace)
         for p in self.parameter_specs:
             if p["required"] and p["name"] not in parameters:
-                logger.warning(f"Required parameter {p} not found in {parameters}")
+                logger.warning("Required parameter %s not found in %s", p, parameters)
 
-        logger.debug(f"Evaluating rules for {self.service_name} {self.law} ({calculation_date} {requested_output})")
-        root = PathNode(type="root", name="evaluation", result=None)
+        logger.debug(
+            "Evaluating rules for %s %s (%s %s)", self.service_name, self.law, calculation_date, requested_output
+        )
+        root = PathNode(type="root", name="evaluation", result=None) if trace is not TraceLevel.NONE else None
 
         claims = None
         if "BSN" in parameters:
@@ -193,36 +291,44 @@ class RulesEngine:
             )
 
         context = RuleContext(
-            definitions=self.definitions,
+            definitions=self.get_definitions(definition_overrides),
             service_provider=self.service_provider,
             parameters=parameters,
             property_specs=self.property_specs,
             output_specs=self.output_specs,
             sources=sources,
-            path=[root],
+            path=[root] if root else [],
             overwrite_input=overwrite_input or {},
+            definition_overrides=definition_overrides,
             calculation_date=calculation_date,
             service_name=self.service_name,
             claims=claims,
             approved=approved,
+            trace=trace,
+            source_index=source_index,
         )
 
+        # Start the independent service calls this evaluation needs, so they run concurrently
+        if getattr(self.service_provider, "prefetch_workers", 0):
+            context.prefetch_services(self.get_prefetch_paths(requested_output))
+
         # Check requirements
-        requirements_node = PathNode(type="requirements", name="Check all requirements", result=None)
-        context.add_to_path(requirements_node)
-        try:
-            requirements_met = self._evaluate_requirements(self.requirements, context)
-            requirements_node.result = requirements_met
-        finally:
-            context.pop_path()
+        if trace is TraceLevel.FULL:
+            requirements_node = PathNode(type="requirements", name="Check all requirements", result=None)
+            context.add_to_path(requirements_node)
+            try:
+                requirements_met = self._compiled_requirements(context)
+                requirements_node.result = requirements_met
+            finally:
+                context.pop_path()
+        else:
+            requirements_met = self._compiled_requirements(context)
 
         output_values = {}
         if requirements_met:
             # Get required actions including dependencies in order
-            required_actions = self.get_required_actions(requested_output, self.actions)
-
-            for action in required_actions:
-                output_def, output_name = self._evaluate_action(action, context)
+            for evaluate_action in self.get_execution_plan(requested_output):
+                output_def, output_name = evaluate_action(context)
                 context.outputs[output_name] = output_def["value"]
                 output_values[output_name] = output_def
                 if context.missing_required:
@@ -235,7 +341,7 @@ class RulesEngine:
             requirements_met = False
 
         if not output_values:
-            logger.warning(f"No output values computed for {calculation_date} {requested_output}")
+            logger.warning("No output values computed for %s %s", calculation_date, requested_output)
 
         return {
             "input": context.resolved_paths,
@@ -245,182 +351,284 @@ class RulesEngine:
             "missing_required": context.missing_required,
         }
 
-    def _evaluate_action(self, action, context):
-        with logger.indent_block(f"Computing {action.get('output', '')}"):
-            if action["output"] == "partner_bsn":
-                pass
-            action_node = PathNode(
-                type="action",
-                name=f"Evaluate action for {action.get('output', '')}",
-                result=None,
-            )
-            context.add_to_path(action_node)
-            output_name = action["output"]
-            # Find output specification
-            output_spec = next(
-                (spec for spec in self.spec.get("properties", {}).get("output", []) if spec.get("name") == output_name),
-                {},
-            )
+    def evaluate_batch(
+        self,
+        parameters: dict[str, Any],
+        overwrite_input: dict[str, Any] | None = None,
+        sources: dict[str, pd.DataFrame] | None = None,
+        calculation_date=None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        source_index: SourceIndex | None = None,
+        definition_overrides: dict[str, Any] | None = None,
+    ) -> pd.DataFrame:
+        """Evaluate rules for many parameter rows at once
+
+        Parameters map each parameter name to a sequence of values, one per row. Returns a DataFrame with
+        the parameter columns, ``requirements_met``, ``missing_required`` and one column per computed
+        output (None for rows whose requirements are not met). No evaluation path is recorded.
+        """
+        if self._batch_evaluator is None:
+            self._batch_evaluator = BatchEvaluator(self)
+        return self._batch_evaluator.evaluate(
+            parameters=parameters,
+            overwrite_input=overwrite_input,
+            sources=sources,
+            calculation_date=calculation_date,
+            requested_output=requested_output,
+            approved=approved,
+            source_index=source_index,
+            definition_overrides=definition_overrides,
+        )
 
-            if (
-                self.service_name in context.overwrite_input
-                and output_name in context.overwrite_input[self.service_name]
-            ):
-                raw_result = context.overwrite_input[self.service_name][output_name]
-                logger.debug(f"Resolving value {self.service_name}/{output_name} from OVERWRITE {raw_result}")
-            elif "operation" in action:
-                raw_result = self._evaluate_operation(action, context)
-            elif "value" in action:
-                raw_result = self._evaluate_value(action["value"], context)
-            else:
-                raw_result = None
-
-            result = self._enforce_output_type(output_name, raw_result)
-        action_node.result = result
-        logger.debug(f"Result of {action.get('output', '')}: {result}")
-        # Build output with metadata
-        output_def = {
-            "value": result,
-            "type": output_spec.get("type", "unknown"),
-            "description": output_spec.get("description", ""),
-        }
-        # Add type_spec if present
-        if "type_spec" in output_spec:
-            output_def["type_spec"] = output_spec["type_spec"]
-        # Add temporal if present
-        if "temporal" in output_spec:
-            output_def["temporal"] = output_spec["temporal"]
-        return output_def, output_name
-
-    def _evaluate_requirements(self, requirements: list, context: RuleContext) -> bool:
-        """Evaluate all requirements"""
+    def get_definitions(self, definition_overrides: dict[str, Any] | None = None) -> dict[str, Any]:
+        """The definitions of this law with the overrides for it on top, leaving the (cached) spec untouched"""
+        overrides = (definition_overrides or {}).get(self.service_name, {}).get(self.law)
+        if not overrides:
+            return self.definitions
+        unknown = set(overrides) - set(self.definitions)
+        if unknown:
+            logger.warning("Overriding unknown definitions %s of %s %s", sorted(unknown), self.service_name, self.law)
+        return {**self.definitions, **overrides}
+
+    def _compile_action(self, action: dict[str, Any]) -> Callable[[RuleContext], tuple[dict[str, Any], str]]:
+        """Compile an action into a callable returning its output definition and name"""
+        output_name = action["output"]
+        block_message = f"Computing {output_name}"
+        node_name = f"Evaluate action for {output_name}"
+        # Find output specification
+        output_spec = self.output_definitions.get(output_name, {})
+
+        if "operation" in action:
+            evaluate_raw = self._compile_operation(action)
+        elif "value" in action:
+            evaluate_raw = self._compile_value(action["value"])
+        else:
+            evaluate_raw = None
+
+        def evaluate_action(context: RuleContext) -> tuple[dict[str, Any], str]:
+            with logger.indent_block(block_message):
+                action_node = None
+                if context.trace is TraceLevel.FULL:
+                    action_node = PathNode(type="action", name=node_name, result=None)
+                    context.add_to_path(action_node)
+                if (
+                    self.service_name in context.overwrite_input
+                    and output_name in context.overwrite_input[self.service_name]
+                ):
+                    raw_result = context.overwrite_input[self.service_name][output_name]
+                    logger.debug("Resolving value %s/%s from OVERWRITE %s", self.service_name, output_name, raw_result)
+                elif evaluate_raw is not None:
+                    raw_result = evaluate_raw(context)
+                else:
+                    raw_result = None
+
+                result = self._enforce_output_type(output_name, raw_result)
+            if action_node is not None:
+                action_node.result = result
+            logger.debug("Result of %s: %s", output_name, result)
+            # Build output with metadata
+            output_def = {
+                "value": result,
+                "type": output_spec.get("type", "unknown"),
+                "description": output_spec.get("description", ""),
+            }
+            # Add type_spec if present
+            if "type_spec" in output_spec:
+                output_def["type_spec"] = output_spec["type_spec"]
+            # Add temporal if present
+            if "temporal" in output_spec:
+                output_def["temporal"] = output_spec["temporal"]
+            return output_def, output_name
+
+        return evaluate_action
+
+    def _compile_requirements(self, requirements: list) -> Callable[[RuleContext], bool]:
+        """Compile a list of requirements into a callable that checks all of them"""
         if not requirements:
-            logger.debug("No requirements found")
-            return True
 
-        for req in requirements:
-            with logger.indent_block(f"Requirements {req}"):
-                node = PathNode(
-                    type="requirement",
-                    name="Check ALL conditions"
-                    if "all" in req
-                    else "Check OR conditions"
-                    if "or" in req
-                    else "Test condition",
-                    result=None,
-                )
-                context.add_to_path(node)
+            def evaluate_no_requirements(context: RuleContext) -> bool:
+                logger.debug("No requirements found")
+                return True
 
-                if "all" in req:
-                    results = []
-                    for r in req["all"]:
-                        result = self._evaluate_requirements([r], context)
-                        results.append(result)
-                        if not bool(result):
-                            logger.debug("False value found in an ALL, no need to compute the rest, breaking.")
-                            break
-                    result = all(results)
-                elif "or" in req:
-                    results = []
-                    for r in req["or"]:
-                        result = self._evaluate_requirements([r], context)
-                        results.append(result)
-                        if bool(result):
-                            logger.debug("True value found in an OR, no need to compute the rest, breaking.")
-                            break
-                    result = any(results)
-                else:
-                    result = self._evaluate_operation(req, context)
+            return evaluate_no_requirements
+
+        compiled = [self._compile_requirement(req) for req in requirements]
+
+        def evaluate_requirements(context: RuleContext) -> bool:
+            return all(evaluate_requirement(context) for evaluate_requirement in compiled)
+
+        return evaluate_requirements
+
+    def _compile_requirement(self, req: dict[str, Any]) -> Callable[[RuleContext], Any]:
+        """Compile a single (possibly nested ALL/OR) requirement"""
+        block_message = f"Requirements {req}"
+
+        if "all" in req:
+            node_name = "Check ALL conditions"
+            sub_requirements = [self._compile_requirements([r]) for r in req["all"]]
+
+            def evaluate_condition(context: RuleContext) -> bool:
+                results = []
+                for evaluate_sub in sub_requirements:
+                    result = evaluate_sub(context)
+                    results.append(result)
+                    if not bool(result):
+                        logger.debug("False value found in an ALL, no need to compute the rest, breaking.")
+                        break
+                return all(results)
+
+        elif "or" in req:
+            node_name = "Check OR conditions"
+            sub_requirements = [self._compile_requirements([r]) for r in req["or"]]
+
+            def evaluate_condition(context: RuleContext) -> bool:
+                results = []
+                for evaluate_sub in sub_requirements:
+                    result = evaluate_sub(context)
+                    results.append(result)
+                    if bool(result):
+                        logger.debug("True value found in an OR, no need to compute the rest, breaking.")
+                        break
+                return any(results)
+
+        else:
+            node_name = "Test condition"
+            evaluate_condition = self._compile_operation(req)
+
+        def evaluate_requirement(context: RuleContext) -> Any:
+            if context.trace is not TraceLevel.FULL:
+                with logger.indent_block(block_message):
+                    result = evaluate_condition(context)
+                logger.debug("Requirement met" if result else "Requirement NOT met")
+                return result
+
+            with logger.indent_block(block_message):
+                node = PathNode(type="requirement", name=node_name, result=None)
+                context.add_to_path(node)
+                result = evaluate_condition(context)
 
             logger.debug("Requirement met" if result else "Requirement NOT met")
 
             node.result = result
             context.pop_path()
+            return result
 
-            if not result:
-                return False
+        return evaluate_requirement
 
-        return True
+    def _compile_if_operation(self, operation: dict[str, Any]) -> Callable[[RuleContext, PathNode | None], Any]:
+        """Compile an IF operation"""
+        conditions = []
+        for condition in operation.get("conditions", []):
+            if "test" in condition:
+                conditions.append(
+                    ("test", self._compile_operation(condition["test"]), self._compile_value(condition.get("then")))
+                )
+            elif "else" in condition:
+                conditions.append(("else", None, self._compile_value(condition["else"])))
+            else:
+                conditions.append((None, None, None))
+
+        def evaluate_first_match(context: RuleContext) -> Any:
+            for kind, evaluate_test, evaluate_result in conditions:
+                if kind == "test":
+                    if evaluate_test(context):
+                        result = evaluate_result(context)
+                        logger.debug("THEN condition: %s", result)
+                        return result
+                elif kind == "else":
+                    result = evaluate_result(context)
+                    logger.debug("ELSE condition: %s", result)
+                    return result
+            return 0
 
-    def _evaluate_if_operation(self, operation: dict[str, Any], context: RuleContext) -> Any:
-        """Evaluate an IF operation"""
-        with logger.indent_block("Evaluating IF"):
-            if_node = PathNode(
-                type="operation",
-                name="IF conditions",
-                result=None,
-                details={"condition_results": []},
-            )
-            context.add_to_path(if_node)
-
-            result = 0
-            conditions = operation.get("conditions", [])
-
-            for i, condition in enumerate(conditions):
-                condition_result = {
-                    "condition_index": i,
-                    "type": "test" if "test" in condition else "else",
-                }
-
-                if "test" in condition:
-                    test_result = self._evaluate_operation(condition["test"], context)
-                    condition_result["test_result"] = test_result
-                    if test_result:
-                        result = self._evaluate_value(condition["then"], context)
+        def evaluate_if(context: RuleContext, node: PathNode | None) -> Any:
+            with logger.indent_block("Evaluating IF"):
+                if node is None:
+                    return evaluate_first_match(context)
+
+                if_node = PathNode(
+                    type="operation",
+                    name="IF conditions",
+                    result=None,
+                    details={"condition_results": []},
+                )
+                context.add_to_path(if_node)
+
+                result = 0
+                for i, (kind, evaluate_test, evaluate_result) in enumerate(conditions):
+                    condition_result = {
+                        "condition_index": i,
+                        "type": "test" if kind == "test" else "else",
+                    }
+
+                    if kind == "test":
+                        test_result = evaluate_test(context)
+                        condition_result["test_result"] = test_result
+                        if test_result:
+                            result = evaluate_result(context)
+                            if_node.details["condition_results"].append(condition_result)
+                            logger.debug("THEN condition: %s", result)
+                            break
+                    elif kind == "else":
+                        result = evaluate_result(context)
+                        condition_result["else_value"] = result
                         if_node.details["condition_results"].append(condition_result)
-                        logger.debug(f"THEN condition: {result}")
+                        logger.debug("ELSE condition: %s", result)
                         break
-                elif "else" in condition:
-                    result = self._evaluate_value(condition["else"], context)
-                    condition_result["else_value"] = result
+
                     if_node.details["condition_results"].append(condition_result)
-                    logger.debug(f"ELSE condition: {result}")
-                    break
 
-                if_node.details["condition_results"].append(condition_result)
+                if_node.result = result
+                context.pop_path()
+                return result
 
-            if_node.result = result
-            context.pop_path()
-            return result
-
-    def _evaluate_foreach(self, operation, context):
-        """Handle FOREACH operation"""
-        logger.debug("For each condition")
+        return evaluate_if
 
+    def _compile_foreach(self, operation: dict[str, Any]) -> Callable[[RuleContext, PathNode | None], Any]:
+        """Compile a FOREACH operation"""
         combine = operation.get("combine")
+        aggregate = self.AGGREGATE_OPS.get(combine)
+        block_message = f"Foreach({combine})"
+        raw_values = operation.get("value")
+        evaluate_subject = self._compile_value(operation.get("subject"))
+        evaluate_item = self._compile_value(raw_values[0] if isinstance(raw_values, list) else raw_values)
+
+        def evaluate_foreach(context: RuleContext, node: PathNode | None) -> Any:
+            logger.debug("For each condition")
+
+            array_data = evaluate_subject(context)
+            if not array_data:
+                logger.warning("No data found to run FOREACH on")
+                result = self._evaluate_aggregate_ops(combine, aggregate, [])
+            else:
+                if not isinstance(array_data, list):
+                    array_data = [array_data]
+
+                with logger.indent_block(block_message):
+                    values = []
+                    for item in array_data:
+                        with logger.indent_block("Item %s", item):
+                            item_context = copy(context)
+                            if isinstance(item, dict):
+                                item_context.local.update(item)
+                            for i in range(100):
+                                if f"current_{i}" not in item_context.local:
+                                    item_context.local[f"current_{i}"] = item
+                                    break
+                            result = evaluate_item(item_context)
+                            context.missing_required = context.missing_required or item_context.missing_required
+                            context.path = item_context.path
+                            values.extend(result if isinstance(result, list) else [result])
+                    logger.debug("Foreach values: %s", values)
+                    result = self._evaluate_aggregate_ops(combine, aggregate, values) if combine else values
+                    logger.debug("Foreach result: %s", result)
+
+            if node is not None:
+                node.details.update({"raw_values": raw_values, "arithmetic_type": "FOREACH"})
+            return result
 
-        array_data = self._evaluate_value(operation["subject"], context)
-        if "DECLARED_HOURS" in operation["subject"]:
-            pass
-        if not array_data:
-            logger.warning("No data found to run FOREACH on")
-            return self._evaluate_aggregate_ops(combine, [])
-
-        if not isinstance(array_data, list):
-            array_data = [array_data]
-
-        with logger.indent_block(f"Foreach({combine})"):
-            values = []
-            for item in array_data:
-                with logger.indent_block(f"Item {item}"):
-                    item_context = copy(context)
-                    if isinstance(item, dict):
-                        item_context.local.update(item)
-                    for i in range(100):
-                        if f"current_{i}" not in item_context.local:
-                            item_context.local[f"current_{i}"] = item
-                            break
-                    value_to_evaluate = (
-                        operation["value"][0] if isinstance(operation["value"], list) else operation["value"]
-                    )
-                    result = self._evaluate_value(value_to_evaluate, item_context)
-                    context.missing_required = context.missing_required or item_context.missing_required
-                    context.path = item_context.path
-                    values.extend(result if isinstance(result, list) else [result])
-            logger.debug(f"Foreach values: {values}")
-            result = self._evaluate_aggregate_ops(combine, values) if combine else values
-            logger.debug(f"Foreach result: {result}")
-        return result
+        return evaluate_foreach
 
     COMPARISON_OPS = {
         "EQUALS": operator.eq,
@@ -450,22 +658,22 @@ class RulesEngine:
     }
 
     @staticmethod
-    def _evaluate_aggregate_ops(op: str, values: list[Any]) -> int | float | bool:
+    def _evaluate_aggregate_ops(op: str, aggregate: Callable[[list], Any], values: list[Any]) -> int | float | bool:
         """Handle aggregate operations"""
         filtered_values = [v for v in values if v is not None]
 
         if not filtered_values:
-            logger.warning(f"No values found (or they where None), returning 0 for {op}({values})")
+            logger.warning("No values found (or they where None), returning 0 for %s(%s)", op, values)
             return 0
         elif len(filtered_values) < len(values):
-            logger.warning(f"Dropped {len(values) - len(filtered_values)} values because they where None")
+            logger.warning("Dropped %s values because they where None", len(values) - len(filtered_values))
 
-        result = RulesEngine.AGGREGATE_OPS[op](filtered_values)
-        logger.debug(f"Compute {op}({filtered_values}) = {result}")
+        result = aggregate(filtered_values)
+        logger.debug("Compute %s(%s) = %s", op, filtered_values, result)
         return result
 
     @staticmethod
-    def _evaluate_comparison(op: str, left: Any, right: Any) -> bool | None:
+    def _evaluate_comparison(op: str, compare: Callable[[Any, Any], bool], left: Any, right: Any) -> bool | None:
         """Handle comparison operations"""
         if isinstance(left, date) and isinstance(right, str):
             right = datetime.strptime(right, "%Y-%m-%d").date()
@@ -473,10 +681,10 @@ class RulesEngine:
             left = datetime.strptime(left, "%Y-%m-%d").date()
 
         try:
-            result = RulesEngine.COMPARISON_OPS[op](left, right)
-            logger.debug(f"Compute {op}({left}, {right}) = {result}")
+            result = compare(left, right)
+            logger.debug("Compute %s(%s, %s) = %s", op, left, right, result)
         except TypeError as e:
-            logger.warning(f"Error computing {op}({left}, {right}): {e}")
+            logger.warning("Error computing %s(%s, %s): %s", op, left, right, e)
             result = None
 
         return result
@@ -513,182 +721,269 @@ class RulesEngine:
             elif unit == "months":
                 result = (end_date.year - start_date.year) * 12 + end_date.month - start_date.month
             else:
-                logger.warning(f"Warning: Unknown date unit {unit}")
-            logger.debug(f"Compute {op}({values}, {unit}) = {result}")
+                logger.warning("Warning: Unknown date unit %s", unit)
+            logger.debug("Compute %s(%s, %s) = %s", op, values, unit, result)
 
         if result is None:
             logger.warning("Warning: date operation resulted in None")
 
         return result
 
-    def _evaluate_operation(self, operation: dict[str, Any], context: RuleContext) -> Any:
-        """Evaluate an operation or condition"""
+    def _compile_operation(self, operation: Any) -> Callable[[RuleContext], Any]:
+        """Compile an operation or condition into a callable"""
 
         if not isinstance(operation, dict):
-            node = PathNode(
-                type="value",
-                name="Direct value evaluation",
-                result=None,
-                details={"raw_value": operation},
-            )
-            context.add_to_path(node)
-            result = self._evaluate_value(operation, context)
-            node.result = result
-            context.pop_path()
-            return result
+            evaluate_raw_value = self._compile_value(operation)
+
+            def evaluate_direct_value(context: RuleContext) -> Any:
+                if context.trace is not TraceLevel.FULL:
+                    return evaluate_raw_value(context)
+
+                node = PathNode(
+                    type="value",
+                    name="Direct value evaluation",
+                    result=None,
+                    details={"raw_value": operation},
+                )
+                context.add_to_path(node)
+                result = evaluate_raw_value(context)
+                node.result = result
+                context.pop_path()
+                return result
+
+            return evaluate_direct_value
 
         # Direct value assignment - no operation needed
         if "value" in operation and not operation.get("operation"):
+            raw_value = operation["value"]
+            evaluate_assigned_value = self._compile_value(raw_value)
+
+            def evaluate_direct_assignment(context: RuleContext) -> Any:
+                if context.trace is not TraceLevel.FULL:
+                    return evaluate_assigned_value(context)
+
+                node = PathNode(
+                    type="direct_value",
+                    name="Direct value assignment",
+                    result=None,
+                    details={"raw_value": raw_value},
+                )
+                context.add_to_path(node)
+                result = evaluate_assigned_value(context)
+                node.result = result
+                context.pop_path()
+                return result
+
+            return evaluate_direct_assignment
+
+        op_type = operation.get("operation")
+        node_name = f"Operation: {op_type}"
+        evaluate_body = self._compile_operation_body(op_type, operation)
+
+        def evaluate_operation(context: RuleContext) -> Any:
+            if context.trace is not TraceLevel.FULL:
+                return evaluate_body(context, None)
+
             node = PathNode(
-                type="direct_value",
-                name="Direct value assignment",
+                type="operation",
+                name=node_name,
                 result=None,
-                details={"raw_value": operation["value"]},
+                details={"operation_type": op_type},
             )
             context.add_to_path(node)
-            result = self._evaluate_value(operation["value"], context)
+            result = evaluate_body(context, node)
             node.result = result
             context.pop_path()
             return result
 
-        op_type = operation.get("operation")
-        node = PathNode(
-            type="operation",
-            name=f"Operation: {op_type}",
-            result=None,
-            details={"operation_type": op_type},
-        )
-        context.add_to_path(node)
+        return evaluate_operation
+
+    def _compile_operation_body(
+        self, op_type: str | None, operation: dict[str, Any]
+    ) -> Callable[[RuleContext, PathNode | None], Any]:
+        """Resolve the implementation of an operation type once, binding its compiled operands"""
 
         if op_type is None:
-            logger.warning("Operation type is None (or missing).")
-            result = None
 
-        elif op_type == "IF":
-            result = self._evaluate_if_operation(operation, context)
+            def evaluate_missing(context: RuleContext, node: PathNode | None) -> Any:
+                logger.warning("Operation type is None (or missing).")
+                return None
 
-        elif op_type == "FOREACH":
-            result = self._evaluate_foreach(operation, context)
-            node.details.update({"raw_values": operation["value"], "arithmetic_type": op_type})
+            return evaluate_missing
 
-        elif op_type in ["IN", "NOT_IN"]:
-            with logger.indent_block(op_type):
-                subject = self._evaluate_value(operation["subject"], context)
-                allowed_values = self._evaluate_value(operation.get("values", []), context)
+        if op_type == "IF":
+            return self._compile_if_operation(operation)
 
-                result = subject in (
-                    allowed_values if isinstance(allowed_values, list | dict | set) else [allowed_values]
-                )
-                if op_type == "NOT_IN":
-                    result = not result
-
-            node.details.update({"subject_value": subject, "allowed_values": allowed_values})
-            logger.debug(f"Result {subject} {op_type} {allowed_values}: {result}")
-
-        elif op_type == "NOT_NULL":
-            subject = self._evaluate_value(operation["subject"], context)
-            result = subject is not None
-            node.details["subject_value"] = subject
-            logger.debug(f"NOT_NULL result: {result}")
-
-        elif op_type == "IS_NULL":
-            subject = self._evaluate_value(operation["subject"], context)
-            result = subject is None
-            node.details["subject_value"] = subject
-            logger.debug(f"IS_NULL result: {result}")
-
-        elif op_type == "AND":
-            with logger.indent_block("AND"):
-                values = []
-                for v in operation["values"]:
-                    r = self._evaluate_value(v, context)
-                    values.append(r)
-                    if not bool(r):
-                        logger.debug("False value found in an AND, no need to compute the rest, breaking.")
-                        break
-                result = all(bool(v) for v in values)
-
-            node.details["evaluated_values"] = values
-            logger.debug(f"Result {list(values)} AND: {result}")
-
-        elif op_type == "OR":
-            with logger.indent_block("OR"):
-                values = []
-                for v in operation["values"]:
-                    r = self._evaluate_value(v, context)
-                    values.append(r)
-                    if bool(r):
-                        logger.debug("True value found in an OR, no need to compute the other, breaking.")
-                        break
-                result = any(bool(v) for v in values)
-            node.details["evaluated_values"] = values
-            logger.debug(f"Result {list(values)} OR: {result}")
+        if op_type == "FOREACH":
+            return self._compile_foreach(operation)
+
+        if op_type in ["IN", "NOT_IN"]:
+            evaluate_subject = self._compile_value(operation.get("subject"))
+            evaluate_allowed = self._compile_value(operation.get("values", []))
+            negate = op_type == "NOT_IN"
+
+            def evaluate_in(context: RuleContext, node: PathNode | None) -> bool:
+                with logger.indent_block(op_type):
+                    subject = evaluate_subject(context)
+                    allowed_values = evaluate_allowed(context)
+
+                    result = subject in (
+                        allowed_values if isinstance(allowed_values, list | dict | set) else [allowed_values]
+                    )
+                    if negate:
+                        result = not result
+
+                if node is not None:
+                    node.details.update({"subject_value": subject, "allowed_values": allowed_values})
+                logger.debug("Result %s %s %s: %s", subject, op_type, allowed_values, result)
+                return result
+
+            return evaluate_in
+
+        if op_type in ["NOT_NULL", "IS_NULL"]:
+            evaluate_subject = self._compile_value(operation.get("subject"))
+            expect_null = op_type == "IS_NULL"
+
+            def evaluate_null_check(context: RuleContext, node: PathNode | None) -> bool:
+                subject = evaluate_subject(context)
+                result = (subject is None) if expect_null else (subject is not None)
+                if node is not None:
+                    node.details["subject_value"] = subject
+                logger.debug("%s result: %s", op_type, result)
+                return result
+
+            return evaluate_null_check
+
+        if op_type in ["AND", "OR"]:
+            evaluate_values = [self._compile_value(v) for v in operation.get("values", [])]
+            stop_on = op_type == "OR"
+            break_message = (
+                "True value found in an OR, no need to compute the other, breaking."
+                if stop_on
+                else "False value found in an AND, no need to compute the rest, breaking."
+            )
+            combine = any if stop_on else all
+
+            def evaluate_logical(context: RuleContext, node: PathNode | None) -> bool:
+                with logger.indent_block(op_type):
+                    values = []
+                    for evaluate_value in evaluate_values:
+                        r = evaluate_value(context)
+                        values.append(r)
+                        if bool(r) is stop_on:
+                            logger.debug(break_message)
+                            break
+                    result = combine(bool(v) for v in values)
+
+                if node is not None:
+                    node.details["evaluated_values"] = values
+                logger.debug("Result %s %s: %s", values, op_type, result)
+                return result
+
+            return evaluate_logical
 
-        elif "_DATE" in op_type:
-            values = [self._evaluate_value(v, context) for v in operation["values"]]
+        if "_DATE" in op_type:
+            evaluate_values = [self._compile_value(v) for v in operation.get("values", [])]
             unit = operation.get("unit", "days")
-            result = self._evaluate_date_operation(op_type, values, unit, context)
-            node.details.update({"evaluated_values": values, "unit": unit})
 
-        elif op_type in self.COMPARISON_OPS:
-            subject = None
-            value = None
+            def evaluate_date(context: RuleContext, node: PathNode | None) -> Any:
+                values = [evaluate_value(context) for evaluate_value in evaluate_values]
+                result = self._evaluate_date_operation(op_type, values, unit, context)
+                if node is not None:
+                    node.details.update({"evaluated_values": values, "unit": unit})
+                return result
+
+            return evaluate_date
+
+        if op_type in self.COMPARISON_OPS:
+            compare = self.COMPARISON_OPS[op_type]
 
             if "subject" in operation:
-                subject = self._evaluate_value(operation["subject"], context)
-                value = self._evaluate_value(operation["value"], context)
+                evaluate_subject = self._compile_value(operation["subject"])
+                evaluate_other = self._compile_value(operation.get("value"))
+
+                def evaluate_operands(context: RuleContext) -> tuple[Any, Any]:
+                    return evaluate_subject(context), evaluate_other(context)
 
             elif "values" in operation:
-                values = [self._evaluate_value(v, context) for v in operation["values"]]
-                subject = values[0]
-                value = values[1]
+                evaluate_values = [self._compile_value(v) for v in operation["values"]]
+
+                def evaluate_operands(context: RuleContext) -> tuple[Any, Any]:
+                    values = [evaluate_value(context) for evaluate_value in evaluate_values]
+                    return values[0], values[1]
+
             else:
-                logger.warning("Comparison operation expects two values or subject/value.")
 
-            result = self._evaluate_comparison(op_type, subject, value)
+                def evaluate_operands(context: RuleContext) -> tuple[Any, Any]:
+                    logger.warning("Comparison operation expects two values or subject/value.")
+                    return None, None
+
+            def evaluate_comparison(context: RuleContext, node: PathNode | None) -> bool | None:
+                subject, value = evaluate_operands(context)
+                result = self._evaluate_comparison(op_type, compare, subject, value)
+
+                if node is not None:
+                    node.details.update(
+                        {
+                            "subject_value": subject,
+                            "comparison_value": value,
+                            "comparison_type": op_type,
+                        }
+                    )
+                return result
 
-            node.details.update(
-                {
-                    "subject_value": subject,
-                    "comparison_value": value,
-                    "comparison_type": op_type,
-                }
-            )
+            return evaluate_comparison
 
-        elif op_type in self.AGGREGATE_OPS and "values" in operation:
+        if op_type in self.AGGREGATE_OPS and "values" in operation:
             # The operation dict has legal_basis as metadata alongside operation/values
             # but we only need to evaluate the 'values' list, ignoring legal_basis metadata
-            values = [self._evaluate_value(v, context) for v in operation["values"]]
-            result = self._evaluate_aggregate_ops(op_type, values)
-            node.details.update(
-                {
-                    "raw_values": operation["values"],
-                    "evaluated_values": values,
-                    "arithmetic_type": op_type,
-                }
-            )
+            aggregate = self.AGGREGATE_OPS[op_type]
+            raw_values = operation["values"]
+            evaluate_values = [self._compile_value(v) for v in raw_values]
+
+            def evaluate_aggregate(context: RuleContext, node: PathNode | None) -> Any:
+                values = [evaluate_value(context) for evaluate_value in evaluate_values]
+                result = self._evaluate_aggregate_ops(op_type, aggregate, values)
+                if node is not None:
+                    node.details.update(
+                        {
+                            "raw_values": raw_values,
+                            "evaluated_values": values,
+                            "arithmetic_type": op_type,
+                        }
+                    )
+                return result
 
-        elif op_type == "GET":
-            subject = self._evaluate_value(operation["subject"], context)
-            values = self._evaluate_value(operation.get("values", []), context)
-            result = values.get(subject)
-            node.details.update({"subject_value": subject, "allowed_values": values})
-            logger.debug(f"GET {subject} from {values}: {result}")
+            return evaluate_aggregate
 
-        else:
-            result = None
-            node.details["error"] = "Invalid operation format"
-            logger.warning(f"Not matched to any operation {op_type}")
+        if op_type == "GET":
+            evaluate_subject = self._compile_value(operation.get("subject"))
+            evaluate_mapping = self._compile_value(operation.get("values", []))
 
-        node.result = result
-        context.pop_path()
-        return result
+            def evaluate_get(context: RuleContext, node: PathNode | None) -> Any:
+                subject = evaluate_subject(context)
+                values = evaluate_mapping(context)
+                result = values.get(subject)
+                if node is not None:
+                    node.details.update({"subject_value": subject, "allowed_values": values})
+                logger.debug("GET %s from %s: %s", subject, values, result)
+                return result
+
+            return evaluate_get
+
+        def evaluate_invalid(context: RuleContext, node: PathNode | None) -> Any:
+            if node is not None:
+                node.details["error"] = "Invalid operation format"
+            logger.warning("Not matched to any operation %s", op_type)
+            return None
+
+        return evaluate_invalid
 
-    def _evaluate_value(self, value: Any, context: RuleContext) -> Any:
-        """Evaluate a value which might be a number, operation, or reference"""
+    def _compile_value(self, value: Any) -> Callable[[RuleContext], Any]:
+        """Compile a value which might be a number, operation, or reference"""
         if isinstance(value, int | float | bool | date | datetime) or value is None:
-            return value
+            return lambda context: value
         elif isinstance(value, dict) and "operation" in value:
-            return self._evaluate_operation(value, context)
+            return self._compile_operation(value)
         else:
-            return context.resolve_value(value)
+            return lambda context: context.resolve_value(value)
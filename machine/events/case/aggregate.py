@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from eventsourcing.domain import Aggregate, event
+from eventsourcing.domain import Aggregate, Snapshot, event
 from eventsourcing.persistence import Transcoding
 
 
@@ -34,6 +34,23 @@ Transcoding.register(CaseStatusTranscoding)
 
 
 class Case(Aggregate):
+    class Snapshot(Snapshot):
+        """Snapshot of a case. JSON has no enums and sets, so the status and claim ids are restored on loading."""
+
+        @classmethod
+        def take(cls, aggregate: "Case") -> "Case.Snapshot":
+            snapshot = super().take(aggregate)
+            if snapshot.state.get("claim_ids") is not None:
+                snapshot.state["claim_ids"] = list(snapshot.state["claim_ids"])
+            return snapshot
+
+        def mutate(self, _: None) -> "Case":
+            case = super().mutate(_)
+            case.status = CaseStatus(case.status)
+            if getattr(case, "claim_ids", None) is not None:
+                case.claim_ids = set(case.claim_ids)
+            return case
+
     @event("Submitted")
     def __init__(
         self,
@@ -1,14 +1,32 @@
 import json
 import random
+from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
 from eventsourcing.application import Application
+from eventsourcing.dispatch import singledispatchmethod
 
+from ..replay import replay_events
 from .aggregate import Case, CaseStatus
 
 
+@dataclass
+class CaseSummary:
+    """Read model of a case for listings, kept up to date from the events of the case"""
+
+    id: str
+    bsn: str
+    service: str
+    law: str
+    status: CaseStatus
+    approved: bool | None
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+
 class CaseManager(Application):
     """
     Application service for managing service cases.
@@ -18,21 +36,92 @@ class CaseManager(Application):
     # SAMPLE_RATE = 0.50
     SAMPLE_RATE = 0.0
 
+    # A snapshot of a case is taken every this many events, so loading a case replays at most that many events.
+    # The SNAPSHOTTING_INTERVAL environment variable overrides it, 0 turns snapshotting off.
+    snapshotting_intervals = {Case: 10}
+
     def __init__(self, rules_engine, **kwargs) -> None:
         super().__init__(**kwargs)
         self.rules_engine = rules_engine
+        interval = self.env.get("SNAPSHOTTING_INTERVAL")
+        if interval is not None:
+            self.snapshotting_intervals = {Case: int(interval)} if int(interval) else {}
+        # Projections of the saved events, so listing cases doesn't need to replay every case
         self._case_index: dict[tuple[str, str, str], str] = {}  # (bsn, service, law) -> case_id
+        self._bsn_index: dict[str, list[str]] = {}  # bsn -> [case_ids]
+        self._law_index: dict[tuple[str, str], list[str]] = {}  # (service, law) -> [case_ids]
+        # (service, status) -> case_ids, a dict as an insertion ordered set
+        self._status_index: dict[tuple[str, CaseStatus], dict[str, None]] = {}
+        self._summaries: dict[str, CaseSummary] = {}  # case_id -> summary
+        # On a durable event store the projections are rebuilt from the events recorded before a restart
+        replay_events(self, self._project)
         # self.follow()
 
+    def save(self, *objs, **kwargs):
+        recordings = super().save(*objs, **kwargs)
+        for recording in recordings:
+            self._project(recording.domain_event)
+        # Every saved case adds events, which rules can read as a source
+        self.rules_engine.invalidate_events()
+        return recordings
+
     @staticmethod
     def _index_key(bsn: str, service_type: str, law: str) -> tuple[str, str, str]:
         """Generate index key for the combination of bsn, service and law"""
         return (bsn, service_type, law)
 
-    def _index_case(self, case: Case) -> None:
-        """Add case to index"""
-        key = self._index_key(case.bsn, case.service, case.law)
-        self._case_index[key] = str(case.id)
+    @singledispatchmethod
+    def _project(self, domain_event) -> None:
+        """Update the indexes and summaries with a saved event, events that change neither are ignored"""
+
+    @_project.register(Case.Submitted)
+    def _(self, domain_event) -> None:
+        case_id = str(domain_event.originator_id)
+        summary = CaseSummary(
+            id=case_id,
+            bsn=domain_event.bsn,
+            service=domain_event.service_type,
+            law=domain_event.law,
+            status=CaseStatus.SUBMITTED,
+            approved=None,
+            version=domain_event.originator_version,
+            created_at=domain_event.timestamp,
+            updated_at=domain_event.timestamp,
+        )
+        self._summaries[case_id] = summary
+        self._case_index[self._index_key(summary.bsn, summary.service, summary.law)] = case_id
+        self._bsn_index.setdefault(summary.bsn, []).append(case_id)
+        self._law_index.setdefault((summary.service, summary.law), []).append(case_id)
+        self._status_index.setdefault((summary.service, summary.status), {})[case_id] = None
+
+    @_project.register(Case.Reset)
+    def _(self, domain_event) -> None:
+        self._update_summary(domain_event, CaseStatus.SUBMITTED, approved=None)
+
+    @_project.register(Case.AddedToManualReview)
+    def _(self, domain_event) -> None:
+        self._update_summary(domain_event, CaseStatus.IN_REVIEW)
+
+    @_project.register(Case.AutomaticallyDecided)
+    @_project.register(Case.Decided)
+    def _(self, domain_event) -> None:
+        self._update_summary(domain_event, CaseStatus.DECIDED, approved=domain_event.approved)
+
+    @_project.register(Case.Objected)
+    def _(self, domain_event) -> None:
+        self._update_summary(domain_event, CaseStatus.OBJECTED)
+
+    def _update_summary(self, domain_event, status: CaseStatus, **changes) -> None:
+        summary = self._summaries.get(str(domain_event.originator_id))
+        if summary is None:
+            return
+        self._status_index[(summary.service, summary.status)].pop(summary.id, None)
+        self._status_index.setdefault((summary.service, status), {})[summary.id] = None
+        summary.status = status
+        for name, value in changes.items():
+            setattr(summary, name, value)
+        summary.version = domain_event.originator_version
+        summary.updated_at = domain_event.timestamp
 
     @staticmethod
     def _results_match(claimed_result: dict, verified_result: dict) -> bool:
@@ -136,9 +225,8 @@ class CaseManager(Application):
                 verified_result=verified_result,
             )
 
-        # Save and index
+        # Save, which also indexes the case
         self.save(case)
-        self._index_case(case)
 
         return str(case.id)
 
@@ -289,22 +377,12 @@ class CaseManager(Application):
 
     def get_cases_by_status(self, service_type: str, status: CaseStatus) -> list[Case]:
         """Get all cases for a service in a particular status"""
-        return [
-            self.get_case_by_id(case_id)
-            for case_id in self._case_index.values()
-            if self.repository.get(case_id).service == service_type and self.repository.get(case_id).status == status
-        ]
+        case_ids = self._status_index.get((service_type, CaseStatus(status)), {})
+        return [self.get_case_by_id(case_id) for case_id in list(case_ids)]
 
     def get_cases_by_bsn(self, bsn: str) -> list[Case]:
         """Get all cases for a specific citizen by BSN"""
-        cases = []
-        for key_tuple, case_id in self._case_index.items():
-            key_bsn, _, _ = key_tuple  # Unpack the (bsn, service, law) tuple
-            if key_bsn == bsn:
-                case = self.get_case_by_id(case_id)
-                if case:
-                    cases.append(case)
-        return cases
+        return [self.get_case_by_id(case_id) for case_id in self._bsn_index.get(bsn, [])]
 
     def get_case_by_id(self, case_id: str | UUID | None) -> Case | None:
         """Get case by ID"""
@@ -318,12 +396,36 @@ class CaseManager(Application):
 
     def get_cases_by_law(self, law: str, service_type: str) -> list[Case]:
         """Get all cases for a specific law and service combination"""
-        cases = []
-        for _key, case_id in self._case_index.items():
-            case = self.get_case_by_id(case_id)
-            if case.law == law and case.service == service_type:
-                cases.append(case)
-        return cases
+        return [self.get_case_by_id(case_id) for case_id in self._law_index.get((service_type, law), [])]
+
+    def get_case_summary(self, case_id: str | UUID) -> CaseSummary | None:
+        """Get the summary of a case by ID, without loading the case"""
+        return self._summaries.get(str(case_id))
+
+    def get_case_summaries(
+        self,
+        service_type: str | None = None,
+        law: str | None = None,
+        status: CaseStatus | None = None,
+        bsn: str | None = None,
+    ) -> list[CaseSummary]:
+        """Get the summaries of the cases matching all given filters, without loading any case"""
+        if bsn is not None:
+            case_ids = self._bsn_index.get(bsn, [])
+        elif service_type is not None and law is not None:
+            case_ids = self._law_index.get((service_type, law), [])
+        elif service_type is not None and status is not None:
+            case_ids = self._status_index.get((service_type, CaseStatus(status)), {})
+        else:
+            case_ids = self._summaries
+        return [
+            summary
+            for summary in map(self._summaries.get, list(case_ids))
+            if (service_type is None or summary.service == service_type)
+            and (law is None or summary.law == law)
+            and (status is None or summary.status == status)
+            and (bsn is None or summary.bsn == bsn)
+        ]
 
     def get_events(self, case_id=None):
         notification_log = self.notification_log
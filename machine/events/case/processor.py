@@ -1,15 +1,24 @@
-import asyncio
+from concurrent.futures import wait
 
 from eventsourcing.dispatch import singledispatchmethod
 from eventsourcing.system import ProcessApplication
+from eventsourcing.utils import strtobool
 
 from machine.events.case.aggregate import Case
+from machine.events.case.rule_worker import RuleApplicationWorker
 
 
 class CaseProcessor(ProcessApplication):
     def __init__(self, rules_engine, **kwargs) -> None:
         super().__init__(**kwargs)
         self.rules_engine = rules_engine
+        # Rules are applied by one long-lived worker. By default the policy waits for them, so what rules derive from
+        # a decision (e.g. whether objection is possible) is recorded before deciding the case returns. With
+        # APPLY_RULES_ASYNC set, deciding returns earlier. RULES_QUEUE_SIZE bounds the events waiting for the worker.
+        self.apply_rules_async = strtobool(self.env.get("APPLY_RULES_ASYNC", "n"))
+        self.rule_worker = RuleApplicationWorker(
+            rules_engine.apply_rules, maxsize=int(self.env.get("RULES_QUEUE_SIZE", "1000"))
+        )
 
     @singledispatchmethod
     def policy(self, domain_event, process_event) -> None:
@@ -19,19 +28,11 @@ class CaseProcessor(ProcessApplication):
     @policy.register(Case.AutomaticallyDecided)
     @policy.register(Case.Decided)
     def _(self, domain_event, process_event) -> None:
-        try:
-            # Create a new event loop in a new thread
-            def run_async():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                return loop.run_until_complete(self.rules_engine.apply_rules(domain_event))
-
-            # Run in a separate thread
-            import threading
-
-            thread = threading.Thread(target=run_async)
-            thread.start()
-            thread.join()  # Wait for completion
-
-        except Exception as e:
-            print(f"Error processing rules: {e}")
+        future = self.rule_worker.submit(domain_event)
+        # The worker can't wait for itself, it applies events it submits after the current ones
+        if not self.apply_rules_async and not self.rule_worker.in_worker:
+            wait([future])
+
+    def close(self) -> None:
+        self.rule_worker.close()
+        super().close()
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class RuleApplicationWorker:
+    """
+    Long-lived thread applying rules to case events, see Services.apply_rules.
+
+    Events wait in a bounded queue, submitting blocks while it is full so producers can't run ahead of the rules
+    indefinitely. The worker takes the queued events in batches and groups a batch by case, keeping the events of a
+    case in the order they were submitted. The rules are still applied one event at a time, the grouping only orders
+    the work. Every event gets a future that completes once its rules are applied, or with the error applying them,
+    for callers that need to wait for them. Services.stats() reports the counters.
+    """
+
+    def __init__(self, apply_rules: Callable[[Any], None], maxsize: int = 1000, batch_size: int = 100) -> None:
+        self._apply_rules = apply_rules
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self._queue: queue.Queue[tuple[Any, Future] | None] = queue.Queue(maxsize)
+        # Events submitted while the worker applies rules, these can't wait for room in the queue
+        self._followups: deque[tuple[Any, Future]] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.submitted = 0
+        self.applied = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_queued = 0
+        self.busy_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="rule-application", daemon=True)
+        self._thread.start()
+
+    @property
+    def in_worker(self) -> bool:
+        """Whether this is the worker thread, which must not wait for the futures of the events it submits"""
+        return threading.current_thread() is self._thread
+
+    def submit(self, event: Any, timeout: float | None = None) -> Future:
+        """Queue an event to apply rules to, raises queue.Full if the queue stays full for timeout seconds"""
+        if self._closed:
+            raise RuntimeError("Rule application worker is closed")
+        future = Future()
+        if self.in_worker:
+            self._followups.append((event, future))
+        else:
+            self._queue.put((event, future), timeout=timeout)
+        with self._lock:
+            self.submitted += 1
+            self.max_queued = max(self.max_queued, self._queue.qsize() + len(self._followups))
+        return future
+
+    def close(self) -> None:
+        """Apply the rules to the events already queued, then stop the worker"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        if not self.in_worker:
+            self._thread.join()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "applied": self.applied,
+                "failed": self.failed,
+                "batches": self.batches,
+                "queued": self._queue.qsize() + len(self._followups),
+                "max_queued": self.max_queued,
+                "maxsize": self.maxsize,
+                "busy_seconds": self.busy_seconds,
+            }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping or self._followups:
+            batch = []
+            while self._followups and len(batch) < self.batch_size:
+                batch.append(self._followups.popleft())
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    # Only wait for events when there is nothing to do
+                    item = self._queue.get(block=not batch)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._apply_batch(batch)
+
+    def _apply_batch(self, batch: list[tuple[Any, Future]]) -> None:
+        start = time.perf_counter()
+        by_case: dict[Any, list[tuple[Any, Future]]] = {}
+        for event, future in batch:
+            by_case.setdefault(event.originator_id, []).append((event, future))
+
+        applied = failed = 0
+        for items in by_case.values():
+            for event, future in items:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    self._apply_rules(event)
+                except Exception as e:
+                    logger.exception("Error applying rules to %s of case %s", type(event).__name__, event.originator_id)
+                    failed += 1
+                    future.set_exception(e)
+                else:
+                    applied += 1
+                    future.set_result(None)
+
+        with self._lock:
+            self.applied += applied
+            self.failed += failed
+            self.batches += 1
+            self.busy_seconds += time.perf_counter() - start
@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Any
 
-from eventsourcing.domain import Aggregate, event
+from eventsourcing.domain import Aggregate, Snapshot, event
 from eventsourcing.persistence import Transcoding
 
 
@@ -30,6 +30,14 @@ Transcoding.register(ClaimStatusTranscoding)
 
 
 class Claim(Aggregate):
+    class Snapshot(Snapshot):
+        """Snapshot of a claim. JSON has no enums, so the status is restored on loading."""
+
+        def mutate(self, _: None) -> "Claim":
+            claim = super().mutate(_)
+            claim.status = ClaimStatus(claim.status)
+            return claim
+
     @event("Created")
     def __init__(
         self,
@@ -1,8 +1,10 @@
 from typing import Any
 from uuid import UUID
 
-from eventsourcing.application import Application
+from eventsourcing.application import AggregateNotFoundError, Application
+from eventsourcing.dispatch import singledispatchmethod
 
+from ..replay import replay_events
 from .aggregate import Claim, ClaimStatus
 
 
@@ -12,47 +14,77 @@ class ClaimManager(Application):
     Claims can be made against services, with optional case references.
     """
 
+    # A snapshot of a claim is taken every this many events, see CaseManager
+    snapshotting_intervals = {Claim: 10}
+
     def __init__(self, rules_engine, **kwargs) -> None:
         super().__init__(**kwargs)
         self.rules_engine = rules_engine
-        # Various indexes for quick lookups
+        interval = self.env.get("SNAPSHOTTING_INTERVAL")
+        if interval is not None:
+            self.snapshotting_intervals = {Claim: int(interval)} if int(interval) else {}
+        # Various indexes for quick lookups, projections of the saved events
         self._service_index: dict[str, list[str]] = {}  # service -> [claim_ids]
         self._case_index: dict[str, list[str]] = {}  # case_id -> [claim_ids]
         self._claimant_index: dict[str, list[str]] = {}  # claimant -> [claim_ids]
         self._bsn_index: dict[str, list[str]] = {}  # claimant -> [claim_ids]
-        self._status_index: dict[ClaimStatus, list[str]] = {status: [] for status in ClaimStatus}
+        # status -> claim_ids, a dict as an insertion ordered set
+        self._status_index: dict[ClaimStatus, dict[str, None]] = {status: {} for status in ClaimStatus}
+        self._claim_statuses: dict[str, ClaimStatus] = {}  # claim_id -> status
         self._bsn_service_law_index: dict[tuple[str, str, str], dict[str, str]] = {}  # (service, key) -> claim_id
         self._case_manager = None
-
-    def _index_claim(self, claim: Claim) -> None:
-        """Add claim to all indexes"""
-        claim_id = str(claim.id)
-
-        # Service index
-        if claim.service not in self._service_index:
-            self._service_index[claim.service] = []
-        self._service_index[claim.service].append(claim_id)
-
-        # Case index (if applicable)
-        if claim.case_id:
-            if claim.case_id not in self._case_index:
-                self._case_index[claim.case_id] = []
-            self._case_index[claim.case_id].append(claim_id)
-
-        # Claimant index
-        if claim.claimant not in self._claimant_index:
-            self._claimant_index[claim.claimant] = []
-        self._claimant_index[claim.claimant].append(claim_id)
-
-        # BSN index
-        if claim.bsn not in self._bsn_index:
-            self._bsn_index[claim.bsn] = []
-        self._bsn_index[claim.bsn].append(claim_id)
-
-        # Service-Key index
-        if (claim.bsn, claim.service, claim.law) not in self._bsn_service_law_index:
-            self._bsn_service_law_index[(claim.bsn, claim.service, claim.law)] = {}
-        self._bsn_service_law_index[(claim.bsn, claim.service, claim.law)][claim.key] = claim_id
+        # On a durable event store the indexes are rebuilt from the events recorded before a restart
+        replay_events(self, self._project)
+
+    @singledispatchmethod
+    def _project(self, domain_event) -> None:
+        """Update the indexes with a saved event, events that change none of them are ignored"""
+
+    @_project.register(Claim.Created)
+    def _(self, domain_event) -> None:
+        claim_id = str(domain_event.originator_id)
+        self._service_index.setdefault(domain_event.service, []).append(claim_id)
+        if domain_event.case_id:
+            self._case_index.setdefault(domain_event.case_id, []).append(claim_id)
+        self._claimant_index.setdefault(domain_event.claimant, []).append(claim_id)
+        self._bsn_index.setdefault(domain_event.bsn, []).append(claim_id)
+        key = (domain_event.bsn, domain_event.service, domain_event.law)
+        self._bsn_service_law_index.setdefault(key, {})[domain_event.key] = claim_id
+        self._set_status(claim_id, ClaimStatus.PENDING)
+
+    @_project.register(Claim.Reset)
+    def _(self, domain_event) -> None:
+        self._set_status(str(domain_event.originator_id), ClaimStatus.PENDING)
+
+    @_project.register(Claim.AutoApproved)
+    @_project.register(Claim.Approved)
+    def _(self, domain_event) -> None:
+        self._set_status(str(domain_event.originator_id), ClaimStatus.APPROVED)
+
+    @_project.register(Claim.Rejected)
+    def _(self, domain_event) -> None:
+        self._set_status(str(domain_event.originator_id), ClaimStatus.REJECTED)
+
+    @_project.register(Claim.CaseLinked)
+    def _(self, domain_event) -> None:
+        self._case_index.setdefault(domain_event.case_id, []).append(str(domain_event.originator_id))
+
+    def _set_status(self, claim_id: str, status: ClaimStatus) -> None:
+        previous = self._claim_statuses.get(claim_id)
+        if previous is not None:
+            self._status_index[previous].pop(claim_id, None)
+        self._status_index[status][claim_id] = None
+        self._claim_statuses[claim_id] = status
+
+    def save(self, *objs, **kwargs):
+        recordings = super().save(*objs, **kwargs)
+        for recording in recordings:
+            self._project(recording.domain_event)
+        # Results computed with the previous state of these claims are stale now
+        for obj in objs:
+            if isinstance(obj, Claim):
+                self.rules_engine.invalidate_claim(obj.bsn, obj.service, obj.law)
+        return recordings
 
     @property
     def case_manager(self):
@@ -76,54 +108,76 @@ class ClaimManager(Application):
         Submit a new claim. Can be linked to an existing case or standalone.
         If auto_approve is True, the claim will be automatically approved.
         """
-        existing_claims = self.get_claim_by_bsn_service_law(bsn, service, law, include_rejected=True)
-        if existing_claims and key in existing_claims:
-            claim = existing_claims[key]
-            claim.reset(
-                service=service,
-                key=key,
-                new_value=new_value,
-                reason=reason,
-                claimant=claimant,
-                case_id=case_id,
-                old_value=old_value,
-                evidence_path=evidence_path,
-                law=law,
-                bsn=bsn,
-            )
-            self.save(claim)
-        else:
-            claim = Claim(
-                service=service,
-                key=key,
-                new_value=new_value,
-                reason=reason,
-                claimant=claimant,
-                case_id=case_id,
-                old_value=old_value,
-                evidence_path=evidence_path,
-                law=law,
-                bsn=bsn,
-            )
-            self.save(claim)
-            self._index_claim(claim)
-
-        case = None
-        if claim.case_id:
-            case = self.case_manager.get_case_by_id(claim.case_id)
-            if case:
-                case.add_claim(claim.id)
-                self.case_manager.save(case)
-
-        # Auto-approve if requested
-        if auto_approve:
-            claim.auto_approve(verified_by=claimant, verified_value=new_value)
-            self.save(claim)
-            if case:
-                case.approve_claim(claim.id)
-                self.case_manager.save(case)
+        return self.submit_claims_bulk(
+            [
+                {
+                    "service": service,
+                    "key": key,
+                    "new_value": new_value,
+                    "reason": reason,
+                    "claimant": claimant,
+                    "law": law,
+                    "bsn": bsn,
+                    "case_id": case_id,
+                    "old_value": old_value,
+                    "evidence_path": evidence_path,
+                    "auto_approve": auto_approve,
+                }
+            ]
+        )[0]
+
+    def submit_claims_bulk(self, claims: list[dict[str, Any]]) -> list[str]:
+        """
+        Submit many claims at once, each a dict with the arguments of submit_claim. Returns the claim ids, in order.
 
-        return str(claim.id)
+        Claims are created, reset and auto-approved in memory, as submit_claim would one after the other, and then
+        all their events are saved in one transaction, and the events of the linked cases in another. Existing claims
+        are looked up once per (bsn, service, law), and every claim and case is loaded at most once. A claim whose
+        case doesn't exist is saved with its case_id, without adding it to a case.
+        """
+        pending: dict[UUID, Claim] = {}  # claim id -> claim with unsaved events
+        cases = {}  # case id -> case with unsaved events
+        groups: dict[tuple[str, str, str], dict[str, Claim]] = {}  # (bsn, service, law) -> {key: claim}
+        claim_ids = []
+        for arguments in claims:
+            arguments = dict(arguments)
+            auto_approve = arguments.pop("auto_approve", False)
+            group_key = (arguments["bsn"], arguments["service"], arguments["law"])
+            group = groups.get(group_key)
+            if group is None:
+                key_index = self._bsn_service_law_index.get(group_key, {})
+                group = groups[group_key] = {key: self.get_claim(claim_id) for key, claim_id in key_index.items()}
+
+            claim = group.get(arguments["key"])
+            if claim is not None:
+                claim.reset(**arguments)
+            else:
+                claim = group[arguments["key"]] = Claim(**arguments)
+            pending[claim.id] = claim
+
+            case = None
+            if claim.case_id:
+                case = cases.get(claim.case_id)
+                if case is None:
+                    try:
+                        case = self.case_manager.get_case_by_id(claim.case_id)
+                    except AggregateNotFoundError:
+                        # The claim is still saved, it just isn't added to a case
+                        case = None
+                if case:
+                    cases[claim.case_id] = case
+                    case.add_claim(claim.id)
+
+            if auto_approve:
+                claim.auto_approve(verified_by=claim.claimant, verified_value=claim.new_value)
+                if case:
+                    case.approve_claim(claim.id)
+            claim_ids.append(str(claim.id))
+
+        self.save(*pending.values())
+        if cases:
+            self.case_manager.save(*cases.values())
+        return claim_ids
 
     def approve_claim(self, claim_id: str, verified_by: str, verified_value: Any) -> None:
         """Approve a claim with verified value"""
@@ -155,11 +209,6 @@ class ClaimManager(Application):
         claim.link_case(case_id)
         self.save(claim)
 
-        # Update case index
-        if case_id not in self._case_index:
-            self._case_index[case_id] = []
-        self._case_index[case_id].append(str(claim.id))
-
     def add_evidence(self, claim_id: str, evidence_path: str) -> None:
         """Add evidence to an existing claim"""
         claim = self.get_claim(claim_id)
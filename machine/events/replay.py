@@ -0,0 +1,26 @@
+from collections.abc import Callable
+
+from eventsourcing.application import Application
+
+# Notifications read per query when replaying the log, large pages keep the number of round trips to a durable
+# store low on startup
+REPLAY_PAGE_SIZE = 1000
+
+
+def replay_events(application: Application, project: Callable, page_size: int = REPLAY_PAGE_SIZE) -> int:
+    """
+    Pass every event recorded by an application to project, in the order they were recorded.
+
+    Scans the notification log once, instead of loading every aggregate from its own events, so the in-memory
+    indexes of an application on a durable store can be rebuilt quickly on startup. Returns the number of events.
+    """
+    count = 0
+    start = 1
+    while True:
+        notifications = application.recorder.select_notifications(start=start, limit=page_size)
+        for notification in notifications:
+            project(application.mapper.to_domain_event(notification))
+        count += len(notifications)
+        if len(notifications) < page_size:
+            return count
+        start = notifications[-1].id + 1
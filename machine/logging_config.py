@@ -1,84 +1,96 @@
 import logging
 from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import lru_cache
 
 
-class GlobalIndent:
-    """Global indentation and tree state"""
+class Indent:
+    """
+    Indentation and tree state of the current context
+
+    The state lives in a context variable, so concurrent evaluations (threads, asyncio tasks) each keep
+    their own indentation. It is an immutable tuple with a double_line flag per open block.
+    """
 
-    _level = 0
     _tree_chars_single = {"pipe": "│", "branch": "├──", "leaf": "└──", "space": " " * 3}
     _tree_chars_double = {"pipe": "║", "branch": "║──", "leaf": "╚══", "space": " " * 3}
-    _active_branches = set()
-    _double_lines = set()
+    _blocks: ContextVar[tuple[bool, ...]] = ContextVar("indent_blocks", default=())
 
     @classmethod
-    def increase(cls, double_line: bool = False) -> None:
-        cls._level += 1
-        cls._active_branches.add(cls._level - 1)
-        if double_line:
-            cls._double_lines.add(cls._level - 1)
+    def increase(cls, double_line: bool = False) -> Token:
+        return cls._blocks.set((*cls._blocks.get(), double_line))
 
     @classmethod
-    def decrease(cls) -> None:
-        if cls._level > 0:
-            # No longer active - will show end corner
-            cls._active_branches.discard(cls._level - 1)
-            cls._double_lines.discard(cls._level - 1)
-            cls._level -= 1
+    def decrease(cls, token: Token | None = None) -> None:
+        if token is not None:
+            cls._blocks.reset(token)
+        elif blocks := cls._blocks.get():
+            cls._blocks.set(blocks[:-1])
 
     @classmethod
     def get_indent(cls) -> str:
-        if cls._level == 0:
+        return cls._render(cls._blocks.get())
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _render(cls, blocks: tuple[bool, ...]) -> str:
+        if not blocks:
             return ""
 
+        # All enclosing blocks are still open, so they show a pipe and the current block a branch
         parts = []
-        # For all levels except current, show pipe only if level is still active
-        for i in range(cls._level - 1):
-            if i in cls._active_branches:
-                chars = cls._tree_chars_double if i in cls._double_lines else cls._tree_chars_single
-                parts.append(f"{chars['pipe']}   ")
-            else:
-                parts.append("    ")
-
-        # For current level, use leaf if not active (end of block)
-        chars = cls._tree_chars_double if (cls._level - 1) in cls._double_lines else cls._tree_chars_single
-        is_end = (cls._level - 1) not in cls._active_branches
-        parts.append(chars["leaf"] if is_end else chars["branch"])
+        for double_line in blocks[:-1]:
+            chars = cls._tree_chars_double if double_line else cls._tree_chars_single
+            parts.append(f"{chars['pipe']}   ")
+        chars = cls._tree_chars_double if blocks[-1] else cls._tree_chars_single
+        parts.append(chars["branch"])
         return "".join(parts)
 
 
 class IndentLogger:
-    """Logger wrapper that handles indentation using global state"""
+    """
+    Logger wrapper that handles indentation using context state
+
+    Messages take %-style arguments like the logging module, formatting (including the indentation)
+    only happens for enabled levels. Callers building expensive arguments should check isEnabledFor.
+    """
 
     def __init__(self, logger: logging.Logger) -> None:
         self._logger = logger
 
+    def isEnabledFor(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
     def debug(self, msg: str, *args, **kwargs) -> None:
-        self._logger.debug(f"{self.indent}{msg}", *args, **kwargs)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"{self.indent}{msg}", *args, **kwargs)
 
     def info(self, msg: str, *args, **kwargs) -> None:
-        self._logger.info(f"{self.indent}{msg}", *args, **kwargs)
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(f"{self.indent}{msg}", *args, **kwargs)
 
     def warning(self, msg: str, *args, **kwargs) -> None:
-        self._logger.warning(f"{self.indent}{msg}", *args, **kwargs)
+        if self._logger.isEnabledFor(logging.WARNING):
+            self._logger.warning(f"{self.indent}{msg}", *args, **kwargs)
 
     def error(self, msg: str, *args, **kwargs) -> None:
-        self._logger.error(f"{self.indent}{msg}", *args, **kwargs)
+        if self._logger.isEnabledFor(logging.ERROR):
+            self._logger.error(f"{self.indent}{msg}", *args, **kwargs)
 
     @property
     def indent(self) -> str:
-        return GlobalIndent.get_indent()
+        return Indent.get_indent()
 
     @contextmanager
-    def indent_block(self, initial_message: str | None = None, double_line: bool = False):
-        """Context manager for handling indentation blocks"""
+    def indent_block(self, initial_message: str | None = None, *args, double_line: bool = False):
+        """Context manager for handling indentation blocks, the initial message takes %-style arguments"""
         if initial_message:
-            self.debug(initial_message)
-        GlobalIndent.increase(double_line)
+            self.debug(initial_message, *args)
+        token = Indent.increase(double_line)
         try:
             yield
         finally:
-            GlobalIndent.decrease()
+            Indent.decrease(token)
 
 
 def configure_logging(level: str | None = None):
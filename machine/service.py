@@ -1,19 +1,25 @@
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 import pandas as pd
 from eventsourcing.system import SingleThreadedRunner, System
 
-from .context import PathNode
+from .cache import ResultCache, freeze
+from .context import PathNode, TraceLevel
 from .engine import RulesEngine
 from .events.case.application import CaseManager
 from .events.case.processor import CaseProcessor
 from .events.claim.application import ClaimManager
 from .events.claim.processor import ClaimProcessor
 from .logging_config import IndentLogger
-from .utils import RuleResolver
+from .sources import SourceIndex
+from .utils import RuleResolver, load_yaml_cached
 
 logger = IndentLogger(logging.getLogger("service"))
 
@@ -41,6 +47,25 @@ class RuleResult:
             missing_required=result.get("missing_required", False),
         )
 
+    @classmethod
+    def from_batch_frame(cls, frame: pd.DataFrame) -> list["RuleResult"]:
+        """Create one RuleResult per row of a batch evaluation result (without input and path)"""
+        outputs = frame.attrs.get("outputs", [])
+        return [
+            cls(
+                output=output if requirements_met else {},
+                requirements_met=requirements_met,
+                input={},
+                rulespec_uuid=frame.attrs.get("rulespec_uuid"),
+                missing_required=missing_required,
+            )
+            for output, requirements_met, missing_required in zip(
+                frame[outputs].to_dict("records") if outputs else [{}] * len(frame),
+                frame["requirements_met"].tolist(),
+                frame["missing_required"].tolist(),
+            )
+        ]
+
 
 class RuleService:
     """Interface for executing business rules for a specific service"""
@@ -56,39 +81,29 @@ class RuleService:
         self.service_name = service_name
         self.services = services
         self.resolver = RuleResolver()
-        self._engines: dict[str, dict[str, RulesEngine]] = {}
+        # Engines by rule path
+        self._engines: dict[str, RulesEngine] = {}
         self.source_dataframes: dict[str, pd.DataFrame] = {}
+        self.source_index = SourceIndex()
 
     def _get_engine(self, law: str, reference_date: str) -> RulesEngine:
-        """Get or create RulesEngine instance for given law and date"""
-        # Use a single dictionary with tuple keys for more efficient lookup
-        cache_key = (law, reference_date)
-
-        # Flatten the nested dictionaries into a single lookup
-        engines_cache = getattr(self, "_engines_cache", {})
-        if not hasattr(self, "_engines_cache"):
-            self._engines_cache = engines_cache
-
-        if cache_key in engines_cache:
-            return engines_cache[cache_key]
-
-        # If we need to create a new engine, keep the law dictionary for backward compatibility
-        if law not in self._engines:
-            self._engines[law] = {}
-
-        if reference_date not in self._engines[law]:
-            spec = self.resolver.get_rule_spec(law, reference_date, service=self.service_name)
-            if not spec:
-                raise ValueError(f"No rules found for law '{law}' at date '{reference_date}'")
+        """Get or create the RulesEngine for the rule version valid for given law and date"""
+        rule = self.resolver.find_rule(law, reference_date, service=self.service_name)
+        if rule is None:
+            raise ValueError(f"No rules found for law '{law}' at date '{reference_date}'")
+
+        # Dates resolving to the same rule version share one engine
+        engine = self._engines.get(rule.path)
+        if engine is None:
+            spec = load_yaml_cached(rule.path)
             if spec.get("service") != self.service_name:
                 raise ValueError(
                     f"Rule spec service '{spec.get('service')}' does not match service '{self.service_name}'"
                 )
             engine = RulesEngine(spec=spec, service_provider=self.services)
-            self._engines[law][reference_date] = engine
-            engines_cache[cache_key] = engine
+            self._engines[rule.path] = engine
 
-        return engines_cache[cache_key]
+        return engine
 
     def evaluate(
         self,
@@ -98,6 +113,8 @@ class RuleService:
         overwrite_input: dict[str, Any] | None = None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: TraceLevel | str = TraceLevel.FULL,
+        definition_overrides: dict[str, Any] | None = None,
     ) -> RuleResult:
         """
         Evaluate rules for given law and reference date
@@ -108,6 +125,8 @@ class RuleService:
             parameters: Context data for service provider
             overwrite_input: Optional overrides for input values
             requested_output: Optional specific output field to calculate
+            trace: How much of the evaluation path to record ("none", "inputs-only" or "full")
+            definition_overrides: Optional overrides for definitions, as {service: {law: {name: value}}}
 
         Returns:
             RuleResult containing outputs and metadata
@@ -116,13 +135,54 @@ class RuleService:
         result = engine.evaluate(
             parameters=parameters,
             overwrite_input=overwrite_input,
+            definition_overrides=definition_overrides,
             sources=self.source_dataframes,
             calculation_date=reference_date,
             requested_output=requested_output,
             approved=approved,
+            trace=trace,
+            source_index=self.source_index,
         )
         return RuleResult.from_engine_result(result, engine.spec.get("uuid"))
 
+    def evaluate_batch(
+        self,
+        law: str,
+        reference_date: str,
+        parameters: dict[str, Any],
+        overwrite_input: dict[str, Any] | None = None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        definition_overrides: dict[str, Any] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Evaluate rules for given law and reference date for many parameter rows at once
+
+        Args:
+            law: Name of the law (e.g. "zorgtoeslagwet")
+            reference_date: Reference date for rule version (YYYY-MM-DD)
+            parameters: Parameter name to a sequence of values, one per row
+            overwrite_input: Optional overrides for input values
+            requested_output: Optional specific output field to calculate
+            definition_overrides: Optional overrides for definitions, as {service: {law: {name: value}}}
+
+        Returns:
+            DataFrame with one row per parameter row, see RulesEngine.evaluate_batch
+        """
+        engine = self._get_engine(law, reference_date)
+        result = engine.evaluate_batch(
+            parameters=parameters,
+            overwrite_input=overwrite_input,
+            definition_overrides=definition_overrides,
+            sources=self.source_dataframes,
+            calculation_date=reference_date,
+            requested_output=requested_output,
+            approved=approved,
+            source_index=self.source_index,
+        )
+        result.attrs["rulespec_uuid"] = engine.spec.get("uuid")
+        return result
+
     def get_rule_info(self, law: str, reference_date: str) -> dict[str, Any] | None:
         """
         Get metadata about the rule that would be applied for given law and date
@@ -142,13 +202,37 @@ class RuleService:
         return None
 
     def set_source_dataframe(self, table: str, df: pd.DataFrame) -> None:
-        """Set a source DataFrame"""
+        """Set a source DataFrame, replacing the indexes and cached results built on the previous one"""
         self.source_dataframes[table] = df
+        self.source_index.invalidate(table)
+        self.services.result_cache.invalidate(("source", self.service_name))
+
+    def cache_dependencies(self, law: str, reference_date: str, parameters: dict[str, Any]) -> set[tuple]:
+        """State an evaluation of this service reads directly, see ResultCache"""
+        dependencies = {("source", self.service_name)}
+        if "BSN" in parameters:
+            dependencies.add(("claim", parameters["BSN"], self.service_name, law))
+        if self._get_engine(law, reference_date).reads_events:
+            dependencies.add(("events",))
+        return dependencies
 
 
 class Services:
-    def __init__(self, reference_date: str) -> None:
+    def __init__(
+        self,
+        reference_date: str,
+        result_cache_size: int = 4096,
+        prefetch_workers: int = 0,
+        event_store_dir: str | None = None,
+    ) -> None:
         self._impact_cache = None
+        # Results of evaluations, reused across top-level evaluations until the claims, sources or case
+        # events they were computed from change
+        self.result_cache = ResultCache(result_cache_size)
+        # Threads evaluating independent service references ahead of time (0 disables prefetching)
+        self.prefetch_workers = prefetch_workers
+        self._prefetch_executor: ThreadPoolExecutor | None = None
+        self._prefetch_local = threading.local()
         self.resolver = RuleResolver()
         self.services = {service: RuleService(service, self) for service in self.resolver.get_service_laws()}
         self.root_reference_date = reference_date
@@ -175,16 +259,32 @@ class Services:
             pipes=[[WrappedCaseManager, WrappedCaseProcessor], [WrappedClaimManager, WrappedClaimProcessor]]
         )
 
-        self.runner = SingleThreadedRunner(system)
+        # Events are kept in memory, unless a directory is given to keep them in, so cases and claims survive a
+        # restart. Every application gets its own SQLite database (in WAL mode), the processors included, so they
+        # continue after the last event they processed instead of processing every event again.
+        env = {}
+        if event_store_dir is not None:
+            Path(event_store_dir).mkdir(parents=True, exist_ok=True)
+            env["PERSISTENCE_MODULE"] = "eventsourcing.sqlite"
+            for app_class in (WrappedCaseManager, WrappedCaseProcessor, WrappedClaimManager, WrappedClaimProcessor):
+                env[f"{app_class.name.upper()}_SQLITE_DBNAME"] = str(Path(event_store_dir) / f"{app_class.name}.sqlite")
+        self.runner = SingleThreadedRunner(system, env=env)
         self.runner.start()
 
         self.case_manager = self.runner.get(WrappedCaseManager)
+        self.case_processor = self.runner.get(WrappedCaseProcessor)
         self.claim_manager = self.runner.get(WrappedClaimManager)
 
         self.claim_manager._case_manager = self.case_manager
 
     def __exit__(self):
         self.runner.stop()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, dict[str, int | float]]:
+        """Counters of the result cache and of the worker applying rules to case events"""
+        return {"result_cache": self.result_cache.stats(), "rule_worker": self.case_processor.rule_worker.stats()}
 
     @staticmethod
     def extract_value_tree(root: PathNode):
@@ -283,7 +383,13 @@ class Services:
                 rule_spec = self.resolver.get_rule_spec(law, current_date, service=service)
 
                 # Run the law for this person and get results
-                result = self.evaluate(service=service, law=law, parameters={"BSN": bsn}, reference_date=current_date)
+                result = self.evaluate(
+                    service=service,
+                    law=law,
+                    parameters={"BSN": bsn},
+                    reference_date=current_date,
+                    trace=TraceLevel.NONE,
+                )
 
                 # Extract financial impact from result based on citizen_relevance
                 impact_value = 0
@@ -329,7 +435,7 @@ class Services:
 
                         except (ValueError, TypeError):
                             # If not convertible to number, skip
-                            logger.debug(f"Skipping non-numeric output {output_name}: {output_data}")
+                            logger.debug("Skipping non-numeric output %s: %s", output_name, output_data)
 
                     # If we have multiple primary numeric outputs, sum them
                     if len(primary_numeric_outputs) > 0:
@@ -347,7 +453,7 @@ class Services:
 
             except Exception as e:
                 # If evaluation fails, set impact to 0 and log
-                logger.warning(f"Failed to calculate impact for {service}.{law}: {str(e)}")
+                logger.warning("Failed to calculate impact for %s.%s: %s", service, law, e)
                 law_info["impact_value"] = 0
 
         # Sort by calculated impact (descending), then by name
@@ -366,19 +472,158 @@ class Services:
         overwrite_input: dict[str, Any] | None = None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: TraceLevel | str = TraceLevel.FULL,
+        definition_overrides: dict[str, Any] | None = None,
     ) -> RuleResult:
+        """
+        Evaluate a law, reusing a cached result of the same evaluation if there is one.
+
+        definition_overrides ({service: {law: {name: value}}}) replace definitions of the evaluated law and of
+        the laws it references, without changing the loaded specs. Only the overrides for laws the evaluation
+        can reach are part of the cache key, so other laws keep sharing their cached results.
+        """
+        reference_date = reference_date or self.root_reference_date
+        trace = TraceLevel(trace)
+        definition_overrides = self.reachable_definition_overrides(service, law, definition_overrides)
+        try:
+            cache_key = freeze(
+                (
+                    service,
+                    law,
+                    parameters,
+                    reference_date,
+                    overwrite_input,
+                    requested_output,
+                    approved,
+                    trace,
+                    definition_overrides,
+                )
+            )
+        except TypeError:
+            cache_key = None
+
+        with logger.indent_block(
+            "%s: %s (%s %s %s)", service, law, reference_date, parameters, requested_output, double_line=True
+        ):
+            if cache_key is not None:
+                result = self.result_cache.get(cache_key)
+                if result is not None:
+                    logger.debug("Using cached result")
+                    return result
+
+            with self.result_cache.recording() as dependencies:
+                result = self.services[service].evaluate(
+                    law=law,
+                    reference_date=reference_date,
+                    parameters=parameters,
+                    overwrite_input=overwrite_input,
+                    requested_output=requested_output,
+                    approved=approved,
+                    trace=trace,
+                    definition_overrides=definition_overrides,
+                )
+                dependencies.update(self.services[service].cache_dependencies(law, reference_date, parameters))
+
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result, dependencies)
+            return result
+
+    def prefetch(
+        self,
+        service: str,
+        law: str,
+        parameters: dict[str, Any],
+        reference_date: str | None = None,
+        overwrite_input: dict[str, Any] | None = None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        trace: TraceLevel | str = TraceLevel.FULL,
+        definition_overrides: dict[str, Any] | None = None,
+    ) -> Future | None:
+        """
+        Evaluate in a background thread to fill the result cache, the same evaluate call afterwards is a cache hit.
+
+        Returns None if prefetching is disabled, or when called from a prefetch thread: evaluations running
+        there don't prefetch themselves, so prefetch threads never wait for each other.
+        """
+        if (
+            not self.prefetch_workers
+            or self.result_cache.maxsize <= 0
+            or getattr(self._prefetch_local, "active", False)
+        ):
+            return None
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(
+                max_workers=self.prefetch_workers, thread_name_prefix="prefetch"
+            )
+        # Run in a copy of the current context, so the prefetch logs indented under the evaluation starting it
+        return self._prefetch_executor.submit(
+            copy_context().run,
+            self._prefetch,
+            service,
+            law,
+            parameters,
+            reference_date,
+            overwrite_input,
+            requested_output,
+            approved,
+            trace,
+            definition_overrides,
+        )
+
+    def _prefetch(self, *args) -> None:
+        self._prefetch_local.active = True
+        try:
+            self.evaluate(*args)
+        finally:
+            self._prefetch_local.active = False
+
+    def reachable_definition_overrides(
+        self, service: str, law: str, definition_overrides: dict[str, Any] | None
+    ) -> dict[str, Any] | None:
+        """The definition overrides for the laws an evaluation of a law can reach, None if there are none"""
+        if not definition_overrides:
+            return None
+        referenced = self.resolver.get_referenced_laws(law, service)
+        reachable = {}
+        for override_service, laws in definition_overrides.items():
+            for override_law, definitions in laws.items():
+                if definitions and (override_law, override_service) in referenced:
+                    reachable.setdefault(override_service, {})[override_law] = definitions
+        return reachable or None
+
+    def invalidate_claim(self, bsn: str, service: str, law: str) -> None:
+        """Drop cached results that used the claims for a BSN on a service's law"""
+        self.result_cache.invalidate(("claim", bsn, service, law))
+
+    def invalidate_events(self) -> None:
+        """Drop cached results that read case events"""
+        self.result_cache.invalidate(("events",))
+
+    def evaluate_batch(
+        self,
+        service: str,
+        law: str,
+        bsns: list[str],
+        reference_date: str | None = None,
+        requested_output: str | None = None,
+        overwrite_input: dict[str, Any] | None = None,
+        approved: bool = False,
+        definition_overrides: dict[str, Any] | None = None,
+    ) -> pd.DataFrame:
+        """Evaluate a law for many citizens at once, returning one row per BSN (see RulesEngine.evaluate_batch)"""
         reference_date = reference_date or self.root_reference_date
         with logger.indent_block(
-            f"{service}: {law} ({reference_date} {parameters} {requested_output})",
-            double_line=True,
+            "%s: %s (%s %s BSNs %s)", service, law, reference_date, len(bsns), requested_output, double_line=True
         ):
-            return self.services[service].evaluate(
+            return self.services[service].evaluate_batch(
                 law=law,
                 reference_date=reference_date,
-                parameters=parameters,
+                parameters={"BSN": list(bsns)},
                 overwrite_input=overwrite_input,
                 requested_output=requested_output,
                 approved=approved,
+                definition_overrides=self.reachable_definition_overrides(service, law, definition_overrides),
             )
 
     def apply_rules(self, event) -> None:
@@ -0,0 +1,112 @@
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+# Column kinds for which a dict lookup matches exactly what `df[column] == value` selects. Datetime-like
+# and categorical columns coerce the compared value, so those keep using boolean masks.
+_INDEXABLE_KINDS = "biufO"
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class SourceIndex:
+    """
+    Hash indexes over the source tables of a service, for the select_on lookups in rule specs.
+
+    Per (table, column) an index maps every value to the positions of the rows holding it, so a selection
+    is a dict lookup instead of a boolean mask over the whole table. Indexes and materialized rows are
+    built lazily on first use and dropped when the table is replaced (by invalidate or by passing another
+    DataFrame for the same table). Tables are expected not to be modified in place.
+    """
+
+    def __init__(self) -> None:
+        self._tables: dict[str, pd.DataFrame] = {}
+        self._indexes: dict[tuple[str, str], dict[Any, np.ndarray] | None] = {}
+        self._rows: dict[tuple[str, tuple[str, ...] | str | None], list] = {}
+
+    def invalidate(self, table: str) -> None:
+        """Drop the indexes and rows built for a table"""
+        self._tables.pop(table, None)
+        self._indexes = {key: index for key, index in self._indexes.items() if key[0] != table}
+        self._rows = {key: rows for key, rows in self._rows.items() if key[0] != table}
+
+    def _use(self, table: str, df: pd.DataFrame) -> None:
+        if self._tables.get(table) is not df:
+            self.invalidate(table)
+            self._tables[table] = df
+
+    def index(self, table: str, df: pd.DataFrame, column: str) -> dict[Any, np.ndarray] | None:
+        """Get the value to row positions index for a column, None if the column can't be indexed"""
+        self._use(table, df)
+        key = (table, column)
+        if key not in self._indexes:
+            series = df[column]
+            index = None
+            if series.dtype.kind in _INDEXABLE_KINDS and not isinstance(series.dtype, pd.CategoricalDtype):
+                try:
+                    index = series.groupby(series, sort=False, dropna=True).indices
+                except TypeError:
+                    # Unhashable values (lists, dicts) in the column
+                    index = None
+            self._indexes[key] = index
+        return self._indexes[key]
+
+    def select(self, table: str, df: pd.DataFrame, selections: list[tuple[str, Any, bool]]) -> np.ndarray | None:
+        """
+        Get the positions of the rows matching all selections, in table order
+
+        Selections are (column, value, is_in) tuples: equality on value, or membership of value when is_in.
+        Returns None without selections, meaning all rows.
+        """
+        positions = None
+        for column, value, is_in in selections:
+            matched = self._match(table, df, column, value, is_in)
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        return positions
+
+    def _match(self, table: str, df: pd.DataFrame, column: str, value: Any, is_in: bool) -> np.ndarray:
+        index = self.index(table, df, column)
+        if index is not None:
+            try:
+                if not is_in:
+                    return index.get(value, _NO_ROWS)
+                # isin() also matches missing values in the column, which the index leaves out
+                if isinstance(value, list | tuple | set) and not any(_is_missing(v) for v in value):
+                    parts = [index[v] for v in value if v in index]
+                    return np.unique(np.concatenate(parts)) if parts else _NO_ROWS
+            except TypeError:
+                # Unhashable value, compare the pandas way below
+                pass
+
+        mask = df[column].isin(value) if is_in else df[column] == value
+        return np.flatnonzero(mask.to_numpy())
+
+    def rows(self, table: str, df: pd.DataFrame, fields: tuple[str, ...] | str | None) -> list:
+        """All rows of a table as records with the given fields, values of a single field, or full records"""
+        self._use(table, df)
+        key = (table, fields)
+        if key not in self._rows:
+            if isinstance(fields, tuple):
+                self._rows[key] = df[list(fields)].to_dict("records")
+            elif fields is not None:
+                self._rows[key] = df[fields].tolist()
+            else:
+                self._rows[key] = df.to_dict("records")
+        return self._rows[key]
+
+    def take(
+        self, table: str, df: pd.DataFrame, positions: np.ndarray | None, fields: tuple[str, ...] | str | None
+    ) -> list:
+        """Rows at positions (all rows if None) like rows(); records are copies so callers may change them"""
+        rows = self.rows(table, df, fields)
+        if positions is None:
+            positions = range(len(rows))
+        if isinstance(fields, str):
+            return [rows[i] for i in positions]
+        return [dict(rows[i]) for i in positions]
@@ -1,4 +1,8 @@
+import os
+import pickle
+from bisect import bisect_right
 from collections import defaultdict
+from contextlib import suppress
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -31,6 +35,43 @@ def load_yaml_cached(file_path: str) -> dict:
     return data
 
 
+# Parsed rule specs are kept in a snapshot next to the rules directory, keyed by file modification time and
+# size, so a new process only parses the YAML files that changed since the snapshot was written
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(rules_dir: Path) -> Path:
+    return rules_dir.parent / f".{rules_dir.name}_snapshot.pickle"
+
+
+def _file_signature(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_snapshot(rules_dir: Path) -> dict[str, tuple[tuple[int, int], dict]]:
+    """Load the snapshot of parsed rule files (path -> (signature, data)), empty if missing or unreadable"""
+    try:
+        with open(snapshot_path(rules_dir), "rb") as f:
+            version, entries = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+        return {}
+    return entries if version == SNAPSHOT_VERSION else {}
+
+
+def write_snapshot(rules_dir: Path, entries: dict[str, tuple[tuple[int, int], dict]]) -> None:
+    """Atomically replace the snapshot; a read-only checkout just keeps parsing"""
+    path = snapshot_path(rules_dir)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((SNAPSHOT_VERSION, entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        with suppress(OSError):
+            tmp_path.unlink()
+
+
 @dataclass
 class RuleSpec:
     path: str
@@ -67,6 +108,53 @@ class RuleSpec:
         )
 
 
+# Rule specs loaded by this process per rules directory, with the signatures of the files they were parsed from.
+# The resolvers of all services share them, so the snapshot is read once per process instead of once per resolver.
+_loaded_rules: dict[Path, tuple[dict[str, tuple[int, int]], list[RuleSpec]]] = {}
+
+
+def load_rule_specs(rules_dir: Path) -> list[RuleSpec]:
+    """
+    The rule specs of all YAML files in a rules directory, shared by every caller in this process.
+
+    They are loaded again when a file is added, removed or changed (by modification time and size, like the
+    snapshot). Only the changed files are parsed again, the others come from the snapshot or this process.
+    """
+    yaml_files = list(rules_dir.rglob("*.yaml")) + list(rules_dir.rglob("*.yml"))
+    signatures = {}
+    for path in yaml_files:
+        with suppress(OSError):
+            signatures[str(path)] = _file_signature(path)
+    loaded = _loaded_rules.get(rules_dir)
+    if loaded is not None and loaded[0] == signatures:
+        return loaded[1]
+
+    previous = loaded[0] if loaded is not None else {}
+    snapshot = load_snapshot(rules_dir)
+    rules = []
+    entries = {}
+    for path in yaml_files:
+        file_path = str(path)
+        try:
+            signature = _file_signature(path)
+            if previous.get(file_path, signature) != signature:
+                # Changed since this process parsed it
+                _yaml_cache.pop(file_path, None)
+            cached = snapshot.get(file_path)
+            if cached is not None and cached[0] == signature and file_path not in _yaml_cache:
+                _yaml_cache[file_path] = cached[1]
+            rules.append(RuleSpec.from_yaml(file_path))
+            entries[file_path] = (signature, load_yaml_cached(file_path))
+        except Exception as e:
+            print(f"Error loading rule from {path}: {e}")
+
+    if {key: entry[0] for key, entry in entries.items()} != {key: entry[0] for key, entry in snapshot.items()}:
+        write_snapshot(rules_dir, entries)
+
+    _loaded_rules[rules_dir] = (signatures, rules)
+    return rules
+
+
 class RuleResolver:
     def __init__(self) -> None:
         self.rules_dir = Path(BASE_DIR)
@@ -75,19 +163,13 @@ class RuleResolver:
         self._rule_cache = {}
         # Rule spec cache indexed by rule path
         self._rule_spec_cache = {}
+        # Referenced laws and overridable fields indexed by (law, service)
+        self._closure_cache = {}
         self._load_rules()
 
     def _load_rules(self) -> None:
         """Load all rule specifications from the rules directory"""
-        # Use Path.rglob to find all .yaml and .yml files recursively
-        yaml_files = list(self.rules_dir.rglob("*.yaml")) + list(self.rules_dir.rglob("*.yml"))
-
-        for path in yaml_files:
-            try:
-                rule = RuleSpec.from_yaml(str(path))
-                self.rules.append(rule)
-            except Exception as e:
-                print(f"Error loading rule from {path}: {e}")
+        self.rules = list(load_rule_specs(self.rules_dir))
 
         self.laws_by_service = defaultdict(set)
         self.discoverable_laws_by_service = defaultdict(lambda: defaultdict(set))
@@ -96,6 +178,27 @@ class RuleResolver:
             if rule.discoverable:
                 self.discoverable_laws_by_service[rule.discoverable][rule.service].add(rule.law)
 
+        self._build_rule_index()
+
+    def _build_rule_index(self) -> None:
+        """Index rules by (law, service) and by (law, None), sorted on valid_from for bisecting"""
+        grouped = defaultdict(list)
+        for rule in self.rules:
+            grouped[(rule.law, rule.service)].append(rule)
+            grouped[(rule.law, None)].append(rule)
+
+        # (law, service) -> (valid_from dates, rules) in ascending order
+        self._rule_index: dict[tuple[str, str | None], tuple[list[datetime], list[RuleSpec]]] = {}
+        for key, rules in grouped.items():
+            dates, versions = [], []
+            for rule in sorted(rules, key=lambda r: r.valid_from):
+                # For versions valid from the same date the first loaded one wins
+                if dates and dates[-1] == rule.valid_from:
+                    continue
+                dates.append(rule.valid_from)
+                versions.append(rule)
+            self._rule_index[key] = (dates, versions)
+
     def get_service_laws(self):
         return self.laws_by_service
 
@@ -111,24 +214,20 @@ class RuleResolver:
 
         ref_date = datetime.strptime(reference_date, "%Y-%m-%d")
 
-        # Filter rules for the given law
-        law_rules = [r for r in self.rules if r.law == law]
-
-        if service:
-            # If a service is given, filter rules for the given service
-            law_rules = [r for r in law_rules if r.service == service]
+        # Versions of the law (for the given service, if any) sorted on valid_from
+        law_rules = self._rule_index.get((law, service or None))
 
         if not law_rules:
             raise ValueError(f"No rules found for law: {law} (and service: {service})")
 
         # Find the most recent valid rule before the reference date
-        valid_rules = [r for r in law_rules if r.valid_from <= ref_date]
+        dates, versions = law_rules
+        position = bisect_right(dates, ref_date)
 
-        if not valid_rules:
+        if not position:
             raise ValueError(f"No valid rules found for law {law} at date {reference_date}")
 
-        # Return the most recently valid rule
-        rule = max(valid_rules, key=lambda r: r.valid_from)
+        rule = versions[position - 1]
 
         # Cache the result
         self._rule_cache[cache_key] = rule
@@ -143,6 +242,46 @@ class RuleResolver:
 
         return load_yaml_cached(rule.path)
 
+    def _reference_closure(self, law: str, service: str) -> tuple[frozenset, frozenset]:
+        """
+        The (law, service) pairs an evaluation of a law can evaluate (itself included) by following service
+        references, and the (service, field) pairs of their service references and outputs. Every version of a
+        law counts, since references can be evaluated at other dates than the law itself.
+        """
+        cache_key = (law, service)
+        if cache_key in self._closure_cache:
+            return self._closure_cache[cache_key]
+
+        fields = set()
+        pending, seen = [(law, service)], set()
+        while pending:
+            key = pending.pop()
+            if key in seen or key not in self._rule_index:
+                continue
+            seen.add(key)
+            for rule in self._rule_index[key][1]:
+                properties = load_yaml_cached(rule.path).get("properties", {})
+                fields.update((rule.service, output["name"]) for output in properties.get("output", []))
+                for prop in properties.get("input", []) + properties.get("sources", []):
+                    service_ref = prop.get("service_reference")
+                    if service_ref:
+                        fields.add((service_ref["service"], service_ref["field"]))
+                        pending.append((service_ref["law"], service_ref["service"]))
+
+        self._closure_cache[cache_key] = (frozenset(seen), frozenset(fields))
+        return self._closure_cache[cache_key]
+
+    def get_referenced_laws(self, law: str, service: str) -> frozenset[tuple[str, str]]:
+        """The (law, service) pairs an evaluation of a law can evaluate, itself included"""
+        return self._reference_closure(law, service)[0]
+
+    def get_overridable_fields(self, law: str, service: str) -> frozenset[tuple[str, str]]:
+        """
+        The (service, field) pairs of overwrite_input that can change an evaluation of a law: the service
+        references of the law and of every law it (indirectly) references, and the outputs of those laws.
+        """
+        return self._reference_closure(law, service)[1]
+
     def rules_dataframe(self) -> pd.DataFrame:
         """Convert the list of RuleSpec objects into a pandas DataFrame."""
         rules_data = [
@@ -10,14 +10,43 @@ from datetime import datetime
 from simulate import LawSimulator
 
 
-def run_simulation(params: dict):
-    """Run simulation with given parameters and return results as JSON."""
+def run_simulation(params: dict, progress=None, output_path=None):
+    """
+    Run simulation with given parameters and return results as JSON.
+
+    progress, if given, is called with (people simulated, total people) after every batch. With an output_path
+    the result rows are written to it as Parquet.
+
+    With scenarios (name: {"law_parameters": ..., "overwrite_input": ..., "definition_overrides": ...}) the same
+    population is simulated under the given parameters and under every scenario, and the comparison is returned
+    (see compare_scenarios).
+
+    With sampling ({"targets": {column: half width}, "confidence": ..., "max_people": ...}) num_people is the size
+    of the population, of which a stratified sample is simulated until the targets are met (see
+    sample_simulation). A seed makes the generated population reproducible, and so the results: the same seed
+    gives the same results for any number of workers.
+
+    breakdowns ({"groupings": {dimension: result column}, "quantiles": [...]}) adds breakdowns of the summary by
+    other result columns (e.g. {"by_children": "children_count"}) and quantiles of disposable income.
+    """
     num_people = params.get("num_people", 1000)
     simulation_date = params.get("simulation_date", datetime.now().strftime("%Y-%m-%d"))
     law_parameters = params.get("law_parameters", {})
+    overwrite_input = params.get("overwrite_input", {})
+    # Definitions to override, as {service: {law: {name: value}}}
+    definition_overrides = params.get("definition_overrides", {})
+    workers = params.get("workers", 1)
+    # Population the simulated people stand for, by default just themselves
+    represented_people = params.get("represented_people")
 
     # Create simulator with law parameters
-    simulator = LawSimulator(simulation_date, law_parameters)
+    simulator = LawSimulator(
+        simulation_date,
+        law_parameters,
+        seed=params.get("seed"),
+        overwrite_input=overwrite_input,
+        definition_overrides=definition_overrides,
+    )
 
     # Apply custom parameters if provided
     if "age_distribution" in params:
@@ -56,11 +85,40 @@ def run_simulation(params: dict):
             "high": (rent.get("rent_high_min", 850), rent.get("rent_high_max", 1200)),
         }
 
-    # Run simulation
-    results_df = simulator.run_simulation(num_people)
+    if "breakdowns" in params:
+        breakdowns = params["breakdowns"]
+        simulator.breakdown_groupings = breakdowns.get("groupings", {})
+        simulator.breakdown_quantiles = breakdowns.get("quantiles", [])
+
+    if params.get("scenarios"):
+        return simulator.compare_scenarios(
+            params["scenarios"],
+            num_people,
+            output_path=output_path,
+            progress=progress,
+            represented_people=represented_people,
+        )
+
+    if params.get("sampling"):
+        sampling = params["sampling"]
+        return simulator.sample_simulation(
+            sampling["targets"],
+            confidence=sampling.get("confidence", 0.95),
+            frame_size=num_people,
+            max_people=sampling.get("max_people"),
+            output_path=output_path,
+            progress=progress,
+            represented_people=represented_people,
+        )
 
-    # Get summary with breakdowns using the method from simulate.py
-    return simulator.get_summary_with_breakdowns(results_df, simulation_date)
+    # Run simulation, aggregating the summary with breakdowns batch by batch
+    return simulator.stream_simulation(
+        num_people,
+        workers=workers,
+        output_path=output_path,
+        progress=progress,
+        represented_people=represented_people,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""Parse all laws once and write the snapshot RuleResolver starts from (run from the repository root)."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from machine.utils import RuleResolver, snapshot_path  # noqa: E402
+
+if __name__ == "__main__":
+    resolver = RuleResolver()
+    print(f"Law snapshot with {len(resolver.rules)} rules: {snapshot_path(resolver.rules_dir)}")
@@ -1,27 +1,67 @@
 import itertools
 import logging
+import multiprocessing
+import os
 import random
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import date, datetime
+from statistics import NormalDist
 
 import numpy as np
 import pandas as pd
 from tqdm.auto import tqdm
 
-from machine.service import Services
+from machine.cache import freeze
+from machine.service import RuleResult, Services
+from simulation_results import (
+    AGE_BINS,
+    INCOME_BINS,
+    ParquetResultWriter,
+    ScenarioComparison,
+    SimulationAggregator,
+    breakdown_cells,
+    stratified_estimates,
+)
 
 # Create a logger for this module
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.ERROR)
+logger.setLevel(logging.WARNING)
 
 
 class LawSimulator:
-    def __init__(self, simulation_date="2025-03-01", law_parameters=None) -> None:
+    def __init__(
+        self,
+        simulation_date="2025-03-01",
+        law_parameters=None,
+        seed=None,
+        overwrite_input=None,
+        definition_overrides=None,
+    ) -> None:
         self.simulation_date = simulation_date
         self.services = Services(simulation_date)
         self.results = []
+        # Running summary of stream_simulation
+        self.aggregator = None
         self.used_bsns = set()  # Track used BSNs
+        # Random generator for the vectorized population generator
+        self.rng = np.random.default_rng(seed)
         self.law_parameters = law_parameters or {}
+        # Service outputs to override ({service: {field: value}}) in every law that can read them
+        self.overwrite_input = overwrite_input or {}
+        # Definitions to override ({service: {law: {name: value}}}), see Services.evaluate
+        self.definition_overrides = definition_overrides or {}
+        # Batch evaluations by (service, law, date, overrides, people), shared by the scenarios of
+        # compare_scenarios; None when evaluations aren't shared
+        self._evaluations = None
+        # Number of people evaluated together per batch evaluation
+        self.batch_size = 500
+        # Batches of people simulated one by one because a batch evaluation failed, see simulate_people
+        self.batch_fallbacks = 0
+        # Breakdown dimensions added to the summary ({dimension: result column}) and the quantiles of disposable
+        # income it reports, see SimulationAggregator
+        self.breakdown_groupings = {}
+        self.breakdown_quantiles = []
 
         # CBS demographic data for more realistic simulation
         self.age_distribution = {
@@ -273,682 +313,600 @@ class LawSimulator:
 
         return pairs
 
+    def _draw_bsns(self, size):
+        """Draw unique BSNs without retries, 999 followed by six digits as long as that space suffices"""
+        if size <= 900_000:
+            numbers = self.rng.choice(900_000, size=size, replace=False) + 999_100_000
+        else:
+            numbers = self.rng.choice(900_000_000, size=size, replace=False) + 100_000_000
+        return numbers.astype(str).astype(object)
+
+    def _draw_dates(self, years):
+        """Draw dates in the given years (day 1-28 like generate_person), as datetime64[D]"""
+        months = self.rng.integers(1, 12, size=len(years), endpoint=True)
+        days = self.rng.integers(1, 28, size=len(years), endpoint=True)
+        first_of_month = ((years - 1970) * 12 + months - 1).astype("datetime64[M]").astype("datetime64[D]")
+        return first_of_month + (days - 1).astype("timedelta64[D]")
+
+    def _draw_adults(self, birth_year_min, birth_year_max):
+        """Draw the attributes of adults born in the given (inclusive) year ranges, like generate_person"""
+        rng = self.rng
+        n = len(birth_year_min)
+        simulation_date = np.datetime64(self.simulation_date, "D")
+        birth_date = self._draw_dates(rng.integers(birth_year_min, birth_year_max, endpoint=True))
+        age = (simulation_date - birth_date).astype(np.int64) // 365
+
+        # Income level by age, then log-normal income (or zero income) by level
+        levels = np.array(["low", "middle", "high"])
+        income_level = np.empty(n, dtype=np.int64)
+        for mask, weights in (
+            (age < 30, [0.6, 0.3, 0.1]),
+            ((age >= 30) & (age < 45), [0.3, 0.5, 0.2]),
+            ((age >= 45) & (age < 67), [0.25, 0.45, 0.3]),
+            (age >= 67, [0.5, 0.4, 0.1]),
+        ):
+            income_level[mask] = rng.choice(3, size=int(mask.sum()), p=weights)
+        means = np.array([self.income_distribution_params[level]["mean"] for level in levels])
+        sigmas = np.array([self.income_distribution_params[level]["sigma"] for level in levels])
+        income = np.clip(rng.lognormal(means[income_level], sigmas[income_level]).astype(np.int64), 0, 200000) * 100
+        income[rng.random(n) < self.zero_income_prob] = 0
+        retired = age >= 67
+        income[retired] = np.clip(income[retired], 15000 * 100, 50000 * 100)
+
+        is_student = (age < 30) & (rng.random(n) < 0.4)
+        income[is_student] = np.clip(income[is_student], 5000 * 100, 20000 * 100)
+        study_grant = np.where(is_student, rng.integers(2000, 4500, size=n, endpoint=True) * 100, 0)
+
+        net_worth_multiplier = np.clip(age / 25, 0.5, 8) * np.where(is_student, 0.4, 1.0)
+        net_worth = np.clip(income * net_worth_multiplier * rng.uniform(0.8, 1.2, size=n), 0, 2000000 * 100)
+
+        # Housing: young and low income people rent more often, elderly less often
+        rent_probability = np.select(
+            [age < 30, age < 40, age > 67], [0.8, 0.55, 0.35], default=self.housing_distribution["rent"]
+        ) + np.where(income < 2500000, 0.2, 0.0)
+        rents = rng.random(n) < rent_probability
+
+        def draw_range(bounds):
+            return rng.integers(bounds[0], bounds[1], size=n, endpoint=True) * 100
+
+        low, medium = income < 2000000, income < 4000000
+        rent_amount = np.select(
+            [low, medium],
+            [draw_range(self.rent_distribution["low"]), draw_range(self.rent_distribution["medium"])],
+            default=draw_range(self.rent_distribution["high"]),
+        )
+        rent_service_costs = np.select(
+            [low, medium], [draw_range((80, 120)), draw_range((100, 150))], default=draw_range((120, 200))
+        )
+        eligible_service_costs = np.minimum(rent_service_costs, 3000)
+        # Some low income renters get exactly the values from the feature file
+        feature_file_rent = low & (rng.random(n) < 0.3)
+        rent_amount[feature_file_rent] = 65000
+        rent_service_costs[feature_file_rent] = 5000
+        eligible_service_costs[feature_file_rent] = 4800
+        for column in (rent_amount, rent_service_costs, eligible_service_costs):
+            column[~rents] = 0
+
+        is_detained = rng.random(n) < 0.002
+        children_probability = np.where((age >= 23) & (age <= 55), np.clip((age - 23) * 0.03, None, 0.7), 0.0)
+        num_children = np.where(
+            rng.random(n) < children_probability, rng.choice([1, 2, 3, 4], size=n, p=[0.4, 0.4, 0.15, 0.05]), 0
+        )
+
+        return pd.DataFrame(
+            {
+                "birth_date": birth_date,
+                "age": age,
+                "annual_income": income,
+                "net_worth": net_worth,
+                "work_years": np.clip((age - 18) * rng.uniform(0.5, 0.9, size=n), 0, 50),
+                "residence_years": np.clip((age - 15) * rng.uniform(0.8, 1.0, size=n), 0, 50),
+                "is_student": is_student,
+                "study_grant": study_grant,
+                "is_detained": is_detained,
+                "is_incarcerated": is_detained,
+                "has_dutch_nationality": rng.random(n) < 0.9,
+                "has_children": num_children > 0,
+                "num_children": num_children,
+                "housing_type": np.where(rents, "rent", "own").astype(object),
+                "rent_amount": rent_amount,
+                "rent_service_costs": rent_service_costs,
+                "eligible_service_costs": eligible_service_costs,
+            }
+        )
+
+    def generate_population(self, num_people):
+        """
+        Generate num_people adults in households as columnar DataFrames, vectorized with self.rng.
+
+        Follows the same model as generate_paired_people and generate_person, but draws every attribute for
+        all people at once. Returns (people, children): people has one row per adult, a person directly
+        followed by their partner, with a household number; children has one row per child with the BSN of
+        the parent they belong to.
+        """
+        rng = self.rng
+        current_year = datetime.strptime(self.simulation_date, "%Y-%m-%d").year
+
+        # Every household has a main person, at most num_people of them are needed
+        age_ranges = list(self.age_distribution.keys())
+        weights = np.array(list(self.age_distribution.values()))
+        age_range = rng.choice(len(age_ranges), size=num_people, p=weights / weights.sum())
+        ages = np.array(age_ranges)[age_range]
+        main = self._draw_adults(current_year - ages[:, 1], current_year - ages[:, 0])
+
+        # Partners by age of the main person, households are added until num_people is reached
+        partner_probability = np.select(
+            [main["age"] < 25, main["age"] < 35, main["age"] < 60], [0.1, 0.4, 0.7], default=0.6
+        )
+        has_partner = rng.random(num_people) < partner_probability
+        people_before = np.concatenate([[0], np.cumsum(1 + has_partner)[:-1]])
+        num_households = int(np.searchsorted(people_before, num_people))
+        main, has_partner = main.iloc[:num_households].copy(), has_partner[:num_households]
+        # A partner that would exceed num_people is left out
+        has_partner &= people_before[:num_households] + 2 <= num_people
+
+        main_birth_year = main["birth_date"].dt.year.to_numpy()[has_partner]
+        year_offset = np.trunc(rng.normal(0, 5, size=len(main_birth_year))).astype(np.int64)
+        birth_year_min = np.maximum(main_birth_year + year_offset - 1, 1925)
+        birth_year_max = np.maximum(main_birth_year + year_offset + 1, birth_year_min + 1)
+        partners = self._draw_adults(birth_year_min, birth_year_max)
+
+        main["household"] = np.arange(num_households)
+        partners["household"] = np.flatnonzero(has_partner)
+        main["role"], partners["role"] = 0, 1
+        people = pd.concat([main, partners]).sort_values(["household", "role"], kind="stable", ignore_index=True)
+
+        num_children = people["num_children"].to_numpy()
+        total_children = int(num_children.sum())
+        bsns = self._draw_bsns(len(people) + 2 * total_children)
+        people["bsn"] = bsns[: len(people)]
+        household = people["household"].to_numpy()
+        role = people["role"].to_numpy()
+        # The other adult in the household, if any
+        other = np.arange(len(people)) + np.where(role == 0, 1, -1)
+        other_valid = (other >= 0) & (other < len(people))
+        partner_of = np.where(other_valid & (household[np.clip(other, 0, len(people) - 1)] == household), other, -1)
+        people["has_partner"] = partner_of >= 0
+        people["partner_bsn"] = np.where(partner_of >= 0, people["bsn"].to_numpy()[partner_of], None)
+
+        parent = np.repeat(np.arange(len(people)), num_children)
+        child_age = rng.integers(0, np.minimum(20, people["age"].to_numpy()[parent] - 23), endpoint=True)
+        children = pd.DataFrame(
+            {
+                "parent_bsn": people["bsn"].to_numpy()[parent],
+                "bsn": bsns[len(people) : len(people) + total_children],
+                "birth_date": self._draw_dates(datetime.now().year - child_age),
+                "age": child_age,
+                "zorgbehoefte": rng.random(total_children) < 0.05,
+                # The childcare registration of a child uses a BSN of its own
+                "childcare_bsn": bsns[len(people) + total_children :],
+            }
+        )
+        return people.drop(columns=["role", "num_children"]), children
+
     def setup_test_data(self, pairs):
-        # Flatten pairs into list of people with partner references
+        """Load the people in pairs (see generate_paired_people) into the services, see setup_population"""
         people = []
-        for person, partner in pairs:
-            person["partner_bsn"] = partner["bsn"] if partner else None
-            person["has_partner"] = partner is not None
-            people.append(person)
-            if partner:
-                partner["partner_bsn"] = person["bsn"]
-                partner["has_partner"] = True
-                people.append(partner)
-
-        # Prepare CBS demographic data
+        children = []
+        for household, (person, partner) in enumerate(pairs):
+            for adult, other in ((person, partner), (partner, person)):
+                if adult is None:
+                    continue
+                people.append(
+                    {
+                        **{key: value for key, value in adult.items() if key != "children_data"},
+                        "household": household,
+                        "has_partner": other is not None,
+                        "partner_bsn": other["bsn"] if other else None,
+                    }
+                )
+                children.extend(
+                    {**child, "parent_bsn": adult["bsn"], "childcare_bsn": self.generate_bsn()}
+                    for child in adult["children_data"]
+                )
+        children = pd.DataFrame(
+            children, columns=["parent_bsn", "bsn", "birth_date", "age", "zorgbehoefte", "childcare_bsn"]
+        )
+        return self.setup_population(pd.DataFrame(people), children)
+
+    def build_source_tables(self, people, children):
+        """
+        Build the source tables of the services for a population (see generate_population) as DataFrames.
+
+        Columns are computed for all people at once. Values that aren't part of the people themselves (addresses,
+        insurance status, KVK registrations, ...) are drawn from self.rng.
+        """
+        rng = self.rng
+        n = len(people)
+        bsn = people["bsn"].to_numpy()
+        age = people["age"].to_numpy()
+        income = people["annual_income"].to_numpy()
+        net_worth = people["net_worth"].to_numpy()
+        is_student = people["is_student"].to_numpy(dtype=bool)
+        is_detained = people["is_detained"].to_numpy(dtype=bool)
+        has_partner = people["has_partner"].to_numpy(dtype=bool)
+        is_dutch = people["has_dutch_nationality"].to_numpy(dtype=bool)
+        owns_home = people["housing_type"].to_numpy() == "own"
+        birth_date = pd.to_datetime(people["birth_date"]).to_numpy().astype("datetime64[D]")
+        birth_year = birth_date.astype("datetime64[Y]").astype(np.int64) + 1970
+        birth_iso = pd.Series(np.datetime_as_string(birth_date))
+        simulation_date = datetime.strptime(self.simulation_date, "%Y-%m-%d").date()
+
+        # Partner of each person by position, -1 without partner
+        position = pd.Series(np.arange(n), index=bsn)
+        partner = position.reindex(people["partner_bsn"].to_numpy()).fillna(-1).to_numpy(dtype=np.int64)
+        partner_income = np.where(partner >= 0, income[np.maximum(partner, 0)], 0)
+        partner_net_worth = np.where(partner >= 0, net_worth[np.maximum(partner, 0)], 0)
+
+        # Children per person, in population order
+        child_parent = position.reindex(children["parent_bsn"].to_numpy()).to_numpy(dtype=np.int64)
+        child_age = children["age"].to_numpy()
+        child_birth_date = np.datetime_as_string(
+            pd.to_datetime(children["birth_date"]).to_numpy().astype("datetime64[D]")
+        ).astype(object)
+        num_children = np.bincount(child_parent, minlength=n)
+
+        def per_person(child_values, parents=child_parent):
+            """Group per child values into one list per person (by position)"""
+            lists = [[] for _ in range(n)]
+            for parent, value in zip(parents, child_values, strict=True):
+                lists[parent].append(value)
+            return lists
+
+        def randint(low, high, size=n):
+            return rng.integers(low, high, size=size, endpoint=True)
+
+        def chance(probability, size=n):
+            return rng.random(size) < probability
+
+        def worked_hours():
+            return np.where(is_student, randint(500, 1000), np.where(chance(0.8), 1920, randint(1000, 1920)))
+
+        def years_after_birth(years):
+            """birth_date.replace(year=birth_date.year + years) as ISO dates"""
+            return (birth_year + years).astype(str).astype(object) + birth_iso.str[4:].to_numpy(dtype=object)
+
+        composition = np.select(
+            [~has_partner & (num_children == 0), ~has_partner, num_children == 0],
+            ["ALLEENSTAANDE", "ALLEENSTAANDE_MET_KINDEREN", "PARTNERS_ZONDER_KINDEREN"],
+            default="PARTNERS_MET_KINDEREN",
+        )
+        age_list, income_list = age.tolist(), income.tolist()
+        members = [
+            [{"age": a, "income": i}] + ([{"age": age_list[p], "income": income_list[p]}] if p >= 0 else [])
+            for a, i, p in zip(age_list, income_list, partner.tolist(), strict=True)
+        ]
+        household_size = 1 + has_partner + num_children
+        permit_type = np.where(is_dutch, "NEDERLANDS", "PERMANENT").astype(object)
+        exemption_end = (simulation_date + pd.Timedelta(days=365)).isoformat()
+        kvk_registered = chance(0.1)
+        num_registered = int(kvk_registered.sum())
+
+        def table(**columns):
+            return pd.DataFrame({"bsn": bsn, **columns})
+
         sources = {
-            ("CBS", "levensverwachting"): [{"jaar": "2025", "verwachting_65": 20.5}],
+            ("CBS", "levensverwachting"): pd.DataFrame([{"jaar": "2025", "verwachting_65": 20.5}]),
             # KIESRAAD data for elections
-            ("KIESRAAD", "verkiezingen"): [{"type": "TWEEDE_KAMER", "verkiezingsdatum": "2025-10-29"}],
+            ("KIESRAAD", "verkiezingen"): pd.DataFrame([{"type": "TWEEDE_KAMER", "verkiezingsdatum": "2025-10-29"}]),
             # RvIG data (Personal Information)
-            ("RvIG", "personen"): [
-                {
-                    "bsn": p["bsn"],
-                    "geboortedatum": p["birth_date"].isoformat(),
-                    "verblijfsadres": "Amsterdam",
-                    "land_verblijf": "NEDERLAND",
-                    "nationaliteit": "NEDERLANDS" if p["has_dutch_nationality"] else "BUITENLANDS",
-                    "age": p["age"],
-                    "has_dutch_nationality": p["has_dutch_nationality"],
-                    "has_partner": p["has_partner"],
-                    "residence_address": f"Teststraat {random.randint(1, 999)}, {random.randint(1000, 9999)}AB Amsterdam",
-                    "has_fixed_address": True,
-                    "household_size": 1 + (1 if p["has_partner"] else 0) + len(p.get("children_data", [])),
-                }
-                for p in people
-            ],
+            ("RvIG", "personen"): table(
+                geboortedatum=birth_iso.to_numpy(dtype=object),
+                verblijfsadres="Amsterdam",
+                land_verblijf="NEDERLAND",
+                nationaliteit=np.where(is_dutch, "NEDERLANDS", "BUITENLANDS").astype(object),
+                age=age,
+                has_dutch_nationality=is_dutch,
+                has_partner=has_partner,
+                residence_address="Teststraat "
+                + randint(1, 999).astype(str).astype(object)
+                + ", "
+                + randint(1000, 9999).astype(str).astype(object)
+                + "AB Amsterdam",
+                has_fixed_address=True,
+                household_size=household_size,
+            ),
             # RvIG relationship data
-            ("RvIG", "relaties"): [
-                {
-                    "bsn": p["bsn"],
-                    "partnerschap_type": "HUWELIJK" if p["has_partner"] else "GEEN",
-                    "partner_bsn": p["partner_bsn"],
-                    # Add children directly in the format expected by features
-                    "children": [{"bsn": child["bsn"]} for child in p.get("children_data", [])]
-                    if p.get("children_data")
-                    else [],
-                }
-                for p in people
-            ],
+            ("RvIG", "relaties"): table(
+                partnerschap_type=np.where(has_partner, "HUWELIJK", "GEEN").astype(object),
+                partner_bsn=people["partner_bsn"].to_numpy(),
+                children=per_person({"bsn": child_bsn} for child_bsn in children["bsn"]),
+            ),
             # RvIG Address data
-            ("RvIG", "verblijfplaats"): [
-                {
-                    "bsn": p["bsn"],
-                    "straat": "Kalverstraat" if random.random() < 0.7 else "Teststraat",
-                    "huisnummer": str(random.randint(1, 999)),
-                    "postcode": f"{random.randint(1000, 9999)}AB",
-                    "woonplaats": "Amsterdam",
-                    "type": "WOONADRES" if random.random() < 0.95 else "BRIEFADRES",
-                }
-                for p in people
-            ],
+            ("RvIG", "verblijfplaats"): table(
+                straat=np.where(chance(0.7), "Kalverstraat", "Teststraat").astype(object),
+                huisnummer=randint(1, 999).astype(str).astype(object),
+                postcode=randint(1000, 9999).astype(str).astype(object) + "AB",
+                woonplaats="Amsterdam",
+                type=np.where(chance(0.95), "WOONADRES", "BRIEFADRES").astype(object),
+            ),
             # Tax data
-            ("BELASTINGDIENST", "box1"): [
-                {
-                    "bsn": p["bsn"],
-                    "loon_uit_dienstbetrekking": p["annual_income"] if not p["is_student"] else p["annual_income"] // 2,
-                    "uitkeringen_en_pensioenen": p["annual_income"] // 2 if p["age"] >= 67 else 0,
-                    "winst_uit_onderneming": 0,
-                    "resultaat_overige_werkzaamheden": 0,
-                    "eigen_woning": -int(p["annual_income"] * 0.1) if p["housing_type"] == "own" else 0,
-                }
-                for p in people
-            ],
+            ("BELASTINGDIENST", "box1"): table(
+                loon_uit_dienstbetrekking=np.where(is_student, income // 2, income),
+                uitkeringen_en_pensioenen=np.where(age >= 67, income // 2, 0),
+                winst_uit_onderneming=0,
+                resultaat_overige_werkzaamheden=0,
+                eigen_woning=np.where(owns_home, -(income * 0.1).astype(np.int64), 0),
+            ),
             # Income data (used by huurtoeslag)
-            ("UWV", "income"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": p["annual_income"],
-                }
-                for p in people
-            ],
+            ("UWV", "income"): table(value=income),
             # Partner income data (used by huurtoeslag)
-            ("UWV", "partner_income"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": people[i + 1]["annual_income"]
-                    if i + 1 < len(people) and p.get("partner_bsn") == people[i + 1]["bsn"]
-                    else 0,
-                }
-                for i, p in enumerate(people)
-                if i % 2 == 0
-                # Only do this for first of each potential pair
-            ]
-            + [
-                {
-                    "bsn": p["bsn"],
-                    "value": people[i - 1]["annual_income"]
-                    if i - 1 >= 0 and p.get("partner_bsn") == people[i - 1]["bsn"]
-                    else 0,
-                }
-                for i, p in enumerate(people)
-                if i % 2 == 1
-                # Only do this for second of each potential pair
-            ],
-            ("BELASTINGDIENST", "box2"): [
-                {"bsn": p["bsn"], "reguliere_voordelen": 0, "vervreemdingsvoordelen": 0} for p in people
-            ],
-            ("BELASTINGDIENST", "box3"): [
-                {
-                    "bsn": p["bsn"],
-                    "spaargeld": int(p["net_worth"] * 0.4),
-                    "beleggingen": int(p["net_worth"] * 0.1),
-                    "onroerend_goed": int(p["net_worth"] * 0.5) if p["housing_type"] == "own" else 0,
-                    "schulden": int(p["annual_income"] * 0.05) if random.random() < 0.2 else 0,
-                }
-                for p in people
-            ],
-            ("BELASTINGDIENST", "monthly_income"): [
-                {
-                    "bsn": p["bsn"],
-                    "bedrag": p["annual_income"] // 12,
-                }
-                for p in people
-            ],
-            ("BELASTINGDIENST", "assets"): [
-                {
-                    "bsn": p["bsn"],
-                    "bedrag": p["net_worth"],
-                }
-                for p in people
-            ],
+            ("UWV", "partner_income"): table(value=partner_income),
+            ("BELASTINGDIENST", "box2"): table(reguliere_voordelen=0, vervreemdingsvoordelen=0),
+            ("BELASTINGDIENST", "box3"): table(
+                spaargeld=(net_worth * 0.4).astype(np.int64),
+                beleggingen=(net_worth * 0.1).astype(np.int64),
+                onroerend_goed=np.where(owns_home, (net_worth * 0.5).astype(np.int64), 0),
+                schulden=np.where(chance(0.2), (income * 0.05).astype(np.int64), 0),
+            ),
+            ("BELASTINGDIENST", "monthly_income"): table(bedrag=income // 12),
+            ("BELASTINGDIENST", "assets"): table(bedrag=net_worth),
             # Net worth data (used by huurtoeslag)
-            ("BELASTINGDIENST", "net_worth"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": p["net_worth"],
-                }
-                for p in people
-            ],
+            ("BELASTINGDIENST", "net_worth"): table(value=net_worth),
             # Combined net worth data (used by huurtoeslag for people with partners)
-            ("BELASTINGDIENST", "combined_net_worth"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": p["net_worth"]
-                    + (
-                        people[i + 1]["net_worth"]
-                        if i + 1 < len(people) and p.get("partner_bsn") == people[i + 1]["bsn"]
-                        else 0
-                    ),
-                }
-                for i, p in enumerate(people)
-                if i % 2 == 0
-                # Only do this for first of each potential pair
-            ]
-            + [
-                {
-                    "bsn": p["bsn"],
-                    "value": p["net_worth"]
-                    + (
-                        people[i - 1]["net_worth"] if i - 1 >= 0 and p.get("partner_bsn") == people[i - 1]["bsn"] else 0
-                    ),
-                }
-                for i, p in enumerate(people)
-                if i % 2 == 1
-                # Only do this for second of each potential pair
-            ],
+            ("BELASTINGDIENST", "combined_net_worth"): table(value=net_worth + partner_net_worth),
             # Buitenlands inkomen (missing in warnings)
-            ("UWV", "FOREIGN_INCOME"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": 0,  # Geen buitenlands inkomen
-                }
-                for p in people
-            ],
+            ("UWV", "FOREIGN_INCOME"): table(value=0),
             # Partner buitenlands inkomen
-            ("UWV", "PARTNER_FOREIGN_INCOME"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": 0,  # Partner geen buitenlands inkomen
-                }
-                for p in people
-            ],
+            ("UWV", "PARTNER_FOREIGN_INCOME"): table(value=0),
             # HOUSEHOLD veld dat ontbreekt - met members array dat age en income bevat
-            ("RvIG", "HOUSEHOLD"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": {
-                        "size": 1 + (1 if p["has_partner"] else 0) + len(p.get("children_data", [])),
-                        "composition": "ALLEENSTAANDE"
-                        if not p["has_partner"] and not p.get("children_data")
-                        else "ALLEENSTAANDE_MET_KINDEREN"
-                        if not p["has_partner"] and p.get("children_data")
-                        else "PARTNERS_ZONDER_KINDEREN"
-                        if p["has_partner"] and not p.get("children_data")
-                        else "PARTNERS_MET_KINDEREN",
-                        "members": [{"age": p["age"], "income": p["annual_income"]}]
-                        + (
-                            [
-                                {
-                                    "age": next(
-                                        (partner for partner in people if partner["bsn"] == p["partner_bsn"]),
-                                        {"age": 30},
-                                    )["age"],
-                                    "income": next(
-                                        (partner for partner in people if partner["bsn"] == p["partner_bsn"]),
-                                        {"annual_income": 0},
-                                    )["annual_income"],
-                                }
-                            ]
-                            if p["has_partner"] and p["partner_bsn"]
-                            else []
-                        ),
-                    },
-                }
-                for p in people
-            ],
+            ("RvIG", "HOUSEHOLD"): table(
+                value=[
+                    {"size": s, "composition": c, "members": m}
+                    for s, c, m in zip(household_size.tolist(), composition.tolist(), members, strict=True)
+                ]
+            ),
             # Employment data
-            ("UWV", "dienstverbanden"): [
-                {
-                    "bsn": p["bsn"],
-                    "start_date": (p["birth_date"].replace(year=p["birth_date"].year + 18)).isoformat(),
-                    "end_date": datetime.strptime(self.simulation_date, "%Y-%m-%d").date().isoformat(),
-                    "uren_per_week": random.randint(8, 40) if not p["is_student"] else random.randint(4, 16),
-                    "worked_hours": (1920 if random.random() < 0.8 else random.randint(1000, 1920))
-                    if not p["is_student"]
-                    else random.randint(500, 1000),
-                }
-                for p in people
-            ],
+            ("UWV", "dienstverbanden"): table(
+                start_date=years_after_birth(18),
+                end_date=simulation_date.isoformat(),
+                uren_per_week=np.where(is_student, randint(4, 16), randint(8, 40)),
+                worked_hours=worked_hours(),
+            ),
             # Add worked_hours for UWV that's required by kinderopvangtoeslag
-            ("UWV", "worked_hours"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": (1920 if random.random() < 0.8 else random.randint(1000, 1920))
-                    if not p["is_student"]
-                    else random.randint(500, 1000),
-                }
-                for p in people
-            ],
+            ("UWV", "worked_hours"): table(value=worked_hours()),
             # Add insured_years for kinderopvangtoeslag
-            ("UWV", "insured_years"): [
-                {
-                    "bsn": p["bsn"],
-                    "value": min(max(3, int(p["work_years"])), 30),  # Minimum 3 years, max 30
-                }
-                for p in people
-            ],
+            ("UWV", "insured_years"): table(value=np.clip(people["work_years"].to_numpy().astype(np.int64), 3, 30)),
             # SVB insurance data
-            ("SVB", "verzekerde_tijdvakken"): [
-                {
-                    "bsn": p["bsn"],
-                    "woonperiodes": p["residence_years"],
-                }
-                for p in people
-            ],
+            ("SVB", "verzekerde_tijdvakken"): table(woonperiodes=people["residence_years"].to_numpy()),
             # SVB retirement age
-            ("SVB", "retirement_age"): [
-                {
-                    "bsn": p["bsn"],
-                    "leeftijd": 67 + random.randint(0, 3) / 10,  # 67.0-67.3
-                }
-                for p in people
-            ],
+            ("SVB", "retirement_age"): table(leeftijd=67 + randint(0, 3) / 10),
             # Healthcare insurance data
-            ("RVZ", "verzekeringen"): [
-                {
-                    "bsn": p["bsn"],
-                    "polis_status": "ACTIEF" if random.random() < 0.95 else "INACTIEF",
-                    "verdrag_status": "GEEN",
-                    "zorg_type": "BASIS",
-                    "has_insurance": random.random() < 0.95,
-                    "has_act_insurance": random.random() < 0.05,
-                }
-                for p in people
-            ],
+            ("RVZ", "verzekeringen"): table(
+                polis_status=np.where(chance(0.95), "ACTIEF", "INACTIEF").astype(object),
+                verdrag_status="GEEN",
+                zorg_type="BASIS",
+                has_insurance=chance(0.95),
+                has_act_insurance=chance(0.05),
+            ),
             # Healthcare treaty data
-            ("RVZ", "verdragsverzekeringen"): [
-                {
-                    "bsn": p["bsn"],
-                    "registratie": "INACTIEF",
-                }
-                for p in people
-            ],
+            ("RVZ", "verdragsverzekeringen"): table(registratie="INACTIEF"),
             # Detention data
-            ("DJI", "detenties"): [
-                {
-                    "bsn": p["bsn"],
-                    "status": "GEDETINEERD" if p["is_detained"] else "VRIJ",
-                    "inrichting_type": "REGULIER" if p["is_detained"] else "GEEN",
-                    "is_gedetineerd": p["is_detained"],
-                    "is_detainee": p["is_detained"],
-                }
-                for p in people
-            ],
-            ("DJI", "forensische_zorg"): [
-                {
-                    "bsn": p["bsn"],
-                    "zorgtype": "KLINISCH" if p["is_detained"] and random.random() < 0.1 else "GEEN",
-                    "juridische_titel": "TBS" if p["is_detained"] and random.random() < 0.1 else "GEEN",
-                    "is_forensic": p["is_detained"] and random.random() < 0.1,
-                }
-                for p in people
-            ],
+            ("DJI", "detenties"): table(
+                status=np.where(is_detained, "GEDETINEERD", "VRIJ").astype(object),
+                inrichting_type=np.where(is_detained, "REGULIER", "GEEN").astype(object),
+                is_gedetineerd=is_detained,
+                is_detainee=is_detained,
+            ),
+            ("DJI", "forensische_zorg"): table(
+                zorgtype=np.where(is_detained & chance(0.1), "KLINISCH", "GEEN").astype(object),
+                juridische_titel=np.where(is_detained & chance(0.1), "TBS", "GEEN").astype(object),
+                is_forensic=is_detained & chance(0.1),
+            ),
             # Education data
-            ("DUO", "inschrijvingen"): [
-                {
-                    "bsn": p["bsn"],
-                    "onderwijstype": ("HBO" if random.random() < 0.5 else "WO") if p["is_student"] else "GEEN",
-                    "onderwijssoort": ("HBO" if random.random() < 0.5 else "WO") if p["is_student"] else "GEEN",
-                    "niveau": 4 if p["is_student"] else 0,
-                }
-                for p in people
-            ],
-            ("DUO", "studiefinanciering"): [
-                {
-                    "bsn": p["bsn"],
-                    "aantal_studerend_gezin": random.randint(0, 3) if p["age"] < 30 else 0,
-                    "ontvangt_studiefinanciering": p["is_student"],
-                    "aantal_studerende_broers_zussen": random.randint(0, 2) if p["age"] < 30 else 0,
-                }
-                for p in people
-            ],
-            ("DUO", "is_student"): [
-                {
-                    "bsn": p["bsn"],
-                    "waarde": p["is_student"],
-                }
-                for p in people
-            ],
-            ("DUO", "receives_study_grant"): [
-                {
-                    "bsn": p["bsn"],
-                    "waarde": p["is_student"],
-                }
-                for p in people
-            ],
+            ("DUO", "inschrijvingen"): table(
+                onderwijstype=np.where(is_student, np.where(chance(0.5), "HBO", "WO"), "GEEN").astype(object),
+                onderwijssoort=np.where(is_student, np.where(chance(0.5), "HBO", "WO"), "GEEN").astype(object),
+                niveau=np.where(is_student, 4, 0),
+            ),
+            ("DUO", "studiefinanciering"): table(
+                aantal_studerend_gezin=np.where(age < 30, randint(0, 3), 0),
+                ontvangt_studiefinanciering=is_student,
+                aantal_studerende_broers_zussen=np.where(age < 30, randint(0, 2), 0),
+            ),
+            ("DUO", "is_student"): table(waarde=is_student),
+            ("DUO", "receives_study_grant"): table(waarde=is_student),
             # Municipal data (Amsterdam)
-            ("GEMEENTE_AMSTERDAM", "werk_en_re_integratie"): [
-                {
-                    "bsn": p["bsn"],
-                    "arbeidsvermogen": random.choices(
-                        ["VOLLEDIG", "GEDEELTELIJK", "MEDISCH_VOLLEDIG", "GEEN"], weights=[0.8, 0.1, 0.05, 0.05]
-                    )[0],
-                    "re_integratie_traject": random.choice(
-                        ["Werkstage", "Ondernemerscoaching", "Zelfstandigentraject", "Geen"]
-                    ),
-                    "ontheffing_reden": "Chronische ziekte" if random.random() < 0.05 else None,
-                    "ontheffing_einddatum": (
-                        datetime.strptime(self.simulation_date, "%Y-%m-%d").date() + pd.Timedelta(days=365)
-                    ).isoformat()
-                    if random.random() < 0.05
-                    else None,
-                }
-                for p in people
-            ],
+            ("GEMEENTE_AMSTERDAM", "werk_en_re_integratie"): table(
+                arbeidsvermogen=rng.choice(
+                    np.array(["VOLLEDIG", "GEDEELTELIJK", "MEDISCH_VOLLEDIG", "GEEN"], dtype=object),
+                    size=n,
+                    p=[0.8, 0.1, 0.05, 0.05],
+                ),
+                re_integratie_traject=rng.choice(
+                    np.array(["Werkstage", "Ondernemerscoaching", "Zelfstandigentraject", "Geen"], dtype=object),
+                    size=n,
+                ),
+                ontheffing_reden=np.where(chance(0.05), "Chronische ziekte", None),
+                ontheffing_einddatum=np.where(chance(0.05), exemption_end, None),
+            ),
             # IND data (residence permits)
-            ("IND", "verblijfsvergunningen"): [
-                {
-                    "bsn": p["bsn"],
-                    "type": "PERMANENT" if not p["has_dutch_nationality"] else "NEDERLANDS",
-                    "status": "VERLEEND",
-                    "ingangsdatum": (
-                        p["birth_date"].replace(year=p["birth_date"].year + max(0, 18 - random.randint(0, 5)))
-                    ).isoformat(),
-                    "einddatum": None,
-                }
-                for p in people
-            ],
-            ("IND", "residence_permit_type"): [
-                {
-                    "bsn": p["bsn"],
-                    "type": "PERMANENT" if not p["has_dutch_nationality"] else "NEDERLANDS",
-                }
-                for p in people
-            ],
+            ("IND", "verblijfsvergunningen"): table(
+                type=permit_type,
+                status="VERLEEND",
+                ingangsdatum=years_after_birth(np.maximum(0, 18 - randint(0, 5))),
+                einddatum=None,
+            ),
+            ("IND", "residence_permit_type"): table(type=permit_type),
             # KVK data (Chamber of Commerce)
-            ("KVK", "is_entrepreneur"): [
-                {
-                    "bsn": p["bsn"],
-                    "waarde": random.random() < 0.1,  # 10% chance of being entrepreneur
-                }
-                for p in people
-            ],
-            ("KVK", "is_active_entrepreneur"): [
+            ("KVK", "is_entrepreneur"): table(waarde=chance(0.1)),  # 10% chance of being entrepreneur
+            ("KVK", "is_active_entrepreneur"): table(waarde=chance(0.1)),  # 10% chance of being active
+            # KVK inschrijvingen data for bijstand, only 10% of people have KVK registrations
+            ("KVK", "inschrijvingen"): pd.DataFrame(
                 {
-                    "bsn": p["bsn"],
-                    "waarde": random.random() < 0.1,  # 10% chance of being active entrepreneur
-                }
-                for p in people
-            ],
-            # KVK inschrijvingen data for bijstand
-            ("KVK", "inschrijvingen"): [
-                {
-                    "bsn": p["bsn"],
-                    "rechtsvorm": random.choice(["EENMANSZAAK", "BV", "VOF"]),
-                    "status": "ACTIEF" if random.random() < 0.9 else "INACTIEF",
-                    "activiteit": random.choice(["Webdesign", "Consultancy", "Horeca", "Retail", "Transport"]),
+                    "bsn": bsn[kvk_registered],
+                    "rechtsvorm": rng.choice(np.array(["EENMANSZAAK", "BV", "VOF"], dtype=object), num_registered),
+                    "status": np.where(chance(0.9, num_registered), "ACTIEF", "INACTIEF").astype(object),
+                    "activiteit": rng.choice(
+                        np.array(["Webdesign", "Consultancy", "Horeca", "Retail", "Transport"], dtype=object),
+                        num_registered,
+                    ),
                 }
-                for p in people
-                if random.random() < 0.1  # Only 10% of people have KVK registrations
-            ],
+            ),
             # JenV data (ministry of Justice)
-            ("JenV", "jurisdicties"): [
-                {"gemeente": "Amsterdam", "arrondissement": "AMSTERDAM", "rechtbank": "RECHTBANK_AMSTERDAM"},
-                {"gemeente": "Amstelveen", "arrondissement": "AMSTERDAM", "rechtbank": "RECHTBANK_AMSTERDAM"},
-                {"gemeente": "Haarlem", "arrondissement": "NOORD-HOLLAND", "rechtbank": "RECHTBANK_NOORD_HOLLAND"},
-                {"gemeente": "Rotterdam", "arrondissement": "ROTTERDAM", "rechtbank": "RECHTBANK_ROTTERDAM"},
-                {
-                    "gemeente": "Utrecht",
-                    "arrondissement": "MIDDEN-NEDERLAND",
-                    "rechtbank": "RECHTBANK_MIDDEN_NEDERLAND",
-                },
-                {"gemeente": "Den Haag", "arrondissement": "DEN_HAAG", "rechtbank": "RECHTBANK_DEN_HAAG"},
-            ],
+            ("JenV", "jurisdicties"): pd.DataFrame(
+                [
+                    {"gemeente": "Amsterdam", "arrondissement": "AMSTERDAM", "rechtbank": "RECHTBANK_AMSTERDAM"},
+                    {"gemeente": "Amstelveen", "arrondissement": "AMSTERDAM", "rechtbank": "RECHTBANK_AMSTERDAM"},
+                    {
+                        "gemeente": "Haarlem",
+                        "arrondissement": "NOORD-HOLLAND",
+                        "rechtbank": "RECHTBANK_NOORD_HOLLAND",
+                    },
+                    {"gemeente": "Rotterdam", "arrondissement": "ROTTERDAM", "rechtbank": "RECHTBANK_ROTTERDAM"},
+                    {
+                        "gemeente": "Utrecht",
+                        "arrondissement": "MIDDEN-NEDERLAND",
+                        "rechtbank": "RECHTBANK_MIDDEN_NEDERLAND",
+                    },
+                    {"gemeente": "Den Haag", "arrondissement": "DEN_HAAG", "rechtbank": "RECHTBANK_DEN_HAAG"},
+                ]
+            ),
+            # Household members other than the person, as a value object like in the feature files
+            ("RvIG", "household_members"): table(value=[member[1:] for member in members]),
+            # Children as a value object, children are assumed to have no income
+            ("RvIG", "children"): table(value=per_person({"age": a, "income": 0} for a in child_age.tolist())),
         }
 
-        # Add housing data for rent calculation
-        [
-            {
-                "bsn": p["bsn"],
-                "huur": p["rent_amount"],
-                "servicekosten": p["rent_service_costs"],
-                "subsidiabeleservicekosten": p["eligible_service_costs"],
-            }
-            for p in people
-            if p["housing_type"] == "rent"
-        ]
+        if len(children) == 0:
+            return sources
 
-        # IMPORTANT: Huurtoeslag requires CLAIMS, not regular data sources
-        # We'll submit these as claims after loading all other data
-
-        # Add household members and children required by huurtoeslag with the correct format
-        # Voorbeeld uit de feature file toont dat deze velden niet als 'value' worden verwacht, maar direct
-        # Voor elk persoon, maak huishoudleden en kinderen data aan als VALUE object (niet als directe velden)
-        household_members = []
-        for p in people:
-            # Verzamel huishoudleden (anderen dan de persoon zelf)
-            household_data = []
-            if p["has_partner"] and p["partner_bsn"]:
-                # Vind de partner in de people list
-                partner = next((partner for partner in people if partner["bsn"] == p["partner_bsn"]), None)
-                if partner:
-                    household_data.append({"age": partner["age"], "income": partner["annual_income"]})
-
-            # Value field zoals in YAML verwacht
-            household_members.append({"bsn": p["bsn"], "value": household_data})
-
-        sources[("RvIG", "household_members")] = household_members
-
-        # Add children with correct format based on feature file
-        children_data = []
-        for p in people:
-            child_list = []
-            if p.get("children_data"):
-                # Format children data correctly for the law
-                for child in p["children_data"]:
-                    child_list.append(
-                        {
-                            "age": child["age"],
-                            "income": 0,  # Assume children have no income for simplicity
-                        }
+        # Children data for the parents
+        parents = num_children > 0
+        sources[("RvIG", "CHILDREN_DATA")] = pd.DataFrame(
+            {
+                "bsn": bsn[parents],
+                "kinderen": [
+                    kinderen
+                    for kinderen in per_person(
+                        {"geboortedatum": b, "zorgbehoefte": z}
+                        for b, z in zip(child_birth_date, children["zorgbehoefte"].tolist(), strict=True)
                     )
+                    if kinderen
+                ],
+            }
+        )
 
-            # Value field zoals in YAML verwacht
-            children_data.append({"bsn": p["bsn"], "value": child_list})
+        # Childcare data for children under 12, registered under a BSN of their own
+        young = child_age < 12
+        if not young.any():
+            return sources
+        num_young = int(young.sum())
+        young_parent = child_parent[young]
+        care_type = np.where(child_age[young] < 4, "DAGOPVANG", "BSO").astype(object)
+        childcare = pd.DataFrame(
+            {
+                "kind_bsn": children["childcare_bsn"].to_numpy()[young],
+                # 20-40 hours per week, limited to 2500 hours per year
+                "uren_per_jaar": np.minimum(randint(20, 40, num_young) * 52, 2500),
+                # Below the maximum rates in cents according to law
+                "uurtarief": randint(700, np.where(care_type == "DAGOPVANG", 902, 766), num_young),
+                "soort_opvang": care_type,
+                "LRK_registratienummer": "LRK" + randint(100000, 999999, num_young).astype(str).astype(object),
+            }
+        )
+        parent_positions = np.unique(young_parent)
+        childcare_parents = bsn[parent_positions]
 
-        sources[("RvIG", "children")] = children_data
+        def per_parent(child_values):
+            lists = per_person(child_values, young_parent)
+            return [lists[parent] for parent in parent_positions]
 
-        # Load data to services
-        for (service, table), data in sources.items():
-            self.services.set_source_dataframe(service, table, pd.DataFrame(data))
+        sources[("RvIG", "children_bsns")] = pd.DataFrame(
+            {"bsn": childcare_parents, "value": per_parent({"bsn": b} for b in childcare["kind_bsn"])}
+        )
+        sources[("TOESLAGEN", "CHILDCARE_KVK")] = pd.DataFrame(
+            {
+                "bsn": childcare_parents,
+                "value": randint(10000000, 99999999, len(childcare_parents)).astype(str).astype(object),
+            }
+        )
+        sources[("TOESLAGEN", "DECLARED_HOURS")] = pd.DataFrame(
+            {"bsn": childcare_parents, "value": per_parent(childcare.to_dict("records"))}
+        )
+        # 0 for single parents, 24-40 for parents with a partner
+        sources[("TOESLAGEN", "EXPECTED_PARTNER_HOURS")] = pd.DataFrame(
+            {
+                "bsn": childcare_parents,
+                "value": np.where(has_partner[parent_positions], randint(24, 40, len(childcare_parents)), 0),
+            }
+        )
+        # With childcare, worked_hours and insured_years only hold the parents
+        has_children = people["has_children"].to_numpy(dtype=bool)
+        sources[("UWV", "worked_hours")] = pd.DataFrame(
+            {
+                "bsn": bsn[has_children],
+                "value": np.where(is_student, randint(800, 1000), randint(1600, 2000))[has_children],
+            }
+        )
+        sources[("UWV", "insured_years")] = pd.DataFrame(
+            {
+                "bsn": bsn[has_children],
+                "value": np.clip(people["work_years"].to_numpy().astype(np.int64), 3, 10)[has_children],
+            }
+        )
+        return sources
+
+    def setup_population(self, people, children, sources=None):
+        """
+        Load a population (see generate_population) into the services: its source tables and the claims for
+        huurtoeslag and kinderopvangtoeslag. Returns the people as dicts, with their children_data, to simulate.
+        The source tables are built with build_source_tables, unless given.
+        """
+        if sources is None:
+            sources = self.build_source_tables(people, children)
+        for (service, table), df in sources.items():
+            self.services.set_source_dataframe(service, table, df)
+
+        children_data = {}
+        for child in children.to_dict("records"):
+            children_data.setdefault(child["parent_bsn"], []).append(
+                {
+                    "bsn": child["bsn"],
+                    "birth_date": pd.Timestamp(child["birth_date"]).date(),
+                    "age": child["age"],
+                    "zorgbehoefte": child["zorgbehoefte"],
+                }
+            )
+        people = people.assign(birth_date=pd.to_datetime(people["birth_date"]).dt.date).to_dict("records")
+        for person in people:
+            person["children_data"] = children_data.get(person["bsn"], [])
 
-        # Add children data as separate tables for some people
-        children_by_bsn = {}
-        for p in people:
-            if p["has_children"] and p["children_data"]:
-                children_by_bsn[p["bsn"]] = p["children_data"]
+        # Claims for huurtoeslag (rent subsidy) and kinderopvangtoeslag (childcare subsidy). These are required as
+        # claims, not regular data sources. They are submitted in bulk, which saves them in one transaction.
+        claims = []
 
-        if children_by_bsn:
-            children_data = [
+        def claim(bsn: str, law: str, key: str, new_value, reason: str) -> None:
+            claims.append(
                 {
+                    "service": "TOESLAGEN",
+                    "key": key,
+                    "new_value": new_value,
+                    "reason": reason,
+                    "claimant": "BURGER",
+                    "law": law,
                     "bsn": bsn,
-                    "kinderen": [
-                        {
-                            "geboortedatum": child["birth_date"].isoformat(),
-                            "zorgbehoefte": child.get("zorgbehoefte", False),
-                        }
-                        for child in children
-                    ],
+                    "auto_approve": True,
                 }
-                for bsn, children in children_by_bsn.items()
-            ]
-            self.services.set_source_dataframe("RvIG", "CHILDREN_DATA", pd.DataFrame(children_data))
-
-            # Add childcare data for people with young children
-            childcare_data = []
-
-            # Children BSNs mapping for RvIG references
-            children_bsns = {}
-
-            for bsn, children in children_by_bsn.items():
-                young_children = [c for c in children if c["age"] < 12]
-                if young_children:
-                    # Create CHILDREN_BSNS mapping for this person
-                    bsns_list = []
-
-                    for child in young_children:
-                        # Create BSN for child
-                        child_bsn = self.generate_bsn()
-                        bsns_list.append(child_bsn)
-
-                        childcare_hours = random.randint(20, 40) * 52  # 20-40 hours per week
-                        # Make sure the childcare rates are limited to max allowed
-                        soort_opvang = "DAGOPVANG" if child["age"] < 4 else "BSO"
-                        max_uurtarief = (
-                            902 if soort_opvang == "DAGOPVANG" else 766
-                        )  # Max rates in cents according to law
-                        # Generate realistic childcare data
-                        lrk_nummer = f"LRK{random.randint(100000, 999999)}"
-                        childcare_data.append(
-                            {
-                                "bsn": bsn,
-                                "kind_bsn": child_bsn,
-                                "uren_per_jaar": min(childcare_hours, 2500),  # Limit to 2500 hours/year
-                                "uurtarief": random.randint(700, max_uurtarief),  # Below max tarief
-                                "soort_opvang": soort_opvang,
-                                "LRK_registratienummer": lrk_nummer,
-                            }
-                        )
-
-                    # Store the BSNs list for this person
-                    children_bsns[bsn] = bsns_list
-
-            # Add CHILDREN_BSNS references that the childcare law needs
-            if children_bsns:
-                children_bsns_data = [
-                    {
-                        "bsn": bsn,
-                        "value": [{"bsn": child_bsn} for child_bsn in bsns_list],
-                        # Format needs to match feature file format
-                    }
-                    for bsn, bsns_list in children_bsns.items()
-                ]
-                children_bsns_df = pd.DataFrame(children_bsns_data)
-                self.services.set_source_dataframe("RvIG", "children_bsns", children_bsns_df)
-
-            if childcare_data:
-                # Add childcare provider KVK number - exactly as in the feature file
-                childcare_kvk_data = [
-                    {
-                        "bsn": item["bsn"],
-                        "value": f"{random.randint(10000000, 99999999)}",  # String without KVK prefix
-                    }
-                    for item in childcare_data
-                ]
-                kvk_df = pd.DataFrame(childcare_kvk_data).drop_duplicates(subset=["bsn"])
-                self.services.set_source_dataframe("TOESLAGEN", "CHILDCARE_KVK", kvk_df)
-
-                # Add DECLARED_HOURS with all records for each BSN
-                # Exact format zoals in feature file
-                hours_by_bsn = {}
-                for item in childcare_data:
-                    bsn = item["bsn"]
-                    if bsn not in hours_by_bsn:
-                        hours_by_bsn[bsn] = []
-
-                    # Format exact zoals in kinderopvangtoeslag.feature - important to match
-                    hours_by_bsn[bsn].append(
-                        {
-                            "kind_bsn": item["kind_bsn"],
-                            "uren_per_jaar": item["uren_per_jaar"],
-                            "uurtarief": item["uurtarief"],
-                            "soort_opvang": item["soort_opvang"],
-                            "LRK_registratienummer": item["LRK_registratienummer"],
-                        }
-                    )
-
-                declared_hours_data = [{"bsn": bsn, "value": hours_list} for bsn, hours_list in hours_by_bsn.items()]
-                declared_hours_df = pd.DataFrame(declared_hours_data)
-                self.services.set_source_dataframe("TOESLAGEN", "DECLARED_HOURS", declared_hours_df)
-
-                # Add expected partner hours for childcare
-                partner_hours_data = [
-                    {
-                        "bsn": bsn,
-                        # Gebaseerd op feature file: 0 voor alleenstaanden, 20+ voor mensen met partner
-                        "value": 0
-                        if not any(p["bsn"] == bsn and p["has_partner"] for p in people)
-                        else random.randint(24, 40),
-                    }
-                    for bsn in hours_by_bsn
-                ]
-                partner_hours_df = pd.DataFrame(partner_hours_data)
-                self.services.set_source_dataframe("TOESLAGEN", "EXPECTED_PARTNER_HOURS", partner_hours_df)
-
-                # Ensure worked_hours is also set correctly for the UWV data
-                worked_hours_data = [
-                    {
-                        "bsn": p["bsn"],
-                        "value": random.randint(1600, 2000)
-                        if p.get("has_children") and not p["is_student"]
-                        else random.randint(800, 1000),
-                    }
-                    for p in people
-                    if p.get("has_children")
-                ]
-                worked_hours_df = pd.DataFrame(worked_hours_data)
-                self.services.set_source_dataframe("UWV", "worked_hours", worked_hours_df)
-
-                # Add insured_years data for people with children - required by kinderopvangtoeslag
-                insured_years_data = [
-                    {
-                        "bsn": p["bsn"],
-                        "value": min(max(3, int(p["work_years"])), 10),  # Between 3 and 10 years
-                    }
-                    for p in people
-                    if p.get("has_children")
-                ]
-                insured_years_df = pd.DataFrame(insured_years_data)
-                self.services.set_source_dataframe("UWV", "insured_years", insured_years_df)
+            )
 
-        # Submit claims for huurtoeslag (rent subsidy)
-        # These are required as claims, not regular data sources
         renters_count = 0
-        claims_submitted = 0
         for person in people:
             if person["housing_type"] == "rent":
                 renters_count += 1
                 bsn = person["bsn"]
-                try:
-                    # Submit claim for HUURPRIJS (rent price)
-                    claim1 = self.services.claim_manager.submit_claim(
-                        service="TOESLAGEN",
-                        key="HUURPRIJS",
-                        new_value=person["rent_amount"],
-                        reason="Simulated rent claim",
-                        claimant="BURGER",
-                        law="wet_op_de_huurtoeslag",
-                        bsn=bsn,
-                        auto_approve=True,
-                    )
-                    # Submit claim for SERVICEKOSTEN (service costs)
-                    claim2 = self.services.claim_manager.submit_claim(
-                        service="TOESLAGEN",
-                        key="SERVICEKOSTEN",
-                        new_value=person["rent_service_costs"],
-                        reason="Simulated service costs claim",
-                        claimant="BURGER",
-                        law="wet_op_de_huurtoeslag",
-                        bsn=bsn,
-                        auto_approve=True,
-                    )
-                    # Submit claim for SUBSIDIABELE_SERVICEKOSTEN (subsidizable service costs)
-                    claim3 = self.services.claim_manager.submit_claim(
-                        service="TOESLAGEN",
-                        key="SUBSIDIABELE_SERVICEKOSTEN",
-                        new_value=person["eligible_service_costs"],
-                        reason="Simulated subsidizable service costs claim",
-                        claimant="BURGER",
-                        law="wet_op_de_huurtoeslag",
-                        bsn=bsn,
-                        auto_approve=True,
-                    )
-                    claims_submitted += 1
-                    logger.debug(
-                        f"Submitted huurtoeslag claims for BSN {bsn}: rent={person['rent_amount']}, claims={claim1},{claim2},{claim3}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error submitting huurtoeslag claims for BSN {bsn}: {e}")
-                    import traceback
-
-                    logger.error(traceback.format_exc())
-
-        print(f"Submitted huurtoeslag claims for {claims_submitted}/{renters_count} renters", file=sys.stderr)
+                law = "wet_op_de_huurtoeslag"
+                claim(bsn, law, "HUURPRIJS", person["rent_amount"], "Simulated rent claim")
+                claim(bsn, law, "SERVICEKOSTEN", person["rent_service_costs"], "Simulated service costs claim")
+                claim(
+                    bsn,
+                    law,
+                    "SUBSIDIABELE_SERVICEKOSTEN",
+                    person["eligible_service_costs"],
+                    "Simulated subsidizable service costs claim",
+                )
 
-        # Submit claims for kinderopvangtoeslag (childcare subsidy)
         parents_count = 0
-        childcare_claims_submitted = 0
         for person in people:
             if person.get("has_children") and person.get("children_data"):
                 # Check if any children are under 12
@@ -956,84 +914,46 @@ class LawSimulator:
                 if young_children:
                     parents_count += 1
                     bsn = person["bsn"]
-                    try:
-                        # Submit KvK number claim
-                        self.services.claim_manager.submit_claim(
-                            service="TOESLAGEN",
-                            key="KINDEROPVANG_KVK",
-                            new_value="12345678",  # Simulated childcare provider KvK
-                            reason="Simulated childcare provider",
-                            claimant="BURGER",
-                            law="wet_kinderopvang",
-                            bsn=bsn,
-                            auto_approve=True,
-                        )
-
-                        # Submit childcare hours for each young child
-                        aangegeven_uren = []
-                        for child in young_children:
-                            # Simulate different childcare hours based on child age
-                            if child["age"] < 4:
-                                # Daycare for toddlers (full-time)
-                                hours_per_year = 2000
-                                hourly_rate = 850  # €8.50 per hour
-                                care_type = "DAGOPVANG"
-                            else:
-                                # After school care for school-age children
-                                hours_per_year = 800
-                                hourly_rate = 750  # €7.50 per hour
-                                care_type = "BUITENSCHOOLSE_OPVANG"
-
-                            aangegeven_uren.append(
-                                {
-                                    "kind_bsn": child["bsn"],
-                                    "uren_per_jaar": hours_per_year,
-                                    "uurtarief": hourly_rate,
-                                    "soort_opvang": care_type,
-                                }
-                            )
-
-                        # Submit childcare hours claim
-                        self.services.claim_manager.submit_claim(
-                            service="TOESLAGEN",
-                            key="AANGEGEVEN_UREN",
-                            new_value=aangegeven_uren,
-                            reason="Simulated childcare hours",
-                            claimant="BURGER",
-                            law="wet_kinderopvang",
-                            bsn=bsn,
-                            auto_approve=True,
-                        )
-
-                        # Submit partner hours (0 if no partner, otherwise partner's worked hours)
-                        partner_hours = 0
-                        if person.get("has_partner"):
-                            # Assume partner works full-time
-                            partner_hours = 1920
-
-                        self.services.claim_manager.submit_claim(
-                            service="TOESLAGEN",
-                            key="VERWACHTE_PARTNER_UREN",
-                            new_value=partner_hours,
-                            reason="Simulated partner work hours",
-                            claimant="BURGER",
-                            law="wet_kinderopvang",
-                            bsn=bsn,
-                            auto_approve=True,
-                        )
+                    law = "wet_kinderopvang"
+                    # Simulated childcare provider KvK
+                    claim(bsn, law, "KINDEROPVANG_KVK", "12345678", "Simulated childcare provider")
 
-                        childcare_claims_submitted += 1
-                        logger.debug(
-                            f"Submitted kinderopvangtoeslag claims for BSN {bsn} with {len(young_children)} young children"
+                    # Childcare hours for each young child
+                    aangegeven_uren = []
+                    for child in young_children:
+                        # Simulate different childcare hours based on child age
+                        if child["age"] < 4:
+                            # Daycare for toddlers (full-time)
+                            hours_per_year = 2000
+                            hourly_rate = 850  # €8.50 per hour
+                            care_type = "DAGOPVANG"
+                        else:
+                            # After school care for school-age children
+                            hours_per_year = 800
+                            hourly_rate = 750  # €7.50 per hour
+                            care_type = "BUITENSCHOOLSE_OPVANG"
+
+                        aangegeven_uren.append(
+                            {
+                                "kind_bsn": child["bsn"],
+                                "uren_per_jaar": hours_per_year,
+                                "uurtarief": hourly_rate,
+                                "soort_opvang": care_type,
+                            }
                         )
-                    except Exception as e:
-                        logger.error(f"Error submitting kinderopvangtoeslag claims for BSN {bsn}: {e}")
-                        import traceback
+                    claim(bsn, law, "AANGEGEVEN_UREN", aangegeven_uren, "Simulated childcare hours")
 
-                        logger.error(traceback.format_exc())
+                    # Partner hours (0 if no partner, otherwise partner's worked hours)
+                    partner_hours = 0
+                    if person.get("has_partner"):
+                        # Assume partner works full-time
+                        partner_hours = 1920
+                    claim(bsn, law, "VERWACHTE_PARTNER_UREN", partner_hours, "Simulated partner work hours")
 
+        self.services.claim_manager.submit_claims_bulk(claims)
+        print(f"Submitted huurtoeslag claims for {renters_count} renters", file=sys.stderr)
         print(
-            f"Submitted kinderopvangtoeslag claims for {childcare_claims_submitted}/{parents_count} parents with young children",
+            f"Submitted kinderopvangtoeslag claims for {parents_count} parents with young children",
             file=sys.stderr,
         )
 
@@ -1041,30 +961,6 @@ class LawSimulator:
 
     def simulate_person(self, person) -> None:
         """Simulate all applicable laws for a person and calculate besteedbaar inkomen"""
-        has_partner = bool(person["partner_bsn"])
-
-        # Base result with personal information
-        result = {
-            "bsn": person["bsn"],
-            "age": person["age"],
-            "has_partner": has_partner,
-            "housing_type": person["housing_type"],
-            "rent_amount": person["rent_amount"] / 100 if person["housing_type"] == "rent" else 0,
-            "income": person["annual_income"] / 100,
-            "net_worth": person["net_worth"] / 100,
-            "work_years": person["work_years"],
-            "residence_years": person["residence_years"],
-            "is_student": person["is_student"],
-            "study_grant": person["study_grant"] / 100,
-            "has_dutch_nationality": person["has_dutch_nationality"],
-            "is_detained": person["is_detained"],
-            "has_children": person["has_children"],
-            "children_count": len(person.get("children_data", [])),
-            "youngest_child_age": min([c["age"] for c in person.get("children_data", [1000])])
-            if person.get("children_data")
-            else None,
-        }
-
         # Evaluate all relevant laws
         try:
             # 1. Zorgtoeslag (healthcare subsidy)
@@ -1075,6 +971,8 @@ class LawSimulator:
                 {"BSN": person["bsn"]},
                 self.simulation_date,
                 overwrite_input=zorgtoeslag_overrides,
+                trace="none",
+                definition_overrides=self.definition_overrides,
             )
 
             # Also evaluate 2024 version for comparison if simulating in 2025
@@ -1087,12 +985,21 @@ class LawSimulator:
                         {"BSN": person["bsn"]},
                         "2024-12-31",
                         overwrite_input=zorgtoeslag_overrides,
+                        trace="none",
+                        definition_overrides=self.definition_overrides,
                     )
                 except Exception:
                     pass
 
             # 2. AOW (state pension)
-            aow = self.services.evaluate("SVB", "algemene_ouderdomswet", {"BSN": person["bsn"]}, self.simulation_date)
+            aow = self.services.evaluate(
+                "SVB",
+                "algemene_ouderdomswet",
+                {"BSN": person["bsn"]},
+                self.simulation_date,
+                trace="none",
+                definition_overrides=self.definition_overrides,
+            )
 
             # 3. Huurtoeslag (rent subsidy)
             try:
@@ -1103,6 +1010,8 @@ class LawSimulator:
                     {"BSN": person["bsn"]},
                     self.simulation_date,
                     overwrite_input=huurtoeslag_overrides,
+                    trace="none",
+                    definition_overrides=self.definition_overrides,
                 )
             except Exception as e:
                 logger.debug(f"Error evaluating huurtoeslag for BSN {person['bsn']}: {e}")
@@ -1117,6 +1026,8 @@ class LawSimulator:
                     {"BSN": person["bsn"]},
                     self.simulation_date,
                     overwrite_input=bijstand_overrides,
+                    trace="none",
+                    definition_overrides=self.definition_overrides,
                 )
             except Exception:
                 bijstand = None
@@ -1124,7 +1035,7 @@ class LawSimulator:
             # 5. Kinderopvangtoeslag (childcare subsidy)
             # Alleen proberen voor mensen met kinderen onder 12 jaar
             kinderopvangtoeslag = None
-            if person["has_children"] and any(child["age"] < 12 for child in person.get("children_data", [])):
+            if self._has_young_children(person):
                 try:
                     kinderopvang_overrides = self._create_law_overrides("wet_kinderopvang")
                     kinderopvangtoeslag = self.services.evaluate(
@@ -1133,6 +1044,8 @@ class LawSimulator:
                         {"BSN": person["bsn"]},
                         self.simulation_date,
                         overwrite_input=kinderopvang_overrides,
+                        trace="none",
+                        definition_overrides=self.definition_overrides,
                     )
                 except Exception as e:
                     logger.debug(f"Error evaluating kinderopvangtoeslag for BSN {person['bsn']}: {e}")
@@ -1141,7 +1054,13 @@ class LawSimulator:
             # 6. Kiesrecht (voting rights)
             kiesrecht_overrides = self._create_law_overrides("kieswet")
             kiesrecht = self.services.evaluate(
-                "KIESRAAD", "kieswet", {"BSN": person["bsn"]}, self.simulation_date, overwrite_input=kiesrecht_overrides
+                "KIESRAAD",
+                "kieswet",
+                {"BSN": person["bsn"]},
+                self.simulation_date,
+                overwrite_input=kiesrecht_overrides,
+                trace="none",
+                definition_overrides=self.definition_overrides,
             )
 
             # 7. Inkomstenbelasting (income tax)
@@ -1152,9 +1071,136 @@ class LawSimulator:
                 {"BSN": person["bsn"]},
                 self.simulation_date,
                 overwrite_input=inkomstenbelasting_overrides,
+                trace="none",
+                definition_overrides=self.definition_overrides,
             )
         except Exception:
-            return None
+            return
+
+        self._add_result(
+            person,
+            zorgtoeslag,
+            zorgtoeslag_2024,
+            aow,
+            huurtoeslag,
+            bijstand,
+            kinderopvangtoeslag,
+            kiesrecht,
+            inkomstenbelasting,
+        )
+
+    def simulate_people(self, people) -> None:
+        """
+        Simulate all applicable laws for a group of people at once and calculate besteedbaar inkomen.
+
+        Every law is evaluated once for the whole group with Services.evaluate_batch, which gives the same
+        results as simulate_person per person. If a batch evaluation fails on the data of the group, the group
+        falls back to simulate_person so failures stay limited to the people they belong to. Fallbacks are
+        logged and counted in batch_fallbacks, since they make the simulation a lot slower.
+        """
+        bsns = [person["bsn"] for person in people]
+
+        def evaluate_batch(service, law, reference_date, include=None):
+            include = include or [True] * len(people)
+            overrides = self._create_law_overrides(law)
+            definition_overrides = self.services.reachable_definition_overrides(service, law, self.definition_overrides)
+            key = (service, law, reference_date, freeze(overrides), freeze(definition_overrides), tuple(include))
+            if self._evaluations is not None and key in self._evaluations:
+                return self._evaluations[key]
+            frame = self.services.evaluate_batch(
+                service,
+                law,
+                [bsn for bsn, keep in zip(bsns, include) if keep],
+                reference_date,
+                overwrite_input=overrides,
+                definition_overrides=definition_overrides,
+            )
+            results = iter(RuleResult.from_batch_frame(frame))
+            evaluated = [next(results) if keep else None for keep in include]
+            if self._evaluations is not None:
+                self._evaluations[key] = evaluated
+            return evaluated
+
+        try:
+            zorgtoeslag = evaluate_batch("TOESLAGEN", "zorgtoeslagwet", self.simulation_date)
+            zorgtoeslag_2024 = (
+                evaluate_batch("TOESLAGEN", "zorgtoeslagwet", "2024-12-31")
+                if self.simulation_date.startswith("2025")
+                else [None] * len(people)
+            )
+            aow = evaluate_batch("SVB", "algemene_ouderdomswet", self.simulation_date)
+            huurtoeslag = evaluate_batch("TOESLAGEN", "wet_op_de_huurtoeslag", self.simulation_date)
+            bijstand = evaluate_batch("GEMEENTE_AMSTERDAM", "participatiewet/bijstand", self.simulation_date)
+            kinderopvangtoeslag = evaluate_batch(
+                "TOESLAGEN",
+                "wet_kinderopvang",
+                self.simulation_date,
+                include=[self._has_young_children(person) for person in people],
+            )
+            kiesrecht = evaluate_batch("KIESRAAD", "kieswet", self.simulation_date)
+            inkomstenbelasting = evaluate_batch("BELASTINGDIENST", "wet_inkomstenbelasting", self.simulation_date)
+        except (ArithmeticError, KeyError, TypeError, ValueError):
+            logger.warning("Batch evaluation failed, simulating %s people one by one", len(people), exc_info=True)
+            self.batch_fallbacks += 1
+            for person in people:
+                self.simulate_person(person)
+            return
+
+        for person, *law_results in zip(
+            people,
+            zorgtoeslag,
+            zorgtoeslag_2024,
+            aow,
+            huurtoeslag,
+            bijstand,
+            kinderopvangtoeslag,
+            kiesrecht,
+            inkomstenbelasting,
+        ):
+            self._add_result(person, *law_results)
+
+    @staticmethod
+    def _has_young_children(person) -> bool:
+        return person["has_children"] and any(child["age"] < 12 for child in person.get("children_data", []))
+
+    def _add_result(
+        self,
+        person,
+        zorgtoeslag,
+        zorgtoeslag_2024,
+        aow,
+        huurtoeslag,
+        bijstand,
+        kinderopvangtoeslag,
+        kiesrecht,
+        inkomstenbelasting,
+    ) -> None:
+        """Combine the law results for a person into a result row, including besteedbaar inkomen"""
+        has_partner = bool(person["partner_bsn"])
+
+        # Base result with personal information
+        result = {
+            "bsn": person["bsn"],
+            # Number of people this person stands for in a weighted simulation
+            "weight": person.get("weight", 1.0),
+            "age": person["age"],
+            "has_partner": has_partner,
+            "housing_type": person["housing_type"],
+            "rent_amount": person["rent_amount"] / 100 if person["housing_type"] == "rent" else 0,
+            "income": person["annual_income"] / 100,
+            "net_worth": person["net_worth"] / 100,
+            "work_years": person["work_years"],
+            "residence_years": person["residence_years"],
+            "is_student": person["is_student"],
+            "study_grant": person["study_grant"] / 100,
+            "has_dutch_nationality": person["has_dutch_nationality"],
+            "is_detained": person["is_detained"],
+            "has_children": person["has_children"],
+            "children_count": len(person.get("children_data", [])),
+            "youngest_child_age": min([c["age"] for c in person.get("children_data", [1000])])
+            if person.get("children_data")
+            else None,
+        }
 
         result.update(
             {
@@ -1230,41 +1276,46 @@ class LawSimulator:
         self.results.append(result)
 
     def _create_law_overrides(self, law_name):
-        """Create overwrite_input dict for a specific law based on UI parameters."""
+        """
+        Create overwrite_input dict for a specific law based on UI parameters.
+
+        Of self.overwrite_input only the fields the law can read are included, so a law gets the same overrides
+        (and the same cached results) in every scenario that doesn't change anything it depends on.
+        """
         overrides = {}
+        if self.overwrite_input:
+            service = self.services.resolver.find_rule(law_name, self.simulation_date).service
+            overridable = self.services.resolver.get_overridable_fields(law_name, service)
+            for service_name, fields in self.overwrite_input.items():
+                relevant = {field: value for field, value in fields.items() if (service_name, field) in overridable}
+                if relevant:
+                    overrides[service_name] = relevant
 
         if law_name == "zorgtoeslagwet" and "zorgtoeslag" in self.law_parameters:
             params = self.law_parameters["zorgtoeslag"]
             if "standaardpremie" in params and params["standaardpremie"] is not None:
                 # Convert monthly to yearly (in eurocents)
                 yearly_premium = int(params["standaardpremie"] * 12 * 100)
-                overrides["VWS"] = {"standaardpremie": yearly_premium}
+                overrides.setdefault("VWS", {})["standaardpremie"] = yearly_premium
 
         # Note: Most other law parameters are in the 'definitions' section of YAML files,
-        # which cannot be overridden through the overwrite_input mechanism.
-        # These would require extending the system to support definition overrides.
-
-        # For now, we can only override input parameters, not definition constants.
-        # Future enhancement: Add support for overriding law definitions.
+        # which cannot be overridden through the overwrite_input mechanism; those are
+        # overridden with self.definition_overrides instead.
 
         return overrides
 
-    def run_simulation(self, num_people=1000):
-        import sys
-
-        print(f"Generating {num_people} people with realistic demographics...", file=sys.stderr)
-        pairs = self.generate_paired_people(num_people)
+    def run_simulation(self, num_people=1000, workers=1, represented_people=None):
+        """
+        Simulate a generated population, on `workers` processes when more than one. A seeded simulator gives the
+        same results for any number of workers.
 
-        print("Setting up test data sources...", file=sys.stderr)
-        people = self.setup_test_data(pairs)
-        total_people = len(people)
-
-        print(f"Simulating laws for {total_people} people...", file=sys.stderr)
-        progress_bar = tqdm(total=total_people, desc="Simulating", unit="person", file=sys.stderr)
-        for person in people:
-            self.simulate_person(person)
-            progress_bar.update(1)
-        progress_bar.close()
+        With represented_people, the num_people simulated stand for a population of that size: every result
+        row gets a weight of represented_people / num_people, which the summary counts people by.
+        """
+        results = []
+        for batch_results in self._simulate_population(num_people, workers, represented_people):
+            results.extend(batch_results)
+        self.results = results
 
         # Convert to DataFrame
         results_df = pd.DataFrame([r for r in self.results if r is not None])
@@ -1275,401 +1326,429 @@ class LawSimulator:
         else:
             raise ValueError("Simulation failed to generate valid results")
 
-    def calculate_law_breakdowns(self, df, law_name, eligible_col, amount_col):
-        """Calculate breakdowns by various demographics for a specific law."""
-        # Handle special case for voting_rights which uses same column for eligible and amount
-        if law_name == "voting_rights":
-            amount_col = eligible_col
-
-        breakdowns = {}
-
-        # By age group
-        age_bins = [0, 30, 45, 67, 85, 150]
-        age_labels = ["18-30", "30-45", "45-67", "67-85", "85+"]
-        df["age_group"] = pd.cut(df["age"], bins=age_bins, labels=age_labels)
-
-        age_breakdown = (
-            df.groupby("age_group", observed=True)
-            .agg({eligible_col: ["sum", "count", "mean"], amount_col: "mean"})
-            .round(2)
+    def stream_simulation(self, num_people=1000, workers=1, output_path=None, progress=None, represented_people=None):
+        """
+        Simulate a generated population like run_simulation, without keeping the result rows in memory.
+
+        Results are folded into self.aggregator batch by batch (so a summary is available while the simulation
+        runs) and, if an output path is given, appended to a Parquet file. After every batch progress, if given,
+        is called with the number of people simulated so far and num_people. Returns the summary like
+        get_summary_with_breakdowns, weighted like run_simulation.
+        """
+        self.aggregator = self._aggregator()
+        writer = ParquetResultWriter(output_path) if output_path else None
+        simulated = 0
+        try:
+            for batch_results in self._simulate_population(num_people, workers, represented_people):
+                results_df = pd.DataFrame([r for r in batch_results if r is not None])
+                self.aggregator.add(results_df)
+                if writer and len(results_df) > 0:
+                    writer.write(results_df)
+                simulated += len(batch_results)
+                if progress:
+                    progress(simulated, num_people)
+        finally:
+            if writer:
+                writer.close()
+
+        if self.aggregator.rows == 0:
+            raise ValueError("Simulation failed to generate valid results")
+        return self._summary_response(self.aggregator, self.simulation_date)
+
+    def compare_scenarios(self, scenarios, num_people=1000, output_path=None, progress=None, represented_people=None):
+        """
+        Simulate a generated population under the simulator's own parameters (the baseline) and under variant
+        scenarios, to compare policy changes on exactly the same people.
+
+        scenarios maps a name to a variant: a dict with law_parameters, overwrite_input and/or definition_overrides,
+        which replace those of the baseline. The population is generated and set up once. Per batch, a law is evaluated once for
+        every distinct overwrite_input it gets (see _create_law_overrides), so the laws a variant can't affect
+        reuse the baseline results. Returns the summary of every scenario, the differences of the variant
+        summaries with the baseline and the distribution of the per person differences (see ScenarioComparison).
+        With an output_path the baseline result rows, extended with the per person differences of every variant,
+        are written to it as Parquet. progress is called like in stream_simulation.
+        """
+        baseline = {
+            "law_parameters": self.law_parameters,
+            "overwrite_input": self.overwrite_input,
+            "definition_overrides": self.definition_overrides,
+        }
+        comparison = ScenarioComparison(
+            list(scenarios), groupings=self.breakdown_groupings, quantiles=self.breakdown_quantiles
         )
+        writer = ParquetResultWriter(output_path) if output_path else None
 
-        breakdowns["by_age"] = {}
-        if len(age_breakdown) > 0:
-            for age in age_breakdown.index:
-                row = age_breakdown.loc[age]
-                try:
-                    breakdowns["by_age"][str(age)] = {
-                        "eligible_count": int(row[(eligible_col, "sum")]),
-                        "total_count": int(row[(eligible_col, "count")]),
-                        "eligible_pct": float(row[(eligible_col, "mean")] * 100),
-                        "avg_amount": float(row[(amount_col, "mean")]) if pd.notna(row[(amount_col, "mean")]) else 0,
-                    }
-                except (KeyError, TypeError):
-                    breakdowns["by_age"][str(age)] = {
-                        "eligible_count": 0,
-                        "total_count": 0,
-                        "eligible_pct": 0,
-                        "avg_amount": 0,
-                    }
-
-        # By income bracket
-        income_bins = [0, 20000, 40000, 60000, 1000000]
-        income_labels = ["€0-20k", "€20-40k", "€40-60k", "€60k+"]
-        df["income_bracket"] = pd.cut(df["income"], bins=income_bins, labels=income_labels)
+        people, children = self._generate_population(num_people, represented_people)
+        print("Setting up test data sources...", file=sys.stderr)
+        people = self.setup_population(people, children)
+        print(f"Simulating laws for {len(people)} people in {len(scenarios) + 1} scenarios...", file=sys.stderr)
+        progress_bar = tqdm(total=len(people), desc="Simulating", unit="person", file=sys.stderr)
+        simulated = 0
+        try:
+            for start in range(0, len(people), self.batch_size):
+                batch = people[start : start + self.batch_size]
+                self._evaluations = {}
+                results = {}
+                for name, scenario in [(None, baseline), *scenarios.items()]:
+                    self.law_parameters = scenario.get("law_parameters") or {}
+                    self.overwrite_input = scenario.get("overwrite_input") or {}
+                    self.definition_overrides = scenario.get("definition_overrides") or {}
+                    self.results = []
+                    self.simulate_people(batch)
+                    results[name] = pd.DataFrame([r for r in self.results if r is not None])
+                baseline_results = results.pop(None)
+                person_rows = comparison.add(baseline_results, results)
+                if writer and len(person_rows) > 0:
+                    writer.write(person_rows)
+                simulated += len(batch)
+                progress_bar.update(len(batch))
+                if progress:
+                    progress(simulated, num_people)
+        finally:
+            self.law_parameters = baseline["law_parameters"]
+            self.overwrite_input = baseline["overwrite_input"]
+            self.definition_overrides = baseline["definition_overrides"]
+            self._evaluations = None
+            progress_bar.close()
+            if writer:
+                writer.close()
+
+        if comparison.baseline.rows == 0:
+            raise ValueError("Simulation failed to generate valid results")
+        return {
+            "status": "success",
+            "comparison": comparison.summary(),
+            "total_people": int(round(comparison.baseline.total)),
+            "simulation_date": self.simulation_date,
+            "batch_fallbacks": self.batch_fallbacks,
+        }
 
-        income_breakdown = (
-            df.groupby("income_bracket", observed=True)
-            .agg({eligible_col: ["sum", "count", "mean"], amount_col: "mean"})
-            .round(2)
+    def sample_simulation(
+        self,
+        targets,
+        confidence=0.95,
+        frame_size=100_000,
+        max_people=None,
+        output_path=None,
+        progress=None,
+        represented_people=None,
+    ):
+        """
+        Simulate a stratified sample of a generated population, until the estimates are precise enough.
+
+        targets maps result columns (e.g. zorgtoeslag_amount, zorgtoeslag_eligible) to the half width the
+        confidence interval of their mean per person has to get below (0 simulates the whole population). A
+        population of frame_size people is generated (which is cheap) and its households are stratified by age
+        band and income class (see simulation_results) and housing type of the main person, and by partner and
+        children. Households are drawn without replacement in proportion to the strata, a batch at a time.
+        Drawing stops when every interval is within its target, after max_people people or when the population
+        is exhausted. Reproducible with a seeded simulator.
+
+        The sample is weighted to the population (of represented_people, the frame size by default), so the
+        summary is that of the population like stream_simulation. The result rows are kept until the sample is
+        complete, since their weights depend on the final sample sizes, and then written to output_path as
+        Parquet if given. progress is called with the people simulated so far and max_people.
+        """
+        if not targets:
+            raise ValueError("Sampling needs at least one target statistic")
+        people, children = self._generate_population(frame_size, represented_people)
+        # The source tables of the whole population, before drawing the sample from self.rng, so a sampled person
+        # has the same data as in stream_simulation
+        sources = self.build_source_tables(people, children)
+        max_people = min(max_people or len(people), len(people))
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+        households = people.groupby("household", sort=True).agg(
+            age=("age", "first"),
+            income=("annual_income", "first"),
+            housing_type=("housing_type", "first"),
+            has_partner=("has_partner", "first"),
+            has_children=("has_children", "any"),
+            size=("bsn", "size"),
         )
-
-        breakdowns["by_income"] = {}
-        if len(income_breakdown) > 0:
-            for bracket in income_breakdown.index:
-                row = income_breakdown.loc[bracket]
-                try:
-                    breakdowns["by_income"][str(bracket)] = {
-                        "eligible_count": int(row[(eligible_col, "sum")]),
-                        "total_count": int(row[(eligible_col, "count")]),
-                        "eligible_pct": float(row[(eligible_col, "mean")] * 100),
-                        "avg_amount": float(row[(amount_col, "mean")]) if pd.notna(row[(amount_col, "mean")]) else 0,
-                    }
-                except (KeyError, TypeError):
-                    breakdowns["by_income"][str(bracket)] = {
-                        "eligible_count": 0,
-                        "total_count": 0,
-                        "eligible_pct": 0,
-                        "avg_amount": 0,
-                    }
-
-        # By housing type (if relevant)
-        if "housing_type" in df.columns and law_name in ["huurtoeslag"]:
-            housing_breakdown = (
-                df.groupby("housing_type", observed=True)
-                .agg({eligible_col: ["sum", "count", "mean"], amount_col: "mean"})
-                .round(2)
-            )
-
-            breakdowns["by_housing"] = {}
-            if len(housing_breakdown) > 0:
-                for housing in housing_breakdown.index:
-                    row = housing_breakdown.loc[housing]
-                    try:
-                        breakdowns["by_housing"][str(housing)] = {
-                            "eligible_count": int(row[(eligible_col, "sum")]),
-                            "total_count": int(row[(eligible_col, "count")]),
-                            "eligible_pct": float(row[(eligible_col, "mean")] * 100),
-                            "avg_amount": float(row[(amount_col, "mean")])
-                            if pd.notna(row[(amount_col, "mean")])
-                            else 0,
-                        }
-                    except (KeyError, TypeError):
-                        breakdowns["by_housing"][str(housing)] = {
-                            "eligible_count": 0,
-                            "total_count": 0,
-                            "eligible_pct": 0,
-                            "avg_amount": 0,
-                        }
-
-        # By partner status
-        partner_breakdown = (
-            df.groupby("has_partner", observed=True)
-            .agg({eligible_col: ["sum", "count", "mean"], amount_col: "mean"})
-            .round(2)
+        strata = households.groupby(
+            [
+                pd.cut(households["age"], bins=AGE_BINS, labels=False),
+                pd.cut(households["income"] / 100, bins=INCOME_BINS, labels=False, include_lowest=True),
+                households["housing_type"],
+                households["has_partner"],
+                households["has_children"],
+            ],
+            dropna=False,
+        ).ngroup()
+        stratum_sizes = strata.value_counts().sort_index()
+        # Per stratum its households in a random order, drawn from the front
+        queues = {stratum: self.rng.permutation(group.index.to_numpy()) for stratum, group in strata.groupby(strata)}
+        drawn = pd.Series(0, index=stratum_sizes.index)
+        household_size = households["size"].mean()
+
+        aggregator = self._aggregator()
+        batches = []
+        simulated = 0
+        estimates = None
+        converged = False
+        print(
+            f"Sampling from {len(people)} people in {len(stratum_sizes)} strata until the targets are met...",
+            file=sys.stderr,
         )
+        progress_bar = tqdm(total=max_people, desc="Simulating", unit="person", file=sys.stderr)
+        while simulated < max_people and drawn.sum() < len(households):
+            wanted = max(1, int(min(self.batch_size, max_people - simulated) / household_size))
+            take = self._allocate_sample(wanted, stratum_sizes, drawn)
+            sample = np.concatenate(
+                [queues[stratum][drawn[stratum] : drawn[stratum] + count] for stratum, count in take.items() if count]
+            )
+            drawn += take
 
-        breakdowns["by_partner"] = {
-            "with_partner": {"eligible_count": 0, "total_count": 0, "eligible_pct": 0, "avg_amount": 0},
-            "without_partner": {"eligible_count": 0, "total_count": 0, "eligible_pct": 0, "avg_amount": 0},
-        }
-
-        if True in partner_breakdown.index:
-            row = partner_breakdown.loc[True]
-            try:
-                breakdowns["by_partner"]["with_partner"] = {
-                    "eligible_count": int(row[(eligible_col, "sum")]),
-                    "total_count": int(row[(eligible_col, "count")]),
-                    "eligible_pct": float(row[(eligible_col, "mean")] * 100),
-                    "avg_amount": float(row[(amount_col, "mean")]) if pd.notna(row[(amount_col, "mean")]) else 0,
-                }
-            except (KeyError, TypeError):
-                pass
+            batch = people[people["household"].isin(sample)]
+            batch_people = self.setup_population(
+                batch,
+                children[children["parent_bsn"].isin(batch["bsn"])],
+                self._select_source_tables(sources, batch["bsn"]),
+            )
+            self.results = []
+            for start in range(0, len(batch_people), self.batch_size):
+                self.simulate_people(batch_people[start : start + self.batch_size])
+            results = pd.DataFrame([r for r in self.results if r is not None])
+            if len(results) > 0:
+                results["household"] = results["bsn"].map(batch.set_index("bsn")["household"])
+                batches.append(results)
+            simulated += len(batch)
+            progress_bar.update(len(batch))
+            if progress:
+                progress(simulated, max_people)
+
+            sampled = strata[np.concatenate([queues[stratum][:count] for stratum, count in drawn.items() if count])]
+            if batches:
+                estimates = stratified_estimates(
+                    pd.concat(batches, ignore_index=True), sampled, stratum_sizes, list(targets)
+                )
+                half_widths = z * estimates["standard_error"]
+                if all(half_widths[column] < target for column, target in targets.items()):
+                    converged = True
+                    break
+        progress_bar.close()
+        # A completely simulated population has exact means
+        converged = converged or bool(drawn.sum() == len(households))
 
-        if False in partner_breakdown.index:
-            row = partner_breakdown.loc[False]
-            try:
-                breakdowns["by_partner"]["without_partner"] = {
-                    "eligible_count": int(row[(eligible_col, "sum")]),
-                    "total_count": int(row[(eligible_col, "count")]),
-                    "eligible_pct": float(row[(eligible_col, "mean")] * 100),
-                    "avg_amount": float(row[(amount_col, "mean")]) if pd.notna(row[(amount_col, "mean")]) else 0,
+        if not batches:
+            raise ValueError("Simulation failed to generate valid results")
+        results = pd.concat(batches, ignore_index=True)
+        # Every sampled household stands for the households of its stratum
+        sampled = strata[results["household"]]
+        results["weight"] *= (stratum_sizes / drawn)[sampled].to_numpy()
+        results = results.drop(columns=["household"])
+        aggregator.add(results)
+        if output_path:
+            with ParquetResultWriter(output_path) as writer:
+                writer.write(results)
+
+        response = self._summary_response(aggregator, self.simulation_date)
+        response["sampling"] = {
+            # Plain Python scalars, the response is serialized as JSON
+            "converged": bool(converged),
+            "confidence": float(confidence),
+            "population_people": len(people),
+            "sampled_people": int(simulated),
+            "sampled_households": int(drawn.sum()),
+            "strata": len(stratum_sizes),
+            "estimates": {
+                column: {
+                    "mean": float(estimates.loc[column, "mean"]),
+                    "half_width": float(z * estimates.loc[column, "standard_error"]),
+                    "target": float(target),
                 }
-            except (KeyError, TypeError):
-                pass
-
-        return breakdowns
+                for column, target in targets.items()
+            },
+        }
+        return response
+
+    @staticmethod
+    def _allocate_sample(wanted, stratum_sizes, drawn):
+        """
+        The number of households to draw per stratum for a batch of about `wanted` households.
+
+        The first batch has at least two households per stratum, so every stratum gets a standard error. After
+        that the sample is brought towards proportional allocation. Allocating on the standard deviations seen so
+        far (Neyman allocation) is biased here: a skewed stratum often looks constant after a few households and
+        would then hardly be drawn again.
+        """
+        remaining = stratum_sizes - drawn
+        share = stratum_sizes / stratum_sizes.sum()
+        if not drawn.any():
+            return np.minimum(np.maximum(np.round(share * wanted), 2), remaining).astype(int)
+
+        take = np.minimum(np.floor(share * (drawn.sum() + wanted) - drawn).clip(lower=0), remaining)
+        if take.sum() == 0:
+            # Every stratum has its share already, continue with the least sampled one
+            take[(drawn / stratum_sizes).where(remaining > 0).idxmin()] = 1
+        return take.astype(int)
+
+    def _generate_population(self, num_people, represented_people=None):
+        """Generate a population with the weight of every person, see run_simulation"""
+        print(f"Generating {num_people} people with realistic demographics...", file=sys.stderr)
+        people, children = self.generate_population(num_people)
+        people["weight"] = (represented_people or len(people)) / len(people)
+        return people, children
+
+    def _simulate_population(self, num_people, workers, represented_people=None):
+        """Generate and simulate a population, yielding the result rows per batch in population order"""
+        people, children = self._generate_population(num_people, represented_people)
+
+        if workers > 1:
+            # Regroup the rows of the shards into the batches of a single process, so everything summing them per
+            # batch adds up the same numbers in the same order
+            batch_of = dict(zip(people["bsn"], np.arange(len(people)) // self.batch_size))
+            rows = itertools.chain.from_iterable(self._run_parallel(people, children, workers))
+            for _, batch_results in itertools.groupby(rows, key=lambda row: batch_of[row["bsn"]]):
+                yield list(batch_results)
+            return
 
-    def calculate_tax_breakdowns(self, df):
-        """Calculate tax breakdowns by demographics."""
-        breakdowns = {}
+        print("Setting up test data sources...", file=sys.stderr)
+        people = self.setup_population(people, children)
+        total_people = len(people)
 
-        # By age group
-        age_bins = [0, 30, 45, 67, 85, 150]
-        age_labels = ["18-30", "30-45", "45-67", "67-85", "85+"]
-        df["age_group"] = pd.cut(df["age"], bins=age_bins, labels=age_labels)
+        print(f"Simulating laws for {total_people} people...", file=sys.stderr)
+        progress_bar = tqdm(total=total_people, desc="Simulating", unit="person", file=sys.stderr)
+        for start in range(0, total_people, self.batch_size):
+            batch = people[start : start + self.batch_size]
+            self.results = []
+            self.simulate_people(batch)
+            progress_bar.update(len(batch))
+            yield self.results
+        progress_bar.close()
 
-        age_breakdown = df.groupby("age_group", observed=True).agg({"tax_due": "mean", "income": "mean"}).round(2)
+    def _run_parallel(self, people, children, workers):
+        """
+        Simulate a population (see generate_population) on a pool of worker processes.
 
-        breakdowns["by_age"] = {}
-        if len(age_breakdown) > 0:
-            for age in age_breakdown.index:
-                row = age_breakdown.loc[age]
-                try:
-                    avg_tax = float(row["tax_due"])
-                    avg_income = float(row["income"])
-                    breakdowns["by_age"][str(age)] = {
-                        "avg_amount": avg_tax,
-                        "avg_rate": (avg_tax / avg_income * 100) if avg_income > 0 else 0,
-                        "eligible_pct": 100.0,  # Everyone pays tax
-                    }
-                except (KeyError, TypeError):
-                    breakdowns["by_age"][str(age)] = {"avg_amount": 0, "avg_rate": 0, "eligible_pct": 100.0}
+        Households (a person with their partner and their children) are never split. They are divided in shards
+        of at most batch_size people. Every worker process has its own Services, into which it loads the source
+        tables and claims of one shard at a time. The results of every shard are yielded in shard order, so they
+        come out in the same order as with a single process.
 
-        # By income bracket
-        income_bins = [0, 20000, 40000, 60000, 1000000]
-        income_labels = ["€0-20k", "€20-40k", "€40-60k", "€60k+"]
-        df["income_bracket"] = pd.cut(df["income"], bins=income_bins, labels=income_labels)
+        The source tables are built here for the whole population, as in a single process, and split per shard.
+        So the random values in them don't depend on the sharding, and a seeded simulator gives the same results
+        for any number of workers.
+        """
+        total_people = len(people)
+        shard_size = max(1, min(self.batch_size, -(-total_people // workers)))
+        household = people["household"].to_numpy()
+        # Shards start at the first person of a household, every shard_size people
+        starts = np.flatnonzero(np.r_[True, household[1:] != household[:-1]])
+        bounds = np.unique(starts[np.searchsorted(starts, np.arange(0, total_people, shard_size))])
+        shards = [people.iloc[start:end] for start, end in zip(bounds, [*bounds[1:], total_people])]
+        shard_sources = self._split_source_tables(self.build_source_tables(people, children), people, bounds)
+
+        print(f"Simulating laws for {total_people} people on {workers} processes...", file=sys.stderr)
+        progress_bar = tqdm(total=total_people, desc="Simulating", unit="person", file=sys.stderr)
+        # Shards that finished before an earlier one, by shard number
+        finished = {}
+        next_shard = 0
+        # Spawn fresh interpreters: a forked process inherits the event classes registered by this process'
+        # Services and can't create its own
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_simulation_worker,
+            initargs=(
+                self.simulation_date,
+                self.law_parameters,
+                self.batch_size,
+                self.overwrite_input,
+                self.definition_overrides,
+            ),
+        ) as executor:
+            futures = {
+                executor.submit(_simulate_shard, shard, children[children["parent_bsn"].isin(shard["bsn"])], sources): i
+                for i, (shard, sources) in enumerate(zip(shards, shard_sources))
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                finished[i], batch_fallbacks = future.result()
+                self.batch_fallbacks += batch_fallbacks
+                progress_bar.update(len(shards[i]))
+                while next_shard in finished:
+                    yield finished.pop(next_shard)
+                    next_shard += 1
+        progress_bar.close()
 
-        income_breakdown = (
-            df.groupby("income_bracket", observed=True).agg({"tax_due": "mean", "income": "mean"}).round(2)
+    @staticmethod
+    def _split_source_tables(sources, people, bounds):
+        """
+        Split source tables into the rows of every shard of people (starting at bounds), by BSN. Tables that
+        aren't per person are shared. Every shard gets every table, if need be empty, so a worker never keeps
+        using a table of the previous shard it simulated.
+        """
+        shard_of = pd.Series(
+            np.repeat(np.arange(len(bounds)), np.diff([*bounds, len(people)])), index=people["bsn"].to_numpy()
         )
-
-        breakdowns["by_income"] = {}
-        if len(income_breakdown) > 0:
-            for bracket in income_breakdown.index:
-                row = income_breakdown.loc[bracket]
-                try:
-                    avg_tax = float(row["tax_due"])
-                    avg_income = float(row["income"])
-                    breakdowns["by_income"][str(bracket)] = {
-                        "avg_amount": avg_tax,
-                        "avg_rate": (avg_tax / avg_income * 100) if avg_income > 0 else 0,
-                        "eligible_pct": 100.0,
-                    }
-                except (KeyError, TypeError):
-                    breakdowns["by_income"][str(bracket)] = {"avg_amount": 0, "avg_rate": 0, "eligible_pct": 100.0}
-
-        # By partner status
-        partner_breakdown = df.groupby("has_partner", observed=True).agg({"tax_due": "mean", "income": "mean"}).round(2)
-
-        breakdowns["by_partner"] = {
-            "with_partner": {"avg_amount": 0, "avg_rate": 0, "eligible_pct": 100.0},
-            "without_partner": {"avg_amount": 0, "avg_rate": 0, "eligible_pct": 100.0},
+        shard_sources = [{} for _ in bounds]
+        for key, df in sources.items():
+            if "bsn" not in df.columns:
+                for tables in shard_sources:
+                    tables[key] = df
+                continue
+            for tables in shard_sources:
+                tables[key] = df.iloc[:0]
+            for shard, rows in df.groupby(shard_of.reindex(df["bsn"]).to_numpy(), sort=False):
+                shard_sources[shard][key] = rows.reset_index(drop=True)
+        return shard_sources
+
+    @staticmethod
+    def _select_source_tables(sources, bsns):
+        """The rows of source tables for the people with the given BSNs, tables that aren't per person are shared"""
+        return {
+            key: df[df["bsn"].isin(bsns)].reset_index(drop=True) if "bsn" in df.columns else df
+            for key, df in sources.items()
         }
 
-        if True in partner_breakdown.index:
-            row = partner_breakdown.loc[True]
-            try:
-                avg_tax = float(row["tax_due"])
-                avg_income = float(row["income"])
-                breakdowns["by_partner"]["with_partner"] = {
-                    "avg_amount": avg_tax,
-                    "avg_rate": (avg_tax / avg_income * 100) if avg_income > 0 else 0,
-                    "eligible_pct": 100.0,
-                }
-            except (KeyError, TypeError):
-                pass
-
-        if False in partner_breakdown.index:
-            row = partner_breakdown.loc[False]
-            try:
-                avg_tax = float(row["tax_due"])
-                avg_income = float(row["income"])
-                breakdowns["by_partner"]["without_partner"] = {
-                    "avg_amount": avg_tax,
-                    "avg_rate": (avg_tax / avg_income * 100) if avg_income > 0 else 0,
-                    "eligible_pct": 100.0,
-                }
-            except (KeyError, TypeError):
-                pass
-
-        return breakdowns
-
-    def calculate_disposable_income_breakdowns(self, df):
-        """Calculate disposable income breakdowns by demographics."""
-        breakdowns = {}
+    def get_summary_with_breakdowns(self, results_df, simulation_date):
+        """Generate summary statistics with demographic breakdowns for web API."""
+        aggregator = self._aggregator()
+        aggregator.add(results_df)
+        return self._summary_response(aggregator, simulation_date)
 
-        # By age group
-        age_bins = [0, 30, 45, 67, 85, 150]
-        age_labels = ["18-30", "30-45", "45-67", "67-85", "85+"]
-        df["age_group"] = pd.cut(df["age"], bins=age_bins, labels=age_labels)
+    def _aggregator(self):
+        return SimulationAggregator(groupings=self.breakdown_groupings, quantiles=self.breakdown_quantiles)
 
-        age_breakdown = (
-            df.groupby("age_group", observed=True)
-            .agg({"disposable_income": ["mean", "median"], "disposable_income_after_housing": "mean"})
-            .round(2)
-        )
-
-        breakdowns["by_age"] = {}
-        if len(age_breakdown) > 0:
-            for age in age_breakdown.index:
-                row = age_breakdown.loc[age]
-                try:
-                    breakdowns["by_age"][str(age)] = {
-                        "avg_monthly": float(row[("disposable_income", "mean")]),
-                        "median_monthly": float(row[("disposable_income", "median")]),
-                        "after_housing_avg": float(row[("disposable_income_after_housing", "mean")]),
-                    }
-                except (KeyError, TypeError):
-                    breakdowns["by_age"][str(age)] = {"avg_monthly": 0, "median_monthly": 0, "after_housing_avg": 0}
-
-        # By income bracket
-        income_bins = [0, 20000, 40000, 60000, 1000000]
-        income_labels = ["€0-20k", "€20-40k", "€40-60k", "€60k+"]
-        df["income_bracket"] = pd.cut(df["income"], bins=income_bins, labels=income_labels)
-
-        income_breakdown = (
-            df.groupby("income_bracket", observed=True)
-            .agg({"disposable_income": ["mean", "median"], "disposable_income_after_housing": "mean"})
-            .round(2)
-        )
+    def _summary_response(self, aggregator, simulation_date):
+        return {
+            "status": "success",
+            "summary": aggregator.summary(),
+            "total_people": int(round(aggregator.total)),
+            "simulation_date": simulation_date,
+            # Batches that were simulated one by one, see simulate_people
+            "batch_fallbacks": self.batch_fallbacks,
+        }
 
-        breakdowns["by_income"] = {}
-        if len(income_breakdown) > 0:
-            for bracket in income_breakdown.index:
-                row = income_breakdown.loc[bracket]
-                try:
-                    breakdowns["by_income"][str(bracket)] = {
-                        "avg_monthly": float(row[("disposable_income", "mean")]),
-                        "median_monthly": float(row[("disposable_income", "median")]),
-                        "after_housing_avg": float(row[("disposable_income_after_housing", "mean")]),
-                    }
-                except (KeyError, TypeError):
-                    breakdowns["by_income"][str(bracket)] = {
-                        "avg_monthly": 0,
-                        "median_monthly": 0,
-                        "after_housing_avg": 0,
-                    }
 
-        # By housing type
-        housing_breakdown = (
-            df.groupby("housing_type", observed=True)
-            .agg({"disposable_income": ["mean", "median"], "disposable_income_after_housing": "mean"})
-            .round(2)
-        )
+# The simulator of a worker process in a parallel run, see LawSimulator._run_parallel
+_worker_simulator = None
 
-        breakdowns["by_housing"] = {}
-        if len(housing_breakdown) > 0:
-            for housing_type in housing_breakdown.index:
-                row = housing_breakdown.loc[housing_type]
-                try:
-                    breakdowns["by_housing"][str(housing_type)] = {
-                        "avg_monthly": float(row[("disposable_income", "mean")]),
-                        "median_monthly": float(row[("disposable_income", "median")]),
-                        "after_housing_avg": float(row[("disposable_income_after_housing", "mean")]),
-                    }
-                except (KeyError, TypeError):
-                    breakdowns["by_housing"][str(housing_type)] = {
-                        "avg_monthly": 0,
-                        "median_monthly": 0,
-                        "after_housing_avg": 0,
-                    }
 
-        return breakdowns
+def _init_simulation_worker(simulation_date, law_parameters, batch_size, overwrite_input, definition_overrides) -> None:
+    global _worker_simulator
+    # Progress is reported by the parent process, keep the per shard setup messages quiet
+    sys.stderr = open(os.devnull, "w")  # noqa: SIM115
+    _worker_simulator = LawSimulator(
+        simulation_date, law_parameters, overwrite_input=overwrite_input, definition_overrides=definition_overrides
+    )
+    _worker_simulator.batch_size = batch_size
 
-    def get_summary_with_breakdowns(self, results_df, simulation_date):
-        """Generate summary statistics with demographic breakdowns for web API."""
-        # Calculate summary statistics
-        summary = {
-            "demographics": {
-                "total_people": len(results_df),
-                "avg_age": float(results_df["age"].mean()),
-                "with_partners_pct": float(results_df["has_partner"].mean() * 100),
-                "students_pct": float(results_df["is_student"].mean() * 100),
-                "renters_pct": float((results_df["housing_type"] == "rent").mean() * 100),
-                "with_children_pct": float(results_df["has_children"].mean() * 100),
-            },
-            "income": {
-                "avg_annual": float(results_df["income"].mean()),
-                "median_annual": float(results_df["income"].median()),
-            },
-            "laws": {
-                "zorgtoeslag": {
-                    "eligible_pct": float(results_df["zorgtoeslag_eligible"].mean() * 100),
-                    "avg_amount": float(results_df[results_df["zorgtoeslag_eligible"]]["zorgtoeslag_amount"].mean())
-                    if any(results_df["zorgtoeslag_eligible"])
-                    else 0,
-                    "breakdowns": self.calculate_law_breakdowns(
-                        results_df, "zorgtoeslag", "zorgtoeslag_eligible", "zorgtoeslag_amount"
-                    ),
-                },
-                "huurtoeslag": {
-                    "eligible_pct": float(results_df["huurtoeslag_eligible"].mean() * 100),
-                    "avg_amount": float(results_df[results_df["huurtoeslag_eligible"]]["huurtoeslag_amount"].mean())
-                    if any(results_df["huurtoeslag_eligible"])
-                    else 0,
-                    "breakdowns": self.calculate_law_breakdowns(
-                        results_df, "huurtoeslag", "huurtoeslag_eligible", "huurtoeslag_amount"
-                    ),
-                },
-                "aow": {
-                    "eligible_pct": float(results_df["aow_eligible"].mean() * 100),
-                    "avg_amount": float(results_df[results_df["aow_eligible"]]["aow_amount"].mean())
-                    if any(results_df["aow_eligible"])
-                    else 0,
-                    "breakdowns": self.calculate_law_breakdowns(results_df, "aow", "aow_eligible", "aow_amount"),
-                },
-                "bijstand": {
-                    "eligible_pct": float(results_df["bijstand_eligible"].mean() * 100),
-                    "avg_amount": float(results_df[results_df["bijstand_eligible"]]["bijstand_amount"].mean())
-                    if any(results_df["bijstand_eligible"])
-                    else 0,
-                    "breakdowns": self.calculate_law_breakdowns(
-                        results_df, "bijstand", "bijstand_eligible", "bijstand_amount"
-                    ),
-                },
-                "kinderopvangtoeslag": {
-                    "eligible_pct": float(results_df["kinderopvangtoeslag_eligible"].mean() * 100),
-                    "avg_amount": float(
-                        results_df[results_df["kinderopvangtoeslag_eligible"]]["kinderopvangtoeslag_amount"].mean()
-                    )
-                    if any(results_df["kinderopvangtoeslag_eligible"])
-                    else 0,
-                    "breakdowns": self.calculate_law_breakdowns(
-                        results_df, "kinderopvangtoeslag", "kinderopvangtoeslag_eligible", "kinderopvangtoeslag_amount"
-                    ),
-                },
-                "voting_rights": {
-                    "eligible_pct": float(results_df["voting_rights"].mean() * 100),
-                    "breakdowns": self.calculate_law_breakdowns(
-                        results_df, "voting_rights", "voting_rights", "voting_rights"
-                    ),
-                },
-                "inkomstenbelasting": {
-                    "avg_tax": float(results_df["tax_due"].mean()),
-                    "avg_tax_rate": float((results_df["tax_due"] / results_df["income"]).mean() * 100),
-                    "avg_tax_credits": float(results_df["tax_credits"].mean()),
-                    "avg_box1": float(results_df["tax_box1"].mean()),
-                    "avg_box2": float(results_df["tax_box2"].mean()),
-                    "avg_box3": float(results_df["tax_box3"].mean()),
-                    "breakdowns": self.calculate_tax_breakdowns(results_df),
-                },
-            },
-            "disposable_income": {
-                "avg_monthly": float(results_df["disposable_income"].mean()),
-                "median_monthly": float(results_df["disposable_income"].median()),
-                "after_housing_avg": float(results_df["disposable_income_after_housing"].mean()),
-                "breakdowns": self.calculate_disposable_income_breakdowns(results_df),
-            },
-        }
 
-        return {
-            "status": "success",
-            "summary": summary,
-            "total_people": len(results_df),
-            "simulation_date": simulation_date,
-        }
+def _simulate_shard(people, children, sources):
+    """
+    Load the source tables and claims of a shard of households into this worker's Services and simulate it.
+    Returns the result rows and the number of batch fallbacks of the shard.
+    """
+    simulator = _worker_simulator
+    simulator.results = []
+    simulator.batch_fallbacks = 0
+    people = simulator.setup_population(people, children, sources)
+    for start in range(0, len(people), simulator.batch_size):
+        simulator.simulate_people(people[start : start + simulator.batch_size])
+    return simulator.results, simulator.batch_fallbacks
 
 
 def format_money(amount):
@@ -1678,29 +1757,31 @@ def format_money(amount):
 
 
 def analyze_by_groups(df, value_col, group_cols, groupby_col, agg_funcs=None):
-    """Analyze a value column across different groups"""
+    """Analyze a value column across different groups, aggregating the groups of all columns in one pass"""
     if agg_funcs is None:
         agg_funcs = ["mean", "min", "max", "count"]
 
-    result = {}
+    groupings = {}
     for col in group_cols:
-        if col == groupby_col:
+        # Skip the grouped column and columns that don't exist
+        if col == groupby_col or col not in df.columns:
             continue
 
-        # Skip if column doesn't exist
-        if col not in df.columns:
-            continue
-
-        # Group by column and calculate statistics for value_col
         if pd.api.types.is_numeric_dtype(df[col]):
             # For numeric columns, create bins
-            bins = pd.qcut(df[col], 4, duplicates="drop")
-            grouped = df.groupby(bins)[value_col].agg(agg_funcs)
+            groupings[col] = lambda frame, col=col: pd.qcut(frame[col], 4, duplicates="drop")
         else:
             # For categorical columns, use as is
-            grouped = df.groupby(col)[value_col].agg(agg_funcs)
+            groupings[col] = col
+    if not groupings:
+        return {}
 
-        result[col] = grouped
+    rows, cells, keys = breakdown_cells(df, groupings)
+    grouped = df[value_col].iloc[rows].groupby(cells).agg(agg_funcs)
+    result = {}
+    for col in groupings:
+        part = grouped[[keys[cell][0] == col for cell in grouped.index]]
+        result[col] = part.set_axis(pd.Index([keys[cell][1] for cell in part.index], name=col)).sort_index()
 
     return result
 
@@ -0,0 +1,581 @@
+"""Streaming aggregation and storage of LawSimulator results."""
+
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Demographic groups of the breakdowns, bins include their right edge like pd.cut
+AGE_BINS = [0, 30, 45, 67, 85, 150]
+AGE_LABELS = ["18-30", "30-45", "45-67", "67-85", "85+"]
+INCOME_BINS = [0, 20000, 40000, 60000, 1000000]
+INCOME_LABELS = ["€0-20k", "€20-40k", "€40-60k", "€60k+"]
+
+# Law name in the summary: (eligible column, amount column)
+LAWS = {
+    "zorgtoeslag": ("zorgtoeslag_eligible", "zorgtoeslag_amount"),
+    "huurtoeslag": ("huurtoeslag_eligible", "huurtoeslag_amount"),
+    "aow": ("aow_eligible", "aow_amount"),
+    "bijstand": ("bijstand_eligible", "bijstand_amount"),
+    "kinderopvangtoeslag": ("kinderopvangtoeslag_eligible", "kinderopvangtoeslag_amount"),
+    "voting_rights": ("voting_rights", "voting_rights"),
+}
+TAX_COLUMNS = ["tax_due", "tax_credits", "tax_box1", "tax_box2", "tax_box3"]
+# Result columns compared per person between scenarios
+DELTA_COLUMNS = [amount for eligible, amount in LAWS.values() if amount != eligible] + [
+    "tax_due",
+    "disposable_income",
+    "disposable_income_after_housing",
+]
+# Differences up to half a cent count as no difference
+DELTA_TOLERANCE = 0.005
+
+# Breakdown dimensions of the summary: the group of every result row, NaN for rows in none of the groups
+GROUPINGS = {
+    "by_age": lambda results: pd.cut(results["age"], bins=AGE_BINS, labels=AGE_LABELS).astype(object),
+    "by_income": lambda results: pd.cut(results["income"], bins=INCOME_BINS, labels=INCOME_LABELS).astype(object),
+    "by_housing": lambda results: results["housing_type"],
+    "by_partner": lambda results: results["has_partner"].astype(bool),
+}
+# Order of the groups in a breakdown, other dimensions are sorted
+GROUP_ORDER = {"by_age": AGE_LABELS, "by_income": INCOME_LABELS}
+
+
+def breakdown_cells(results: pd.DataFrame, groupings: dict) -> tuple[np.ndarray, np.ndarray, list[tuple[str, Any]]]:
+    """
+    The breakdown cells, (dimension, group), of result rows.
+
+    groupings maps a dimension to a result column or to a function of the results that gives the group of every
+    row. A row is in at most one group per dimension, so the cells of all dimensions can be aggregated in a
+    single grouped pass over (row, cell) pairs. Returns the row positions and cell numbers of those pairs, and
+    the (dimension, group) of every cell number.
+    """
+    rows, cells, keys = [], [], []
+    for dimension, grouping in groupings.items():
+        groups = grouping(results) if callable(grouping) else results[grouping]
+        codes, uniques = pd.factorize(groups)
+        present = np.flatnonzero(codes >= 0)
+        rows.append(present)
+        cells.append(codes[present] + len(keys))
+        keys.extend((dimension, group) for group in uniques)
+    return np.concatenate(rows), np.concatenate(cells), keys
+
+
+def aggregate_cells(values: pd.DataFrame, rows: np.ndarray, cells: np.ndarray, keys: list) -> dict[str, pd.DataFrame]:
+    """Sums of the columns of values (aligned with the results) per breakdown cell, a frame per dimension"""
+    sums = pd.DataFrame(values.to_numpy(dtype=float)[rows], columns=values.columns).groupby(cells).sum()
+    frames = {}
+    for dimension, part in sums.groupby([keys[cell][0] for cell in sums.index], sort=False):
+        frames[dimension] = part.set_axis(pd.Index([keys[cell][1] for cell in part.index]))
+    return frames
+
+
+def ordered_groups(dimension: str, groups) -> list:
+    """The groups of a breakdown dimension in the order of the summary"""
+    if dimension in GROUP_ORDER:
+        return [group for group in GROUP_ORDER[dimension] if group in groups]
+    try:
+        return sorted(groups)
+    except TypeError:
+        return list(groups)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch for (weighted) medians over streamed values.
+
+    Values are kept exactly until `capacity` of them have been added, so small runs get exact quantiles. After
+    that, full levels are compacted KLL style: sorted, with every other value of each adjacent pair moving up a
+    level, carrying the weight of the pair. Memory stays at about capacity values per level (one level per
+    doubling) with a rank error of the order of 1 / capacity.
+    """
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self.capacity = capacity
+        self.count = 0
+        # Per level the values and their weights
+        self._levels: list[tuple[list[float], list[float]]] = [([], [])]
+        self._offset = 0
+
+    def add(self, values, weights=None) -> None:
+        """Add values (weighing 1 unless weights are given), missing values (None, NaN) are skipped like pandas"""
+        values = pd.Series(values)
+        if values.dtype == object:
+            values = pd.to_numeric(values, errors="coerce")
+        values = values.to_numpy(dtype=float, na_value=np.nan)
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+        present = ~np.isnan(values)
+        self._levels[0][0].extend(values[present].tolist())
+        self._levels[0][1].extend(weights[present].tolist())
+        self.count += int(present.sum())
+        if self.count > self.capacity:
+            self._compact()
+
+    def _compact(self) -> None:
+        for level, (values, weights) in enumerate(self._levels):
+            if len(values) < self.capacity:
+                continue
+            order = np.argsort(values, kind="stable")
+            values, weights = np.asarray(values)[order], np.asarray(weights)[order]
+            # Keep an odd item at this level, so the compacted part has an even number of items
+            end = len(values) - len(values) % 2
+            if level + 1 == len(self._levels):
+                self._levels.append(([], []))
+            # Alternate the offset, so the rounding errors of compactions cancel out
+            self._levels[level + 1][0].extend(values[self._offset : end : 2].tolist())
+            self._levels[level + 1][1].extend((weights[0:end:2] + weights[1:end:2]).tolist())
+            self._offset ^= 1
+            self._levels[level] = (values[end:].tolist(), weights[end:].tolist())
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return math.nan
+        values = np.concatenate([np.asarray(level_values, dtype=float) for level_values, _ in self._levels])
+        weights = np.concatenate([np.asarray(level_weights, dtype=float) for _, level_weights in self._levels])
+        if len(self._levels) == 1 and np.all(weights == weights[0]):
+            # Exact, interpolating between values like pandas
+            return float(np.quantile(values, q))
+        order = np.argsort(values, kind="stable")
+        values, cumulative = values[order], np.cumsum(weights[order])
+        target = q * cumulative[-1]
+        position = int(np.searchsorted(cumulative, target))
+        # Exactly between two values, take the midpoint like an unweighted median of an even count
+        if position + 1 < len(values) and math.isclose(cumulative[position], target):
+            return float((values[position] + values[position + 1]) / 2)
+        return float(values[position])
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+
+class SimulationAggregator:
+    """
+    Running aggregates over simulation result rows, for the summary of get_summary_with_breakdowns.
+
+    Result batches are added as DataFrames (one row per person, see LawSimulator._add_result). A person counts
+    for the number of people in their "weight" column (1 without it), so a sample can stand for a larger
+    population. Per group of each breakdown only weighted sums and counts are kept, plus quantile sketches for
+    the medians, so memory doesn't grow with the number of people and a summary can be taken at any moment.
+
+    groupings adds breakdown dimensions to those of GROUPINGS (see breakdown_cells), which the summary reports
+    like by_housing. With quantiles, the disposable income breakdowns report those quantiles next to the median.
+    """
+
+    # Breakdown dimension: the columns whose means it reports
+    BREAKDOWN_COLUMNS = [c for eligible, amount in LAWS.values() for c in (eligible, amount)] + [
+        "tax_due",
+        "income",
+        "disposable_income",
+        "disposable_income_after_housing",
+    ]
+    # Columns with a quantile sketch per breakdown group
+    QUANTILE_COLUMNS = ["disposable_income"]
+
+    def __init__(self, sketch_capacity: int = 10000, groupings: dict | None = None, quantiles=()) -> None:
+        self.sketch_capacity = sketch_capacity
+        self.groupings = {**GROUPINGS, **(groupings or {})}
+        self.quantiles = list(quantiles)
+        # Number of result rows and the (weighted) number of people they stand for
+        self.rows = 0
+        self.total = 0.0
+        # Weighted sums and counts of the non-missing values of the summary columns over all rows
+        self._sums: pd.Series | None = None
+        self._counts: pd.Series | None = None
+        # Per breakdown dimension a frame with (column, "sum"/"count") columns and one row per group
+        self._groups: dict[str, pd.DataFrame] = {}
+        self._sketches: dict[tuple[str, str | None], QuantileSketch] = {}
+
+    def _sketch(self, column: str, group: tuple[str, str] | None = None) -> QuantileSketch:
+        key = (column, group)
+        if key not in self._sketches:
+            self._sketches[key] = QuantileSketch(self.sketch_capacity)
+        return self._sketches[key]
+
+    def add(self, results: pd.DataFrame) -> None:
+        """Add a batch of result rows"""
+        if len(results) == 0:
+            return
+        results = results.reset_index(drop=True)
+        weight = results["weight"].astype(float) if "weight" in results else pd.Series(1.0, index=results.index)
+        self.rows += len(results)
+        self.total += weight.sum()
+
+        overall = pd.DataFrame(
+            {
+                "age": results["age"],
+                "has_partner": results["has_partner"],
+                "is_student": results["is_student"],
+                "renter": results["housing_type"] == "rent",
+                "has_children": results["has_children"],
+                "income": results["income"],
+                "tax_rate": results["tax_due"] / results["income"],
+                "disposable_income": results["disposable_income"],
+                "disposable_income_after_housing": results["disposable_income_after_housing"],
+                **{column: results[column] for column in TAX_COLUMNS},
+                **{eligible: results[eligible] for eligible, _ in LAWS.values()},
+                # Amounts are averaged over the eligible people only
+                **{
+                    f"{amount}_when_eligible": results[amount].where(results[eligible].astype(bool))
+                    for eligible, amount in LAWS.values()
+                    if amount != eligible
+                },
+            }
+        ).astype(float)
+        sums, counts = overall.mul(weight, axis=0).sum(), overall.notna().mul(weight, axis=0).sum()
+        self._sums = sums if self._sums is None else self._sums + sums
+        self._counts = counts if self._counts is None else self._counts + counts
+        self._sketch("income").add(results["income"], weight)
+        self._sketch("disposable_income").add(results["disposable_income"], weight)
+
+        # All breakdown groups in one pass
+        rows, cells, keys = breakdown_cells(results, self.groupings)
+        columns = results[list(dict.fromkeys(self.BREAKDOWN_COLUMNS))].astype(float)
+        weighted = pd.concat(
+            [columns.mul(weight, axis=0), columns.notna().mul(weight, axis=0)], axis=1, keys=["sum", "count"]
+        ).swaplevel(axis=1)
+        for dimension, aggregated in aggregate_cells(weighted, rows, cells, keys).items():
+            current = self._groups.get(dimension)
+            self._groups[dimension] = aggregated if current is None else current.add(aggregated, fill_value=0)
+        weights = weight.to_numpy()[rows]
+        for column in self.QUANTILE_COLUMNS:
+            values = pd.to_numeric(results[column], errors="coerce").to_numpy(dtype=float)[rows]
+            for cell, positions in pd.Series(cells).groupby(cells).indices.items():
+                self._sketch(column, keys[cell]).add(values[positions], weights[positions])
+
+    def _mean(self, column: str) -> float:
+        count = self._counts[column]
+        return float(self._sums[column] / count) if count else math.nan
+
+    def _breakdown_means(self) -> dict[str, dict]:
+        """Per breakdown dimension and group (in order) the sums, counts and rounded means of the columns"""
+        breakdowns = {}
+        for dimension, frame in self._groups.items():
+            sums, counts = frame.xs("sum", axis=1, level=1), frame.xs("count", axis=1, level=1)
+            means = (sums / counts.where(counts > 0)).round(2)
+            sums, counts, means = sums.to_dict("index"), counts.to_dict("index"), means.to_dict("index")
+            breakdowns[dimension] = {
+                group: (sums[group], counts[group], means[group]) for group in ordered_groups(dimension, frame.index)
+            }
+        return breakdowns
+
+    def _custom_dimensions(self) -> list[str]:
+        return [dimension for dimension in self.groupings if dimension not in GROUPINGS]
+
+    @staticmethod
+    def _by_partner(groups: dict, stats, empty: dict) -> dict:
+        breakdown = {key: dict(empty) for key in ("with_partner", "without_partner")}
+        for group, cell in groups.items():
+            breakdown["with_partner" if group else "without_partner"] = stats(*cell)
+        return breakdown
+
+    def _law_breakdowns(self, law: str, cells: dict) -> dict:
+        eligible, amount = LAWS[law]
+
+        def stats(sums, counts, means):
+            return {
+                "eligible_count": int(round(sums[eligible])),
+                "total_count": int(round(counts[eligible])),
+                "eligible_pct": float(means[eligible] * 100),
+                "avg_amount": float(means[amount]) if pd.notna(means[amount]) else 0,
+            }
+
+        dimensions = ["by_age", "by_income"] + (["by_housing"] if law == "huurtoeslag" else [])
+        breakdowns = {
+            dimension: {str(group): stats(*cell) for group, cell in cells.get(dimension, {}).items()}
+            for dimension in dimensions + self._custom_dimensions()
+        }
+        breakdowns["by_partner"] = self._by_partner(
+            cells.get("by_partner", {}),
+            stats,
+            {"eligible_count": 0, "total_count": 0, "eligible_pct": 0, "avg_amount": 0},
+        )
+        return breakdowns
+
+    def _tax_breakdowns(self, cells: dict) -> dict:
+        def stats(sums, counts, means):
+            avg_tax, avg_income = float(means["tax_due"]), float(means["income"])
+            return {
+                "avg_amount": avg_tax,
+                "avg_rate": (avg_tax / avg_income * 100) if avg_income > 0 else 0,
+                "eligible_pct": 100.0,  # Everyone pays tax
+            }
+
+        breakdowns = {
+            dimension: {str(group): stats(*cell) for group, cell in cells.get(dimension, {}).items()}
+            for dimension in ["by_age", "by_income", *self._custom_dimensions()]
+        }
+        breakdowns["by_partner"] = self._by_partner(
+            cells.get("by_partner", {}), stats, {"avg_amount": 0, "avg_rate": 0, "eligible_pct": 100.0}
+        )
+        return breakdowns
+
+    def _quantiles(self, sketch: QuantileSketch) -> dict:
+        return {f"{q:g}": round(sketch.quantile(q), 2) for q in self.quantiles}
+
+    def _disposable_income_breakdowns(self, cells: dict) -> dict:
+        breakdowns = {}
+        for dimension in ["by_age", "by_income", "by_housing", *self._custom_dimensions()]:
+            breakdowns[dimension] = {}
+            for group, (_, _, means) in cells.get(dimension, {}).items():
+                sketch = self._sketch("disposable_income", (dimension, group))
+                breakdowns[dimension][str(group)] = {
+                    "avg_monthly": float(means["disposable_income"]),
+                    "median_monthly": round(sketch.median(), 2),
+                    "after_housing_avg": float(means["disposable_income_after_housing"]),
+                    **({"quantiles_monthly": self._quantiles(sketch)} if self.quantiles else {}),
+                }
+        return breakdowns
+
+    def summary(self) -> dict:
+        """Summary statistics with demographic breakdowns over the rows added so far"""
+        if self.rows == 0:
+            raise ValueError("No simulation results to summarize")
+
+        cells = self._breakdown_means()
+        laws = {}
+        for law, (eligible, amount) in LAWS.items():
+            laws[law] = {"eligible_pct": self._mean(eligible) * 100}
+            if law != "voting_rights":
+                laws[law]["avg_amount"] = self._mean(f"{amount}_when_eligible") if self._sums[eligible] else 0
+            laws[law]["breakdowns"] = self._law_breakdowns(law, cells)
+
+        return {
+            "demographics": {
+                "total_people": int(round(self.total)),
+                "simulated_people": self.rows,
+                "avg_age": self._mean("age"),
+                "with_partners_pct": self._mean("has_partner") * 100,
+                "students_pct": self._mean("is_student") * 100,
+                "renters_pct": self._mean("renter") * 100,
+                "with_children_pct": self._mean("has_children") * 100,
+            },
+            "income": {
+                "avg_annual": self._mean("income"),
+                "median_annual": self._sketch("income").median(),
+            },
+            "laws": {
+                **laws,
+                "inkomstenbelasting": {
+                    "avg_tax": self._mean("tax_due"),
+                    "avg_tax_rate": self._mean("tax_rate") * 100,
+                    "avg_tax_credits": self._mean("tax_credits"),
+                    "avg_box1": self._mean("tax_box1"),
+                    "avg_box2": self._mean("tax_box2"),
+                    "avg_box3": self._mean("tax_box3"),
+                    "breakdowns": self._tax_breakdowns(cells),
+                },
+            },
+            "disposable_income": {
+                "avg_monthly": self._mean("disposable_income"),
+                "median_monthly": self._sketch("disposable_income").median(),
+                "after_housing_avg": self._mean("disposable_income_after_housing"),
+                **({"quantiles_monthly": self._quantiles(self._sketch("disposable_income"))} if self.quantiles else {}),
+                "breakdowns": self._disposable_income_breakdowns(cells),
+            },
+        }
+
+
+def stratified_estimates(
+    results: pd.DataFrame, households: pd.Series, stratum_sizes: pd.Series, columns: list[str]
+) -> pd.DataFrame:
+    """
+    Estimates of the mean per person of result columns from a stratified sample of households.
+
+    results has the result rows of the sampled people with their "household", households the stratum of every
+    sampled household (indexed by household) and stratum_sizes the number of households per stratum in the
+    population. Missing values count as 0. The means are ratio estimates (the estimated total of a column over
+    the estimated number of people), their standard errors are linearized with a finite population correction.
+    The standard error is NaN while a stratum has a single sampled household.
+    """
+    values = results[columns].astype(float).fillna(0)
+    totals = values.groupby(results["household"]).sum().reindex(households.index, fill_value=0)
+    sizes = results.groupby("household").size().reindex(households.index, fill_value=0).astype(float)
+
+    sampled = households.value_counts()
+    population = stratum_sizes[sampled.index].astype(float)
+    weight = (population / sampled)[households].to_numpy()
+    people = (sizes * weight).sum()
+    means = totals.mul(weight, axis=0).sum() / people
+
+    linearized = totals - np.outer(sizes, means)
+    deviations = linearized.groupby(households.to_numpy()).std(ddof=1)
+    # Strata that are sampled completely contribute no sampling error
+    fpc = 1 - sampled / population
+    deviations[fpc[deviations.index].to_numpy() == 0] = 0
+    variance = (
+        deviations.pow(2).mul((population**2 * fpc / sampled)[deviations.index], axis=0).sum(min_count=len(sampled))
+    ) / people**2
+    return pd.DataFrame({"mean": means, "standard_error": np.sqrt(variance)})
+
+
+def summary_differences(summary: dict, baseline: dict) -> dict:
+    """The numbers of a summary minus those of a baseline summary, in the structure of the summary"""
+    differences = {}
+    for key, value in summary.items():
+        if key not in baseline:
+            continue
+        if isinstance(value, dict):
+            nested = summary_differences(value, baseline[key])
+            if nested:
+                differences[key] = nested
+        elif isinstance(value, int | float) and not isinstance(value, bool):
+            differences[key] = value - baseline[key]
+    return differences
+
+
+class ScenarioComparison:
+    """
+    Running comparison of variant scenarios with a baseline, over the result rows of the same people.
+
+    Every scenario gets a SimulationAggregator for its summary. Per variant the per person differences with the
+    baseline in the DELTA_COLUMNS are aggregated as well: weighted sums per group of the breakdown dimensions,
+    the weighted number of people gaining and losing disposable income, and a quantile sketch of the disposable
+    income differences. People without a result row in either scenario have no differences. groupings and
+    quantiles are those of SimulationAggregator.
+    """
+
+    def __init__(
+        self, variants: list[str], sketch_capacity: int = 10000, groupings: dict | None = None, quantiles=()
+    ) -> None:
+        self.baseline = SimulationAggregator(sketch_capacity, groupings, quantiles)
+        self.variants = {name: SimulationAggregator(sketch_capacity, groupings, quantiles) for name in variants}
+        self.groupings = {"all": lambda results: pd.Series("all", index=results.index), **self.baseline.groupings}
+        # Per variant and breakdown dimension ("all" for everyone) a frame of weighted sums per group
+        self._deltas: dict[str, dict[str, pd.DataFrame]] = {name: {} for name in variants}
+        self._sketches = {name: QuantileSketch(sketch_capacity) for name in variants}
+
+    def add(self, baseline: pd.DataFrame, variants: dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Add the result rows of a batch of people under the baseline and under every variant. Returns the baseline
+        rows with, per variant, a "<column>_delta_<variant>" column for each of the DELTA_COLUMNS.
+        """
+        baseline = baseline.reset_index(drop=True)
+        self.baseline.add(baseline)
+        rows = baseline.copy()
+        if len(baseline) == 0:
+            for name, results in variants.items():
+                self.variants[name].add(results)
+            return rows
+
+        weight = baseline["weight"].astype(float) if "weight" in baseline else pd.Series(1.0, index=baseline.index)
+        # The people are the same in every variant, and so are their breakdown cells
+        cells = breakdown_cells(baseline, self.groupings)
+        for name, results in variants.items():
+            self.variants[name].add(results)
+            if len(results) == 0:
+                results = pd.DataFrame(columns=["bsn", *DELTA_COLUMNS])
+            paired = results.set_index("bsn").reindex(baseline["bsn"]).reset_index(drop=True)
+            deltas = paired[DELTA_COLUMNS].astype(float) - baseline[DELTA_COLUMNS].astype(float)
+            for column in DELTA_COLUMNS:
+                rows[f"{column}_delta_{name}"] = deltas[column]
+
+            change = deltas["disposable_income"]
+            stats = pd.DataFrame(
+                {
+                    **{column: deltas[column] for column in DELTA_COLUMNS},
+                    "people": change.notna(),
+                    "affected": (deltas.abs() > DELTA_TOLERANCE).any(axis=1),
+                    "gainers": change > DELTA_TOLERANCE,
+                    "losers": change < -DELTA_TOLERANCE,
+                }
+            ).astype(float)
+            for dimension, aggregated in aggregate_cells(stats.mul(weight, axis=0), *cells).items():
+                current = self._deltas[name].get(dimension)
+                self._deltas[name][dimension] = aggregated if current is None else current.add(aggregated, fill_value=0)
+            self._sketches[name].add(change, weight)
+        return rows
+
+    @staticmethod
+    def _delta_stats(sums: pd.Series) -> dict:
+        people = sums["people"]
+
+        def share(column):
+            return float(sums[column] / people * 100) if people else 0
+
+        return {
+            "people": int(round(people)),
+            "affected_pct": share("affected"),
+            "gainers_pct": share("gainers"),
+            "losers_pct": share("losers"),
+            # Per person and over everyone, in the units of the result columns (mostly euros a month)
+            "avg_delta": {column: round(float(sums[column] / people), 2) if people else 0 for column in DELTA_COLUMNS},
+            "total_delta": {column: round(float(sums[column]), 2) for column in DELTA_COLUMNS},
+        }
+
+    def _delta_breakdowns(self, name: str) -> dict:
+        breakdowns = {}
+        for dimension in self.baseline.groupings:
+            frame = self._deltas[name].get(dimension)
+            if frame is None:
+                continue
+            groups = ordered_groups(dimension, frame.index)
+            breakdowns[dimension] = {
+                (
+                    {True: "with_partner", False: "without_partner"}[group] if dimension == "by_partner" else str(group)
+                ): (self._delta_stats(frame.loc[group]))
+                for group in groups
+            }
+        return breakdowns
+
+    def summary(self) -> dict:
+        """The summary of every scenario, with per variant its differences with the baseline"""
+        baseline = self.baseline.summary()
+        variants = {}
+        for name, aggregator in self.variants.items():
+            summary = aggregator.summary()
+            overall = self._deltas[name].get("all")
+            variants[name] = {
+                "summary": summary,
+                "differences": summary_differences(summary, baseline),
+                "deltas": {
+                    **(self._delta_stats(overall.loc["all"]) if overall is not None else {}),
+                    "median_disposable_income_delta": self._sketches[name].median(),
+                    "breakdowns": self._delta_breakdowns(name),
+                },
+            }
+        return {"baseline": baseline, "variants": variants}
+
+
+class ParquetResultWriter:
+    """
+    Writes simulation result batches to a Parquet file, one row group per batch.
+
+    The schema is taken from the first batch. Columns without any value in it (e.g. youngest_child_age in a
+    batch without parents) are stored as float64, later batches are cast to the schema.
+    """
+
+    def __init__(self, path) -> None:
+        # Imported here, the simulator only needs pyarrow when writing Parquet
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self.rows = 0
+        self._writer = None
+
+    def write(self, results: pd.DataFrame) -> None:
+        table = self._pa.Table.from_pandas(results, preserve_index=False)
+        if self._writer is None:
+            schema = self._pa.schema(
+                [
+                    field.with_type(self._pa.float64()) if self._pa.types.is_null(field.type) else field
+                    for field in table.schema
+                ]
+            ).remove_metadata()
+            self._writer = self._pq.ParquetWriter(self.path, schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.rows += len(results)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ParquetResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
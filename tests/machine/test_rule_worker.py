@@ -0,0 +1,101 @@
+import queue
+import threading
+from collections import namedtuple
+
+import pytest
+from eventsourcing.utils import clear_topic_cache
+
+from machine.events.case.rule_worker import RuleApplicationWorker
+from machine.service import Services
+
+Event = namedtuple("Event", ["originator_id", "name"])
+
+
+class BlockingRules:
+    """Records the events rules are applied to, the first one blocks until released"""
+
+    def __init__(self, fail: set[str] = frozenset()) -> None:
+        self.fail = fail
+        self.applied = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, event: Event) -> None:
+        if not self.started.is_set():
+            self.started.set()
+            assert self.release.wait(5)
+        self.applied.append(event.name)
+        if event.name in self.fail:
+            raise ValueError(event.name)
+
+
+def test_submit_raises_when_the_queue_stays_full():
+    rules = BlockingRules()
+    worker = RuleApplicationWorker(rules, maxsize=1)
+    first = worker.submit(Event("a", "a1"))
+    assert rules.started.wait(5)
+    second = worker.submit(Event("a", "a2"))
+
+    with pytest.raises(queue.Full):
+        worker.submit(Event("a", "a3"), timeout=0.05)
+
+    rules.release.set()
+    worker.close()
+    assert first.result() is None
+    assert second.result() is None
+    assert rules.applied == ["a1", "a2"]
+    stats = worker.stats()
+    assert (stats["submitted"], stats["applied"], stats["max_queued"], stats["queued"]) == (2, 2, 1, 0)
+
+
+def test_events_of_a_case_are_applied_in_submission_order():
+    rules = BlockingRules()
+    worker = RuleApplicationWorker(rules)
+    worker.submit(Event("a", "a1"))
+    assert rules.started.wait(5)
+    # Queued while the worker is busy, so they end up in one batch
+    for name in ["b1", "a2", "c1", "b2", "a3", "b3"]:
+        worker.submit(Event(name[0], name))
+
+    rules.release.set()
+    worker.close()
+    assert rules.applied == ["a1", "b1", "b2", "b3", "a2", "a3", "c1"]
+    assert worker.stats()["batches"] == 2
+
+
+def test_futures_of_failing_events_hold_their_error():
+    rules = BlockingRules(fail={"a2", "b1"})
+    worker = RuleApplicationWorker(rules)
+    futures = {name: worker.submit(Event(name[0], name)) for name in ["a1", "a2", "a3", "b1", "b2"]}
+    rules.release.set()
+    worker.close()
+
+    assert {name: str(future.exception()) for name, future in futures.items() if future.exception()} == {
+        "a2": "a2",
+        "b1": "b1",
+    }
+    assert all(futures[name].result() is None for name in ["a1", "a3", "b2"])
+    stats = worker.stats()
+    assert (stats["applied"], stats["failed"]) == (3, 2)
+
+
+def test_services_stats():
+    clear_topic_cache()
+    services = Services("2025-03-01")
+    try:
+        parameters = {"BSN": "999993653"}
+        result = services.evaluate("TOESLAGEN", "zorgtoeslagwet", parameters)
+        services.case_manager.submit_case(
+            bsn="999993653",
+            service_type="TOESLAGEN",
+            law="zorgtoeslagwet",
+            parameters=parameters,
+            claimed_result=result.output,
+            approved_claims_only=True,
+        )
+        stats = services.stats()
+    finally:
+        services.__exit__()
+
+    assert stats["result_cache"]["misses"] > 0
+    assert stats["rule_worker"]["submitted"] == stats["rule_worker"]["applied"] == 1
@@ -0,0 +1,19 @@
+import pandas as pd
+import pytest
+from eventsourcing.utils import clear_topic_cache
+
+from simulate import LawSimulator
+
+SIMULATION_DATE = "2025-03-01"
+
+
+def create_simulator(**kwargs) -> LawSimulator:
+    """A simulator with its own Services, after dropping the event classes registered by the previous one"""
+    clear_topic_cache()
+    return LawSimulator(SIMULATION_DATE, **kwargs)
+
+
+@pytest.fixture(scope="session")
+def simulated_results() -> pd.DataFrame:
+    """The result rows of a seeded population"""
+    return create_simulator(seed=7).run_simulation(300)
@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+from .conftest import create_simulator
+
+
+def simulate(workers: int, num_people: int, batch_size: int) -> tuple[dict, pd.DataFrame]:
+    simulator = create_simulator(seed=7)
+    simulator.batch_size = batch_size
+    response = simulator.stream_simulation(num_people, workers=workers)
+    simulator = create_simulator(seed=7)
+    simulator.batch_size = batch_size
+    return response, simulator.run_simulation(num_people, workers=workers)
+
+
+@pytest.mark.parametrize(("num_people", "batch_size"), [(120, 500), (160, 50)])
+def test_same_results_for_any_number_of_workers(num_people, batch_size):
+    """A seeded simulation gives exactly the same result rows and summary on one process as on two"""
+    serial_response, serial_results = simulate(1, num_people, batch_size)
+    parallel_response, parallel_results = simulate(2, num_people, batch_size)
+
+    pd.testing.assert_frame_equal(serial_results, parallel_results)
+    assert serial_response == parallel_response
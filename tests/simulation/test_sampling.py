@@ -0,0 +1,92 @@
+import math
+
+import pandas as pd
+import pytest
+
+from simulate import LawSimulator
+from simulation_results import stratified_estimates
+
+from .conftest import create_simulator
+
+
+def test_stratified_estimates_by_hand():
+    """
+    Stratum "a" has 4 households of which 2 are sampled, stratum "b" 2 households which are both sampled. The
+    households of "a" weigh 2, so the mean is (2 * (10 + 20) + 30 + 40 + 50) / (2 * 2 + 3) = 180 / 7. Only "a"
+    contributes to the variance: the linearized values differ by 10 so s² = 50, and the variance is
+    4² * (1 - 2 / 4) / 2 * 50 / 7² = 200 / 49.
+    """
+    results = pd.DataFrame({"household": [1, 2, 3, 4, 4], "value": [10.0, 20.0, 30.0, 40.0, 50.0]})
+    households = pd.Series(["a", "a", "b", "b"], index=[1, 2, 3, 4])
+    stratum_sizes = pd.Series({"a": 4, "b": 2})
+
+    estimates = stratified_estimates(results, households, stratum_sizes, ["value"])
+
+    assert estimates.loc["value", "mean"] == pytest.approx(180 / 7)
+    assert estimates.loc["value", "standard_error"] == pytest.approx(math.sqrt(200) / 7)
+
+
+def test_stratified_estimates_of_a_complete_sample_are_exact():
+    results = pd.DataFrame({"household": [1, 2, 3], "value": [10.0, None, 40.0]})
+    households = pd.Series(["a", "a", "b"], index=[1, 2, 3])
+
+    estimates = stratified_estimates(results, households, pd.Series({"a": 2, "b": 1}), ["value"])
+
+    # Missing values count as 0
+    assert estimates.loc["value", "mean"] == pytest.approx(50 / 3)
+    assert estimates.loc["value", "standard_error"] == 0
+
+
+def test_stratified_estimates_need_two_households_per_stratum():
+    results = pd.DataFrame({"household": [1, 2, 3], "value": [10.0, 20.0, 40.0]})
+    households = pd.Series(["a", "a", "b"], index=[1, 2, 3])
+
+    estimates = stratified_estimates(results, households, pd.Series({"a": 4, "b": 3}), ["value"])
+
+    assert math.isnan(estimates.loc["value", "standard_error"])
+
+
+def test_allocate_sample():
+    stratum_sizes = pd.Series({"a": 60, "b": 30, "c": 9, "d": 1})
+    drawn = pd.Series(0, index=stratum_sizes.index)
+
+    # The first batch has at least two households per stratum, if it has them
+    take = LawSimulator._allocate_sample(10, stratum_sizes, drawn)
+    assert take.to_dict() == {"a": 6, "b": 3, "c": 2, "d": 1}
+
+    # Then every stratum is brought up to its proportional share (rounded down) of the 12 + 40 households
+    drawn += take
+    drawn += LawSimulator._allocate_sample(40, stratum_sizes, drawn)
+    assert drawn.to_dict() == {"a": 31, "b": 15, "c": 4, "d": 1}
+
+
+def test_sampling_the_whole_population_is_exact():
+    """A sample of every household has the means of stream_simulation, without sampling error"""
+    targets = {"zorgtoeslag_amount": 0, "tax_due": 0, "disposable_income": 0}
+    sampled = create_simulator(seed=5).sample_simulation(targets, frame_size=150)
+    streamed = create_simulator(seed=5)
+    streamed.stream_simulation(150)
+    results = create_simulator(seed=5).run_simulation(150)
+
+    sampling = sampled["sampling"]
+    assert sampling["converged"]
+    assert sampling["sampled_people"] == sampling["population_people"] == 150
+    for column, estimate in sampling["estimates"].items():
+        assert estimate["mean"] == pytest.approx(results[column].mean()), column
+        assert estimate["half_width"] == 0, column
+    assert sampled["total_people"] == 150
+    expected = streamed.aggregator.summary()
+    for law in ("zorgtoeslag", "huurtoeslag", "aow"):
+        assert sampled["summary"]["laws"][law]["eligible_pct"] == pytest.approx(expected["laws"][law]["eligible_pct"])
+        assert sampled["summary"]["laws"][law]["avg_amount"] == pytest.approx(expected["laws"][law]["avg_amount"])
+
+
+def test_sampling_is_reproducible():
+    """The same seed draws the same sample, with the same estimates"""
+    responses = [
+        create_simulator(seed=11).sample_simulation({"zorgtoeslag_amount": 20}, frame_size=400, max_people=200)
+        for _ in range(2)
+    ]
+    assert responses[0]["sampling"]["sampled_people"] < 400
+    assert responses[0]["sampling"] == responses[1]["sampling"]
+    assert responses[0]["summary"] == responses[1]["summary"]
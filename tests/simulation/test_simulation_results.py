@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulation_results import (
+    AGE_BINS,
+    AGE_LABELS,
+    INCOME_BINS,
+    INCOME_LABELS,
+    LAWS,
+    QuantileSketch,
+    SimulationAggregator,
+)
+
+
+def law_breakdown(results: pd.DataFrame, groups: pd.Series, eligible: str, amount: str) -> dict:
+    grouped = results.groupby(groups, observed=True).agg(
+        eligible_count=(eligible, "sum"),
+        total_count=(eligible, "count"),
+        pct=(eligible, "mean"),
+        amount=(amount, "mean"),
+    )
+    return {
+        str(group): {
+            "eligible_count": int(row.eligible_count),
+            "total_count": int(row.total_count),
+            "eligible_pct": round(row.pct, 2) * 100,
+            "avg_amount": round(row.amount, 2),
+        }
+        for group, row in grouped.iterrows()
+    }
+
+
+def pandas_summary(results: pd.DataFrame) -> dict:
+    """The summary numbers computed directly from all result rows, like get_summary_with_breakdowns used to"""
+    ages = pd.cut(results["age"], bins=AGE_BINS, labels=AGE_LABELS)
+    incomes = pd.cut(results["income"], bins=INCOME_BINS, labels=INCOME_LABELS)
+    laws = {}
+    for law, (eligible, amount) in LAWS.items():
+        eligible_rows = results[results[eligible].astype(bool)]
+        laws[law] = {
+            "eligible_pct": results[eligible].mean() * 100,
+            "by_age": law_breakdown(results, ages, eligible, amount),
+            "by_income": law_breakdown(results, incomes, eligible, amount),
+        }
+        if law != "voting_rights":
+            laws[law]["avg_amount"] = eligible_rows[amount].mean() if len(eligible_rows) else 0
+    return {
+        "avg_age": results["age"].mean(),
+        "renters_pct": (results["housing_type"] == "rent").mean() * 100,
+        "avg_income": results["income"].mean(),
+        "median_income": results["income"].median(),
+        "laws": laws,
+        "avg_tax": results["tax_due"].mean(),
+        "avg_tax_rate": (results["tax_due"] / results["income"]).mean() * 100,
+        "avg_box1": results["tax_box1"].mean(),
+        "avg_disposable_income": results["disposable_income"].mean(),
+        "median_disposable_income": results["disposable_income"].median(),
+        "after_housing_avg": results["disposable_income_after_housing"].mean(),
+        "disposable_income_by_age": results.groupby(ages, observed=True)["disposable_income"].agg(["mean", "median"]),
+    }
+
+
+def aggregated_summary(results: pd.DataFrame, batch_size: int = 64) -> dict:
+    aggregator = SimulationAggregator()
+    for start in range(0, len(results), batch_size):
+        aggregator.add(results.iloc[start : start + batch_size])
+    return aggregator.summary()
+
+
+def test_summary_matches_pandas(simulated_results):
+    """The summary streamed in batches has the numbers pandas computes over all rows at once"""
+    summary = aggregated_summary(simulated_results)
+    expected = pandas_summary(simulated_results)
+
+    assert summary["demographics"]["total_people"] == len(simulated_results)
+    assert summary["demographics"]["avg_age"] == pytest.approx(expected["avg_age"])
+    assert summary["demographics"]["renters_pct"] == pytest.approx(expected["renters_pct"])
+    assert summary["income"]["avg_annual"] == pytest.approx(expected["avg_income"])
+    assert summary["income"]["median_annual"] == pytest.approx(expected["median_income"])
+    for law, expected_law in expected["laws"].items():
+        assert summary["laws"][law]["eligible_pct"] == pytest.approx(expected_law["eligible_pct"]), law
+        if "avg_amount" in expected_law:
+            assert summary["laws"][law]["avg_amount"] == pytest.approx(expected_law["avg_amount"]), law
+        for dimension in ("by_age", "by_income"):
+            breakdown = summary["laws"][law]["breakdowns"][dimension]
+            assert breakdown.keys() == expected_law[dimension].keys(), (law, dimension)
+            for group, stats in expected_law[dimension].items():
+                assert breakdown[group] == pytest.approx(stats, abs=0.011), (law, dimension, group)
+
+    tax = summary["laws"]["inkomstenbelasting"]
+    assert tax["avg_tax"] == pytest.approx(expected["avg_tax"])
+    assert tax["avg_tax_rate"] == pytest.approx(expected["avg_tax_rate"])
+    assert tax["avg_box1"] == pytest.approx(expected["avg_box1"])
+
+    disposable_income = summary["disposable_income"]
+    assert disposable_income["avg_monthly"] == pytest.approx(expected["avg_disposable_income"])
+    assert disposable_income["median_monthly"] == pytest.approx(expected["median_disposable_income"])
+    assert disposable_income["after_housing_avg"] == pytest.approx(expected["after_housing_avg"])
+    for group, row in expected["disposable_income_by_age"].iterrows():
+        breakdown = disposable_income["breakdowns"]["by_age"][str(group)]
+        assert breakdown["avg_monthly"] == pytest.approx(row["mean"], abs=0.006)
+        assert breakdown["median_monthly"] == pytest.approx(row["median"], abs=0.006)
+
+
+def test_summary_with_weight_one_is_unweighted(simulated_results):
+    """Result rows weighing 1 give the same summary as rows without weights"""
+    unweighted = simulated_results.drop(columns=["weight"])
+    weighted = simulated_results.assign(weight=1.0)
+    assert aggregated_summary(weighted) == aggregated_summary(unweighted)
+
+
+def test_summary_with_weights_counts_people(simulated_results):
+    """Rows weighing 10 count for 10 people each, the means stay the same"""
+    summary = aggregated_summary(simulated_results.assign(weight=1.0))
+    weighted = aggregated_summary(simulated_results.assign(weight=10.0))
+    assert weighted["demographics"]["total_people"] == 10 * summary["demographics"]["total_people"]
+    assert weighted["demographics"]["simulated_people"] == summary["demographics"]["simulated_people"]
+    assert weighted["laws"]["zorgtoeslag"]["avg_amount"] == pytest.approx(summary["laws"]["zorgtoeslag"]["avg_amount"])
+    assert weighted["disposable_income"]["median_monthly"] == summary["disposable_income"]["median_monthly"]
+    by_age = weighted["laws"]["aow"]["breakdowns"]["by_age"]
+    for group, stats in summary["laws"]["aow"]["breakdowns"]["by_age"].items():
+        assert by_age[group]["total_count"] == 10 * stats["total_count"]
+
+
+def weighted_rank(values: np.ndarray, weights: np.ndarray, value: float) -> float:
+    """The share of the weight at or below a value"""
+    return weights[values <= value].sum() / weights.sum()
+
+
+@pytest.mark.parametrize("q", [0.1, 0.25, 0.5, 0.75, 0.9])
+def test_quantile_sketch_is_exact_below_capacity(q):
+    values = np.random.default_rng(1).lognormal(10, 1, 999)
+    sketch = QuantileSketch(capacity=1000)
+    for chunk in np.array_split(values, 7):
+        sketch.add(chunk)
+    assert sketch.quantile(q) == np.quantile(values, q)
+
+
+def test_quantile_sketch_skips_missing_values():
+    sketch = QuantileSketch()
+    sketch.add([1.0, None, 3.0, np.nan, 2.0])
+    assert sketch.count == 3
+    assert sketch.median() == 2.0
+
+
+def test_quantile_sketch_weighted_below_capacity():
+    """With weights the quantile is the first value whose cumulative weight reaches the quantile"""
+    sketch = QuantileSketch()
+    sketch.add([4.0, 1.0, 3.0, 2.0], [5.0, 1.0, 1.0, 1.0])
+    assert sketch.median() == 4.0
+    assert sketch.quantile(0.2) == 2.0
+    # Exactly between two values, like an unweighted median of an even count
+    sketch = QuantileSketch()
+    sketch.add([1.0, 2.0, 3.0], [1.0, 1.0, 2.0])
+    assert sketch.median() == 2.5
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_quantile_sketch_rank_error_after_compaction(seed, weighted):
+    """After compacting, a quantile is within a rank error of 2 / capacity"""
+    capacity = 200
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(10, 1, 50_000)
+    weights = rng.exponential(1, len(values)) if weighted else np.ones(len(values))
+    sketch = QuantileSketch(capacity)
+    for chunk_values, chunk_weights in zip(np.array_split(values, 37), np.array_split(weights, 37)):
+        sketch.add(chunk_values, chunk_weights if weighted else None)
+
+    assert sketch.count == len(values)
+    assert len(sketch._levels) > 1
+    for q in [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]:
+        assert abs(weighted_rank(values, weights, sketch.quantile(q)) - q) <= 2 / capacity, q
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from typing import Any
 from uuid import UUID
 
-from .models import Case, Event
+from .models import Case, CaseSummary, Event
 
 
 class CaseManagerInterface(ABC):
@@ -49,6 +49,19 @@ class CaseManagerInterface(ABC):
             All Cases containing the case information filtered on service & law
         """
 
+    @abstractmethod
+    def get_case_summaries_by_law(self, service: str, law: str) -> list[CaseSummary]:
+        """
+        Retrieves a summary of every case of a law, for listings that don't need the full cases.
+
+        Args:
+            service: String identifier for the service where the case is applicable
+            law: String identifier for the law where the case is applicable
+
+        Returns:
+            A CaseSummary of every Case filtered on service & law
+        """
+
     @abstractmethod
     def get_cases_by_bsn(self, bsn: str) -> list[Case]:
         """
@@ -1,3 +1,4 @@
+import os
 from datetime import datetime
 from enum import Enum
 
@@ -24,8 +25,9 @@ class MachineType(Enum):
 
 config_loader = ConfigLoader()
 
-# Configure service for the internal engine
-services = Services(datetime.today().strftime("%Y-%m-%d"))
+# Configure service for the internal engine. With EVENT_STORE_DIR set, cases and claims are kept in SQLite databases
+# in that directory, so they survive restarting the web workers.
+services = Services(datetime.today().strftime("%Y-%m-%d"), event_store_dir=os.environ.get("EVENT_STORE_DIR"))
 
 
 class MachineFactory:
@@ -5,7 +5,7 @@ from uuid import UUID
 import httpx
 
 from ..case_manager_interface import CaseManagerInterface
-from ..models import Case, CaseObjectionStatus, CaseStatus, Event
+from ..models import Case, CaseObjectionStatus, CaseStatus, CaseSummary, Event
 from .machine_client.law_as_code_client import Client
 from .machine_client.law_as_code_client.api.case import (
     case_based_on_bsn_service_law,
@@ -106,6 +106,15 @@ class CaseManager(CaseManagerInterface):
 
             return to_cases(response.parsed.data)
 
+    def get_case_summaries_by_law(self, service: str, law: str) -> list[CaseSummary]:
+        # The backend has no separate summary listing
+        return [
+            CaseSummary(
+                id=case.id, bsn=case.bsn, service=case.service, law=case.law, status=case.status, approved=case.approved
+            )
+            for case in self.get_cases_by_law(service, law)
+        ]
+
     def get_cases_by_bsn(self, bsn: str) -> list[Case]:
         # Instantiate the API client
         client = Client(base_url=self.base_url)
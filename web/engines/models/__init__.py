@@ -1,5 +1,6 @@
 from .case import Case as Case
 from .case import CaseObjectionStatus as CaseObjectionStatus
 from .case import CaseStatus as CaseStatus
+from .case import CaseSummary as CaseSummary
 from .claim import Claim as Claim
 from .event import Event as Event
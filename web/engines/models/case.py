@@ -53,3 +53,15 @@ class Case:
             return False
 
         return self.appeal_status.get("possible", False)
+
+
+@dataclass
+class CaseSummary:
+    """CaseSummary"""
+
+    id: UUID
+    bsn: str
+    service: str
+    law: str
+    status: CaseStatus
+    approved: bool | None = None
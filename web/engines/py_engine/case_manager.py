@@ -4,7 +4,7 @@ from uuid import UUID
 from machine.service import Services
 
 from ..case_manager_interface import CaseManagerInterface
-from ..models import Case, CaseObjectionStatus, CaseStatus, Event
+from ..models import Case, CaseObjectionStatus, CaseStatus, CaseSummary, Event
 
 
 class CaseManager(CaseManagerInterface):
@@ -44,6 +44,10 @@ class CaseManager(CaseManagerInterface):
         cases = self.case_manager.get_cases_by_law(law, service)
         return to_cases(cases)
 
+    def get_case_summaries_by_law(self, service: str, law: str) -> list[CaseSummary]:
+        summaries = self.case_manager.get_case_summaries(service_type=service, law=law)
+        return [to_case_summary(summary) for summary in summaries]
+
     def get_cases_by_bsn(self, bsn: str) -> list[Case]:
         cases = self.case_manager.get_cases_by_bsn(bsn)
         return to_cases(cases)
@@ -117,6 +121,17 @@ def to_cases(cases: list[Any]) -> list[Case]:
     return [to_case(item) for item in cases]
 
 
+def to_case_summary(summary) -> CaseSummary:
+    return CaseSummary(
+        id=UUID(summary.id),
+        bsn=summary.bsn,
+        service=summary.service,
+        law=summary.law,
+        status=CaseStatus(summary.status),
+        approved=summary.approved,
+    )
+
+
 def to_objection_status(objection) -> CaseObjectionStatus:
     if objection is None:
         return None
@@ -271,7 +271,7 @@ async def admin_dashboard(
     service_laws = discoverable_laws.get(service, [])
     service_cases = {}
     for law in service_laws:
-        cases = case_manager.get_cases_by_law(service, law)
+        cases = case_manager.get_case_summaries_by_law(service, law)
         service_cases[law] = group_cases_by_status(cases)
 
     return templates.TemplateResponse(
@@ -1,18 +1,65 @@
+import asyncio
 import json
-import uuid
+import os
+import tempfile
 from datetime import datetime
+from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 
 from web.dependencies import templates
 from web.law_parameters import get_default_law_parameters
+from web.services.simulation_jobs import JobStatus, SimulationJob, SimulationJobs
+from web.services.simulation_store import SimulationResultStore
 
-# Store simulation progress and results
-simulation_progress = {}
-simulation_results = {}
+# Results of completed simulations are kept on disk, for paging through them and for export
+simulation_store = SimulationResultStore(
+    os.environ.get("SIMULATION_RESULTS_DIR", Path(tempfile.gettempdir()) / "machine-law-simulations"),
+    max_sessions=int(os.environ.get("SIMULATION_RESULTS_MAX_SESSIONS", "50")),
+)
 
-router = APIRouter(prefix="/simulation", tags=["simulation"])
+# Simulations run as jobs on a pool of worker processes
+simulation_jobs = SimulationJobs(max_workers=int(os.environ.get("SIMULATION_WORKERS", "2")), store=simulation_store)
+
+MAX_PAGE_SIZE = 1000
+
+router = APIRouter(prefix="/simulation", tags=["simulation"], on_shutdown=[simulation_jobs.shutdown])
+
+
+def get_job(job_id: str) -> SimulationJob:
+    job = simulation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulation job not found")
+    return job
+
+
+def job_response(job: SimulationJob) -> dict:
+    """The state of a job, with the simulation results (and their session_id for export) once completed"""
+    response = job.state()
+    if job.status == JobStatus.COMPLETED:
+        response["result"] = get_result(job.id)
+    return response
+
+
+def get_result(session_id: str) -> dict:
+    result = simulation_jobs.get_result(session_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Simulation results not found")
+    return {**result, "session_id": session_id}
+
+
+def get_columns(session_id: str, columns: str | None) -> list[str] | None:
+    """The requested (comma separated) result columns, all if none"""
+    if simulation_store.get_rows_file(session_id) is None:
+        raise HTTPException(status_code=404, detail="Simulation result rows not found")
+    if not columns:
+        return None
+    requested = columns.split(",")
+    unknown = set(requested) - set(simulation_store.columns(session_id))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(sorted(unknown))}")
+    return requested
 
 
 @router.get("/")
@@ -61,105 +108,138 @@ async def simulation_page(request: Request):
 
 @router.post("/run")
 async def run_simulation(request: Request):
-    """Run the simulation with the provided parameters"""
+    """Run the simulation with the provided parameters and wait for its results"""
+    body = await request.json()
+    job = simulation_jobs.submit(body)
     try:
-        import subprocess
-
-        # Parse request body
-        body = await request.json()
-
-        # Run simulation in subprocess to avoid class registration conflicts
-        result = subprocess.run(
-            ["uv", "run", "python", "run_simulation.py"],
-            input=json.dumps(body),
-            capture_output=True,
-            text=True,
-            check=False,
+        job = await simulation_jobs.wait(job.id)
+    except asyncio.CancelledError:
+        # The client went away, nobody is waiting for the results anymore
+        simulation_jobs.cancel(job.id)
+        raise
+
+    if job.status != JobStatus.COMPLETED:
+        return JSONResponse(
+            status_code=500, content={"status": "error", "message": job.error or f"Simulation {job.status.value}"}
         )
+    return JSONResponse(get_result(job.id))
+
 
-        if result.returncode != 0:
-            raise Exception(f"Simulation failed: {result.stderr}")
+@router.post("/jobs", status_code=202)
+async def submit_simulation_job(request: Request):
+    """Queue a simulation with the provided parameters"""
+    body = await request.json()
+    return simulation_jobs.submit(body).state()
 
-        # Parse the result
-        if not result.stdout.strip():
-            raise Exception("No output from simulation")
 
-        simulation_data = json.loads(result.stdout)
+@router.get("/jobs/{job_id}")
+async def get_simulation_job(job_id: str):
+    """Get the state of a simulation job, including its results once completed"""
+    return job_response(get_job(job_id))
 
-        # Generate a unique session ID for this simulation
-        session_id = str(uuid.uuid4())
 
-        # Store the results for export
-        simulation_results[session_id] = simulation_data
+@router.get("/jobs/{job_id}/events")
+async def simulation_job_events(job_id: str):
+    """Stream the state of a simulation job as server-sent events until it has finished"""
+    get_job(job_id)
 
-        # Add session_id to response
-        simulation_data["session_id"] = session_id
+    async def events():
+        async for state in simulation_jobs.updates(job_id):
+            yield f"data: {json.dumps(state)}\n\n"
 
-        return JSONResponse(simulation_data)
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-    except Exception as e:
-        import traceback
 
-        error_details = traceback.format_exc()
-        print(f"Simulation error: {error_details}")
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e), "details": error_details})
+@router.delete("/jobs/{job_id}")
+async def cancel_simulation_job(job_id: str):
+    """Cancel a queued or running simulation job"""
+    get_job(job_id)
+    if not simulation_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Simulation job has already finished")
+    return get_job(job_id).state()
 
 
 @router.get("/results/{session_id}")
-async def get_results(request: Request, session_id: str):
-    """Get detailed simulation results"""
-    # TODO: Implement session-based result storage
-    # For now, return a placeholder
-    return templates.TemplateResponse(
-        "simulation_results.html",
-        {
-            "request": request,
-            "session_id": session_id,
-        },
-    )
+async def get_results(session_id: str):
+    """Get the summary of a finished simulation, from the job or from the result store"""
+    return get_result(session_id)
 
 
-@router.get("/export/{session_id}")
-async def export_results(session_id: str, format: str = "csv"):
-    """Export simulation results in various formats"""
-    import io
+@router.get("/results/{session_id}/rows")
+def get_result_rows(
+    session_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    columns: str | None = None,
+):
+    """Get a page of the per person simulation results, optionally only the given (comma separated) columns"""
+    selected = get_columns(session_id, columns)
+    rows, total = simulation_store.read_rows(session_id, offset=offset, limit=limit, columns=selected)
+    content = f'{{"total": {total}, "offset": {offset}, "limit": {limit}, "rows": {rows.to_json(orient="records")}}}'
+    return Response(content=content, media_type="application/json")
 
-    import pandas as pd
 
-    # Check if we have results for this session
-    if session_id not in simulation_results:
-        raise HTTPException(status_code=404, detail="Simulation results not found")
+@router.get("/export/{session_id}")
+async def export_results(session_id: str, format: str = "csv", columns: str | None = None):
+    """Export simulation results in various formats, streamed a row group at a time"""
+    filename = f"simulation_{session_id}.{format}"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    if format == "json":
+        # The summary, with the per person results if they were stored
+        data = get_result(session_id)
+        if simulation_store.get_rows_file(session_id) is None:
+            return JSONResponse(data, headers=headers)
+        selected = get_columns(session_id, columns)
+
+        def json_chunks():
+            separator = ""
+            yield json.dumps(data, ensure_ascii=False)[:-1] + ', "results": ['
+            for rows in simulation_store.iter_rows(session_id, columns=selected):
+                if len(rows):
+                    yield separator + rows.to_json(orient="records", force_ascii=False)[1:-1]
+                    separator = ","
+            yield "]}"
+
+        return StreamingResponse(json_chunks(), media_type="application/json", headers=headers)
+
+    if format not in ("csv", "parquet"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+    selected = get_columns(session_id, columns)
+    if format == "parquet" and selected is None:
+        return FileResponse(
+            simulation_store.get_rows_file(session_id), media_type="application/vnd.apache.parquet", filename=filename
+        )
 
-    data = simulation_results[session_id]
+    if format == "parquet":
 
-    if format == "csv":
-        # Convert results to CSV
-        if "results" in data:
-            df = pd.DataFrame(data["results"])
+        def parquet_chunks():
+            import io
 
-            # Create CSV content
-            csv_buffer = io.StringIO()
-            df.to_csv(csv_buffer, index=False)
-            csv_content = csv_buffer.getvalue()
+            import pyarrow as pa
+            import pyarrow.parquet as pq
 
-            return StreamingResponse(
-                iter([csv_content]),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=simulation_{session_id}.csv"},
-            )
+            buffer = io.BytesIO()
+            writer = None
+            for rows in simulation_store.iter_rows(session_id, columns=selected):
+                table = pa.Table.from_pandas(rows, preserve_index=False)
+                writer = writer or pq.ParquetWriter(buffer, table.schema)
+                writer.write_table(table)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if writer:
+                writer.close()
+                yield buffer.getvalue()
 
-    elif format == "json":
-        # Return full JSON data
-        json_content = json.dumps(data, indent=2, ensure_ascii=False)
+        return StreamingResponse(parquet_chunks(), media_type="application/vnd.apache.parquet", headers=headers)
 
-        return StreamingResponse(
-            iter([json_content]),
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename=simulation_{session_id}.json"},
-        )
+    def csv_chunks():
+        for i, rows in enumerate(simulation_store.iter_rows(session_id, columns=selected)):
+            yield rows.to_csv(index=False, header=i == 0)
 
-    else:
-        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    return StreamingResponse(csv_chunks(), media_type="text/csv", headers=headers)
 
 
 def calculate_summary_statistics(df) -> dict:
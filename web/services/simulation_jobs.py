@@ -0,0 +1,275 @@
+"""Simulation job service for the application.
+
+Simulations run as jobs on a pool of worker processes, so a request doesn't block the event loop. Every job gets
+a fresh process (a process can only hold one Services), which the pool starts and warms up with the parsed law
+specs while the previous job is still running. Progress is reported from the simulation loop and can be followed
+per job as a stream of state updates.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from web.services.simulation_store import SimulationResultStore
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class SimulationCancelled(Exception):
+    """Raised in a worker process to stop a simulation job that was cancelled"""
+
+
+@dataclass
+class SimulationJob:
+    id: str
+    params: dict
+    status: JobStatus = JobStatus.QUEUED
+    done: int = 0
+    total: int = 0
+    result: dict | None = None
+    error: str | None = None
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: datetime | None = None
+    future: Future | None = field(default=None, repr=False)
+    # (event loop, queue) of every listener to the state updates of this job
+    subscribers: list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = field(default_factory=list, repr=False)
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class SimulationJobs:
+    """
+    Runs simulation jobs (see run_simulation.py for the parameters) on a pool of worker processes.
+
+    With a result store, the summary of a completed job is saved there instead of kept in memory, and the
+    workers write the result rows of a job to it. Finished jobs are kept for status queries on the terms of the
+    store, at most max_sessions of them for at most ttl seconds (or max_finished and finished_ttl without a store).
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        store: SimulationResultStore | None = None,
+        max_finished: int = 50,
+        finished_ttl: float = 24 * 60 * 60,
+    ) -> None:
+        self.max_workers = max_workers
+        self.store = store
+        self.max_finished = store.max_sessions if store else max_finished
+        self.finished_ttl = store.ttl if store else finished_ttl
+        self.jobs: dict[str, SimulationJob] = {}
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        # Progress messages from the workers and the cancelled job ids, shared through a manager process
+        self._manager = None
+        self._events = None
+        self._cancelled = None
+        self._listener: threading.Thread | None = None
+
+    def _start(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._events = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._executor = self._create_executor()
+        self._listener = threading.Thread(target=self._listen, name="simulation-job-events", daemon=True)
+        self._listener.start()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_job_worker,
+            max_tasks_per_child=1,
+        )
+
+    def submit(self, params: dict) -> SimulationJob:
+        """Queue a simulation with the given parameters"""
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            job = SimulationJob(id=str(uuid.uuid4()), params=params, total=params.get("num_people", 1000))
+            self.jobs[job.id] = job
+            rows_path = self.store.rows_path(job.id) if self.store else None
+            arguments = (_run_job, job.id, params, self._events, self._cancelled, rows_path and str(rows_path))
+            try:
+                job.future = self._executor.submit(*arguments)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory), which breaks the whole pool
+                self._executor = self._create_executor()
+                job.future = self._executor.submit(*arguments)
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def get(self, job_id: str) -> SimulationJob | None:
+        return self.jobs.get(job_id)
+
+    def get_result(self, job_id: str) -> dict | None:
+        """The summary of a completed job"""
+        job = self.jobs.get(job_id)
+        if job is not None and job.result is not None:
+            return job.result
+        return self.store.get_summary(job_id) if self.store else None
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job; a running job stops after its current batch. False if the job already finished or is unknown."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status.finished:
+            return False
+        if not job.future.cancel():
+            self._cancelled[job_id] = True
+        return True
+
+    def _listen(self) -> None:
+        while True:
+            message = self._events.get()
+            if message is None:
+                return
+            job_id, status, done = message
+            job = self.jobs.get(job_id)
+            if job is not None:
+                self._update(job, status=JobStatus(status), done=done)
+
+    def _finish(self, job: SimulationJob, future: Future) -> None:
+        # This runs as a done callback, which swallows exceptions, so the job must end up finished regardless
+        try:
+            if future.cancelled() or future.exception() is not None:
+                if self.store:
+                    self.store.delete(job.id)
+                if future.cancelled() or isinstance(future.exception(), SimulationCancelled):
+                    self._update(job, status=JobStatus.CANCELLED)
+                else:
+                    self._update(job, status=JobStatus.FAILED, error=str(future.exception()))
+            elif self.store:
+                self.store.save_summary(job.id, future.result())
+                self._update(job, status=JobStatus.COMPLETED, done=job.total)
+            else:
+                self._update(job, status=JobStatus.COMPLETED, done=job.total, result=future.result())
+        except Exception as e:
+            if self.store:
+                self.store.delete(job.id)
+            self._update(job, status=JobStatus.FAILED, error=f"Saving the simulation results failed: {e}")
+        finally:
+            if self._cancelled is not None:
+                self._cancelled.pop(job.id, None)
+            self._prune()
+
+    def _prune(self) -> None:
+        """Forget finished jobs past their time to live and the oldest ones beyond max_finished"""
+        now = datetime.now()
+        with self._lock:
+            finished = sorted(
+                (job for job in self.jobs.values() if job.finished_at is not None),
+                key=lambda job: job.finished_at,
+                reverse=True,
+            )
+            for index, job in enumerate(finished):
+                if index >= self.max_finished or (now - job.finished_at).total_seconds() > self.finished_ttl:
+                    del self.jobs[job.id]
+
+    def _update(self, job: SimulationJob, **changes) -> None:
+        """Change the state of a job and publish it to its subscribers"""
+        with self._lock:
+            # Progress that arrives after the job finished is stale
+            if job.status.finished:
+                return
+            for name, value in changes.items():
+                setattr(job, name, value)
+            if job.status.finished:
+                job.finished_at = datetime.now()
+            state = job.state()
+            for loop, queue in job.subscribers:
+                loop.call_soon_threadsafe(queue.put_nowait, state)
+
+    async def updates(self, job_id: str):
+        """The state of a job, followed by every change of it until the job has finished"""
+        job = self.jobs[job_id]
+        queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            state = job.state()
+            job.subscribers.append(subscriber)
+        try:
+            yield state
+            while not JobStatus(state["status"]).finished:
+                state = await queue.get()
+                yield state
+        finally:
+            with self._lock:
+                job.subscribers.remove(subscriber)
+
+    async def wait(self, job_id: str) -> SimulationJob:
+        """Wait until a job has finished"""
+        job = self.jobs[job_id]
+        async for _ in self.updates(job_id):
+            pass
+        # Not from self.jobs, the job may have been pruned already
+        return job
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        for job_id, job in list(self.jobs.items()):
+            if not job.status.finished:
+                self._cancelled[job_id] = True
+        # Finishing jobs update their state, which takes the lock
+        executor.shutdown(wait=True, cancel_futures=True)
+        self._events.put(None)
+        self._listener.join()
+        self._manager.shutdown()
+
+
+def _init_job_worker() -> None:
+    """
+    Warm up a worker process before a job arrives: import the simulator and load the law specs, which the
+    resolvers of the job's Services then share (see load_rule_specs)
+    """
+    from pathlib import Path
+
+    from machine.utils import BASE_DIR, load_rule_specs
+
+    # The simulator reports progress through tqdm, which isn't shown anywhere
+    sys.stderr = open(os.devnull, "w")  # noqa: SIM115
+    load_rule_specs(Path(BASE_DIR))
+    import run_simulation  # noqa: F401
+
+
+def _run_job(job_id: str, params: dict, events, cancelled, rows_path: str | None) -> dict:
+    from run_simulation import run_simulation
+
+    def progress(done, total) -> None:
+        if cancelled.get(job_id):
+            raise SimulationCancelled(f"Simulation job {job_id} was cancelled")
+        events.put((job_id, JobStatus.RUNNING.value, done))
+
+    events.put((job_id, JobStatus.RUNNING.value, 0))
+    return run_simulation(params, progress=progress, output_path=rows_path)
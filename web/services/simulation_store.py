@@ -0,0 +1,137 @@
+"""Simulation result store for the application.
+
+Every simulation session gets a directory with its summary as JSON and its per person result rows as Parquet
+(written directly by the simulation worker). Sessions are evicted when they are older than the time to live or when
+there are more than max_sessions of them, least recently used first. Rows are read back a row group at a time, so
+neither paging nor exporting a large simulation loads it into memory at once.
+"""
+
+import json
+import shutil
+import time
+import uuid
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+
+SUMMARY_FILE = "summary.json"
+ROWS_FILE = "rows.parquet"
+
+
+class SimulationResultStore:
+    def __init__(self, directory: str | Path, max_sessions: int = 50, ttl: float = 24 * 60 * 60) -> None:
+        self.directory = Path(directory)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _session_dir(self, session_id: str) -> Path:
+        """The directory of a session; session ids are UUIDs, anything else can't be in the store"""
+        try:
+            uuid.UUID(session_id)
+        except ValueError as e:
+            raise KeyError(session_id) from e
+        return self.directory / session_id
+
+    def rows_path(self, session_id: str) -> Path:
+        """Where the result rows of a new session are to be written"""
+        session_dir = self._session_dir(session_id)
+        session_dir.mkdir(exist_ok=True)
+        return session_dir / ROWS_FILE
+
+    def save_summary(self, session_id: str, summary: dict) -> None:
+        session_dir = self._session_dir(session_id)
+        session_dir.mkdir(exist_ok=True)
+        tmp_path = session_dir / f"{SUMMARY_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(summary, f)
+        tmp_path.replace(session_dir / SUMMARY_FILE)
+        self.evict()
+
+    def _touch(self, session_dir: Path) -> None:
+        """Mark a session as used, for the least recently used eviction"""
+        session_dir.touch()
+
+    def get_summary(self, session_id: str) -> dict | None:
+        try:
+            session_dir = self._session_dir(session_id)
+            with open(session_dir / SUMMARY_FILE) as f:
+                summary = json.load(f)
+        except (KeyError, OSError):
+            return None
+        self._touch(session_dir)
+        return summary
+
+    def get_rows_file(self, session_id: str) -> Path | None:
+        """The Parquet file with the result rows of a completed session, if stored"""
+        try:
+            session_dir = self._session_dir(session_id)
+        except KeyError:
+            return None
+        if not (session_dir / SUMMARY_FILE).exists() or not (session_dir / ROWS_FILE).exists():
+            return None
+        self._touch(session_dir)
+        return session_dir / ROWS_FILE
+
+    def _parquet_file(self, session_id: str):
+        import pyarrow.parquet as pq
+
+        path = self.get_rows_file(session_id)
+        if path is None:
+            raise KeyError(session_id)
+        return pq.ParquetFile(path)
+
+    def columns(self, session_id: str) -> list[str]:
+        return self._parquet_file(session_id).schema_arrow.names
+
+    def read_rows(
+        self, session_id: str, offset: int = 0, limit: int = 100, columns: list[str] | None = None
+    ) -> tuple[pd.DataFrame, int]:
+        """A page of result rows (only the given columns, if any) and the total number of rows"""
+        parquet_file = self._parquet_file(session_id)
+        total = parquet_file.metadata.num_rows
+        pages = []
+        start = 0
+        # Only read the row groups that overlap the page
+        for row_group in range(parquet_file.num_row_groups):
+            size = parquet_file.metadata.row_group(row_group).num_rows
+            end = start + size
+            if end > offset and start < offset + limit:
+                table = parquet_file.read_row_group(row_group, columns=columns)
+                pages.append(table.slice(max(offset - start, 0), offset + limit - max(start, offset)).to_pandas())
+            start = end
+            if start >= offset + limit:
+                break
+        if not pages:
+            return pd.DataFrame(columns=columns or parquet_file.schema_arrow.names), total
+        return pd.concat(pages, ignore_index=True), total
+
+    def iter_rows(self, session_id: str, columns: list[str] | None = None) -> Iterator[pd.DataFrame]:
+        """All result rows, a row group at a time"""
+        parquet_file = self._parquet_file(session_id)
+        for row_group in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(row_group, columns=columns).to_pandas()
+
+    def delete(self, session_id: str) -> None:
+        try:
+            shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+        except KeyError:
+            pass
+
+    def evict(self) -> None:
+        """Remove sessions past their time to live and the least recently used ones beyond max_sessions"""
+        now = time.time()
+        completed = []
+        for session_dir in self.directory.iterdir():
+            if not session_dir.is_dir():
+                continue
+            last_used = session_dir.stat().st_mtime
+            if now - last_used > self.ttl:
+                shutil.rmtree(session_dir, ignore_errors=True)
+            elif (session_dir / SUMMARY_FILE).exists():
+                # Sessions of running simulations don't have a summary yet and aren't evicted
+                completed.append((last_used, session_dir))
+        completed.sort(reverse=True)
+        for _, session_dir in completed[self.max_sessions :]:
+            shutil.rmtree(session_dir, ignore_errors=True)